@@ -0,0 +1,278 @@
+# ai_client.py
+# Builds the model clients used by routes_ai.py and routes_speech.py.
+# MODEL_BACKEND in .env picks the provider:
+#   openai - Azure OpenAI if configured, otherwise standard OpenAI (default)
+#   local  - local_model.LocalClient, no network at all
+# MODEL_FALLBACK=local keeps the remote provider but answers chat and TTS calls from the local backend
+# when a call fails. Speech-to-text never falls back (a canned sentence is not the student's answer), and
+# chat replies from the fallback carry fallback=True so grading can refuse them (ModelUnavailable).
+# Every client is wrapped in InstrumentedClient so latency and tokens end up on /metrics (metrics.py)
+# and in the model_calls table (model_usage.py). With MODEL_FALLBACK the remote and the local client are
+# instrumented separately (inside FallbackClient): an outage shows up as failed calls for the remote model,
+# and the answers that replaced them are recorded under the model "fallback:local".
+# FAST_MODEL_ID routes the cheap tasks (see CHEAP_TASKS) to a smaller deployment; grading stays on MODEL_ID.
+# The clients are built on first use (LazyClient): importing the openai package is about half of a cold
+# start, and a worker that only serves pages or job polls never needs it.
+import threading
+import time
+
+import metrics
+import model_usage
+from config import settings
+from local_model import LocalClient
+
+
+class ModelUnavailable(RuntimeError):
+    """ The remote model failed and only the local fallback answered; such output is not stored as a grade. """
+
+
+def answered_by_fallback(resp) -> bool:
+    return bool(getattr(resp, "fallback", False))
+
+
+class _FallbackContext:
+    """ Streaming calls only hit the network when the context is entered, so fall back there too. """
+
+    def __init__(self, label, primary, fallback_call):
+        self.label = label
+        self.primary = primary
+        self.fallback_call = fallback_call
+        self.active = None
+
+    def __enter__(self):
+        try:
+            entered = self.primary.__enter__()
+            self.active = self.primary
+        except Exception as e:
+            print(f"MODEL FALLBACK ({self.label}):", type(e).__name__, e)
+            self.active = self.fallback_call()
+            entered = self.active.__enter__()
+        return entered
+
+    def __exit__(self, *exc):
+        return self.active.__exit__(*exc)
+
+
+class _FallbackMethods:
+    """ Calls a method on the primary resource; if it raises, calls the same method on the fallback. """
+
+    def __init__(self, label, primary, fallback):
+        self.label = label
+        self.primary = primary
+        self.fallback = fallback
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            try:
+                result = getattr(self.primary, name)(**kwargs)
+            except Exception as e:
+                print(f"MODEL FALLBACK ({self.label}):", type(e).__name__, e)
+                result = getattr(self.fallback, name)(**kwargs)
+                result.fallback = True
+                return result
+            if hasattr(result, "__enter__"):
+                return _FallbackContext(self.label, result, lambda: getattr(self.fallback, name)(**kwargs))
+            return result
+        return call
+
+
+class FallbackClient:
+    """ Wraps a remote client so that failed chat and TTS calls are answered by the local backend instead. """
+
+    def __init__(self, primary, fallback):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _FallbackMethods("chat", primary.chat.completions, fallback.chat.completions)
+        self.audio = type("Audio", (), {})()
+        # No fallback: a failed transcription is an error the caller reports as retryable
+        self.audio.transcriptions = primary.audio.transcriptions
+        self.audio.speech = type("Speech", (), {})()
+        self.audio.speech.with_streaming_response = _FallbackMethods(
+            "tts", primary.audio.speech.with_streaming_response, fallback.audio.speech.with_streaming_response
+        )
+
+
+def _record(kind, model, seconds, usage=None, failed=False):
+    metrics.observe_model_call(kind, model, seconds, usage=usage, failed=failed)
+    model_usage.record_call(kind, model, seconds, usage=usage, failed=failed)
+
+
+class _TimedContext:
+    """ Streaming calls: the time that counts is until the caller has finished reading the stream. """
+
+    def __init__(self, kind, model, inner, start):
+        self.kind = kind
+        self.model = model
+        self.inner = inner
+        self.start = start
+
+    def __enter__(self):
+        try:
+            return self.inner.__enter__()
+        except Exception:
+            # The request failed before the stream started; __exit__ won't run
+            _record(self.kind, self.model, time.perf_counter() - self.start, failed=True)
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self.inner.__exit__(exc_type, exc, tb)
+        finally:
+            _record(self.kind, self.model, time.perf_counter() - self.start, failed=exc_type is not None)
+
+
+class _TimedMethods:
+    """ Times every method call on the wrapped resource and records it with metrics.observe_model_call. """
+
+    def __init__(self, kind, target, model=None):
+        self.kind = kind
+        self.target = target
+        self.model = model
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            model = self.model or kwargs.get("model")
+            start = time.perf_counter()
+            try:
+                result = getattr(self.target, name)(**kwargs)
+            except Exception:
+                _record(self.kind, model, time.perf_counter() - start, failed=True)
+                raise
+            if hasattr(result, "__enter__"):
+                return _TimedContext(self.kind, model, result, start)
+            _record(self.kind, model, time.perf_counter() - start, usage=getattr(result, "usage", None))
+            return result
+        return call
+
+
+class InstrumentedClient:
+    """
+    Same surface as the OpenAI client, with every call timed for /metrics.
+    model overrides the recorded model name (default: the model= argument of the call).
+    """
+
+    def __init__(self, client, model: str = None):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _TimedMethods("chat", client.chat.completions, model)
+        self.audio = type("Audio", (), {})()
+        self.audio.transcriptions = _TimedMethods("stt", client.audio.transcriptions, model)
+        self.audio.speech = type("Speech", (), {})()
+        self.audio.speech.with_streaming_response = _TimedMethods(
+            "tts", client.audio.speech.with_streaming_response, model
+        )
+
+
+def _instrumented(client):
+    """ InstrumentedClient(client), or with MODEL_FALLBACK=local the remote and local clients each instrumented. """
+    if settings.MODEL_FALLBACK == "local":
+        return FallbackClient(InstrumentedClient(client), InstrumentedClient(LocalClient(), model="fallback:local"))
+    return InstrumentedClient(client)
+
+
+class LazyClient:
+    """ Stands in for a client and builds it on the first attribute access (once, thread-safe). """
+
+    def __init__(self, build):
+        self._build = build
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def chat_model_id() -> str:
+    """ The chat model id (or Azure deployment name); known from settings without building a client. """
+    if settings.MODEL_BACKEND == "local":
+        return "local"
+    if settings.AZURE_OPENAI_ENDPOINT and settings.AZURE_OPENAI_API_KEY:
+        return settings.AZURE_OPENAI_DEPLOYMENT  # your deployment name
+    return "gpt-4o-mini"  # small/fast model
+
+
+def build_chat_client():
+    """
+    Returns (client, model id) for chat completions.
+    This code is from ChatGPT (prompt at the bottom of this file)
+    """
+    if settings.MODEL_BACKEND == "local":
+        return InstrumentedClient(LocalClient()), "local"
+
+    import openai
+
+    if settings.AZURE_OPENAI_ENDPOINT and settings.AZURE_OPENAI_API_KEY:
+        # Azure OpenAI
+        client = openai.AzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            api_version="2024-05-01-preview",
+        )
+    else:
+        # Standard OpenAI
+        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+
+    return _instrumented(client), chat_model_id()
+
+
+def build_speech_client():
+    """ Returns the client used for Whisper STT, TTS and the plain chat answer endpoints. """
+    if settings.MODEL_BACKEND == "local":
+        return InstrumentedClient(LocalClient())
+
+    import openai
+
+    return _instrumented(openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL))
+
+
+# Tasks that don't need the grading model: short dictionary entries and generated exam questions
+CHEAP_TASKS = {"dictionary", "question"}
+
+
+def build_fast_model_id(model_id: str) -> str:
+    """ The model/deployment for CHEAP_TASKS. Falls back to MODEL_ID when FAST_MODEL_ID is not set. """
+    if settings.MODEL_BACKEND == "local":
+        return model_id
+    return settings.FAST_MODEL_ID or model_id
+
+
+def model_for(task: str) -> str:
+    """ Routing policy: returns the model id to use for a task ("grading", "report", "dictionary", "question"...). """
+    return FAST_MODEL_ID if task in CHEAP_TASKS else MODEL_ID
+
+
+MODEL_ID = chat_model_id()
+FAST_MODEL_ID = build_fast_model_id(MODEL_ID)
+openai_client = LazyClient(lambda: build_chat_client()[0])
+speech_client = LazyClient(build_speech_client)
+
+
+
+""" This is the prompt for setting up the OpenAI client
+Write Python code that sets up an OpenAI client for a Flask application.
+The application should be able to run in two different environments:
+1. Using **Azure OpenAI**
+2. Using the **standard OpenAI API**
+The configuration values are stored in a `settings` object.
+The settings include:
+
+ `AZURE_OPENAI_ENDPOINT`
+ `AZURE_OPENAI_API_KEY`
+ `AZURE_OPENAI_DEPLOYMENT`
+ `OPENAI_API_KEY`
+
+Logic the code should follow:
+ If the Azure endpoint and Azure API key are available, create an **Azure OpenAI client** using `openai.AzureOpenAI`.
+  Use the Azure endpoint and API key, set the API version to `"2024-05-01-preview"`, and set `MODEL_ID` to the Azure deployment name.
+
+If those Azure settings are not available, create a **standard OpenAI client** using `openai.OpenAI` and the regular OpenAI API key.
+ In that case set `MODEL_ID` to `"gpt-4o-mini"`.
+The code should end with two variables ready to use later in the program:
+ `openai_client`
+ `MODEL_ID`
+"""
@@ -1,21 +1,31 @@
 # app.py
 # Flask application entrypoint and factory.
-# - Creates DB tables on startup
+# - Checks the database schema revision; `python migrate.py` applies migrations (AUTO_MIGRATE=1 for throwaway databases)
+# - Installs the request/DB/model instrumentation (metrics.py, GET /metrics)
+# - Starts the background job threads unless JOB_RUNNER says otherwise (jobs.py, worker.py)
 from flask import Flask, jsonify, render_template, abort
 from pathlib import Path
 from flask_login import LoginManager
 from flask_login import login_required
 from mock_exam import mock_exam_bp
 from flask_login import current_user
+from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy import func
 from config import settings
+import compression
+import fast_json
+import static_assets
+import archive
+import metrics
+import migrate
+import model_usage
 # DB setup
 from db import engine, Base, SessionLocal
 
 
 
 # Ensure models are imported so SQLAlchemy knows about them noqa f401 stops warning
-from models import AnalysisLog, User ,ExamSession, ExamTurn, Base  # noqa: F401  (imported for side-effect)
+from models import AnalysisLog, User ,ExamSession, ExamTurn, ExamSectionReport, UserProgress, ModelCall, Job, ExamEvent, TranscriptCache, RateLimitHit, Base  # noqa: F401  (imported for side-effect)
 from db import engine
 # Blueprints
 from routes_ai import bp_ai
@@ -24,6 +34,95 @@ from routes_speech import bp_speech
 from routes_auth import bp_auth
 from routes_admin import bp_admin
 from routes_user import bp_user
+from routes_jobs import bp_jobs
+import jobs
+
+
+# Collects every number shown on the developer dashboard.
+# Kept outside the route so it can be benchmarked on its own (benchmarks/run_benchmarks.py).
+def dashboard_stats(db) -> dict:
+    #  Basic Stats
+    total_users = db.query(User).count()
+    total_exams = db.query(ExamSession).count()
+    completed_exams = db.query(ExamSession).filter_by(status="completed").count()
+    in_progress_exams = db.query(ExamSession).filter_by(status="in_progress").count()
+
+    #  User Preferences
+    language_distribution = (
+        db.query(User.preferred_language, func.count())
+        .group_by(User.preferred_language)
+        .all()
+    )
+
+    difficulty_distribution = (
+        db.query(User.preferred_difficulty, func.count())
+        .group_by(User.preferred_difficulty)
+        .all()
+    )
+
+
+
+    #  Recent Exam Sessions
+    recent_sessions = (
+        db.query(ExamSession)
+        .order_by(ExamSession.started_at.desc())
+        .limit(20)
+        .all()
+    )
+
+
+    #  Completion Rate
+    total_sessions = db.query(ExamSession).count()
+    completed_sessions = db.query(ExamSession).filter_by(status="completed").count()
+
+    completion_rate = 0
+    if total_sessions > 0:
+        completion_rate = round((completed_sessions / total_sessions) * 100, 1)
+
+    #  Exam Language Distribution
+    exam_language_dist = (
+        db.query(ExamSession.language, func.count())
+        .group_by(ExamSession.language)
+        .all()
+    )
+
+    #  Exam Difficulty Distribution
+    exam_difficulty_dist = (
+        db.query(ExamSession.difficulty, func.count())
+        .group_by(ExamSession.difficulty)
+        .all()
+    )
+
+    #  Average Questions Per Session
+    avg_questions = db.query(func.avg(ExamSession.total_questions)).scalar()
+
+    #  Average Overall Band
+    avg_band = db.query(func.avg(ExamTurn.overall_band)).scalar()
+
+    #  Most Active Users
+    most_active_users = (
+        db.query(ExamSession.user_id, func.count().label("session_count"))
+        .group_by(ExamSession.user_id)
+        .order_by(func.count().desc())
+        .limit(5)
+        .all()
+    )
+
+    return dict(
+        total_users=total_users,
+        total_exams=total_exams,
+        completed_exams=completed_exams,
+        in_progress_exams=in_progress_exams,
+        language_distribution=language_distribution,
+        difficulty_distribution=difficulty_distribution,
+        recent_sessions=recent_sessions,
+        completion_rate=completion_rate,
+        exam_language_dist=exam_language_dist,
+        exam_difficulty_dist=exam_difficulty_dist,
+        avg_questions=avg_questions,
+        avg_band=avg_band,
+        most_active_users=most_active_users
+    )
 
 
 # Calls Flask app to start
@@ -31,9 +130,26 @@ def create_app() -> Flask:
     app = Flask(__name__)
 
     app.config["SECRET_KEY"] = settings.SECRET_KEY
-
-    # Create any missing tables
-    Base.metadata.create_all(bind=engine)
+    # Behind a reverse proxy: take the client address from X-Forwarded-For (login rate limits key on it)
+    if settings.PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.PROXY_HOPS, x_proto=settings.PROXY_HOPS)
+
+    # Schema changes come from migrate.py; a worker boot only reads the applied revision
+    if settings.AUTO_MIGRATE:
+        migrate.upgrade()
+    else:
+        migrate.check_schema()
+    # jsonify() through orjson; large JSON/text responses brotli/gzip-compressed
+    fast_json.init_app(app)
+    compression.init_app(app)
+    # /static/ URLs carry a content hash and are cached for a year; bodies precompressed
+    static_assets.init_app(app)
+    # Request / query / model-call timings, exported on /metrics
+    metrics.init_app(app, engine)
+    # One model_calls row per model API call (tokens, latency, user, endpoint)
+    model_usage.init_app(app)
+    # Deferred AI work (section reports, grading, TTS prerendering) runs on job threads, not request threads
+    jobs.start_runner()
     # Flask-Login setup
     login_manager = LoginManager()
     login_manager.login_view = "auth.login_get"  # where to redirect if not logged in
@@ -117,92 +233,12 @@ def create_app() -> Flask:
             abort(403)
 
         db = SessionLocal()
+        try:
+            stats = dashboard_stats(db)
+        finally:
+            db.close()
 
-        #  Basic Stats
-        total_users = db.query(User).count()
-        total_exams = db.query(ExamSession).count()
-        completed_exams = db.query(ExamSession).filter_by(status="completed").count()
-        in_progress_exams = db.query(ExamSession).filter_by(status="in_progress").count()
-
-        #  User Preferences
-        language_distribution = (
-            db.query(User.preferred_language, func.count())
-            .group_by(User.preferred_language)
-            .all()
-        )
-
-        difficulty_distribution = (
-            db.query(User.preferred_difficulty, func.count())
-            .group_by(User.preferred_difficulty)
-            .all()
-        )
-
-
-
-        #  Recent Exam Sessions
-        recent_sessions = (
-            db.query(ExamSession)
-            .order_by(ExamSession.started_at.desc())
-            .limit(20)
-            .all()
-        )
-
-
-        #  Completion Rate
-        total_sessions = db.query(ExamSession).count()
-        completed_sessions = db.query(ExamSession).filter_by(status="completed").count()
-
-        completion_rate = 0
-        if total_sessions > 0:
-            completion_rate = round((completed_sessions / total_sessions) * 100, 1)
-
-        #  Exam Language Distribution
-        exam_language_dist = (
-            db.query(ExamSession.language, func.count())
-            .group_by(ExamSession.language)
-            .all()
-        )
-
-        #  Exam Difficulty Distribution
-        exam_difficulty_dist = (
-            db.query(ExamSession.difficulty, func.count())
-            .group_by(ExamSession.difficulty)
-            .all()
-        )
-
-        #  Average Questions Per Session
-        avg_questions = db.query(func.avg(ExamSession.total_questions)).scalar()
-
-        #  Average Overall Band
-        avg_band = db.query(func.avg(ExamTurn.overall_band)).scalar()
-
-        #  Most Active Users
-        most_active_users = (
-            db.query(ExamSession.user_id, func.count().label("session_count"))
-            .group_by(ExamSession.user_id)
-            .order_by(func.count().desc())
-            .limit(5)
-            .all()
-        )
-
-        db.close()
-
-        return render_template(
-            "developer.html",
-            total_users=total_users,
-            total_exams=total_exams,
-            completed_exams=completed_exams,
-            in_progress_exams=in_progress_exams,
-            language_distribution=language_distribution,
-            difficulty_distribution=difficulty_distribution,
-            recent_sessions=recent_sessions,
-            completion_rate=completion_rate,
-            exam_language_dist=exam_language_dist,
-            exam_difficulty_dist=exam_difficulty_dist,
-            avg_questions=avg_questions,
-            avg_band=avg_band,
-            most_active_users=most_active_users
-        )
+        return render_template("developer.html", **stats)
 
     #  REGISTER BLUEPRINTS-
     app.register_blueprint(bp_ai)       # /api/... (AI feedback)
@@ -211,6 +247,7 @@ def create_app() -> Flask:
     app.register_blueprint(bp_auth)     # ( for user login)
     app.register_blueprint(bp_admin)  # /admin/... (admin-only)
     app.register_blueprint(bp_user)  # /api/user/... (user preferences)
+    app.register_blueprint(bp_jobs)  # /api/jobs/<id> (background job status)
     app.register_blueprint(mock_exam_bp)
 
     @app.get("/developer/session/<int:session_id>")
@@ -232,6 +269,8 @@ def create_app() -> Flask:
             .order_by(ExamTurn.question_number)
             .all()
         )
+        # Transcripts and feedback of old sessions are in archive_blobs
+        archive.hydrate(db, turns)
 
         db.close()
 
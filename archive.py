@@ -0,0 +1,321 @@
+# archive.py
+# Moves the text of old analysis_logs / exam_turns rows into compressed archive_blobs rows, so the hot
+# tables (and their indexes, scans and backups) grow with recent activity instead of with all history.
+# - Rows older than ARCHIVE_AFTER_DAYS stay in place as summaries: a log keeps its user, model, date and
+#   a preview of input_text; a turn keeps its question, bands and audio metrics. The text columns go into
+#   one compressed JSON blob per exam session (turns) or per user and month (logs), zstd when the
+#   zstandard package is installed, zlib otherwise
+# - hydrate() puts the archived text back on loaded rows, in memory only (view_session, GET /api/logs/<id>,
+#   the exam export, exam reports). Decompressed blobs are cached per process: one session is one blob
+# - restore() brings one row back before it is edited, discard() drops its text from the archive before
+#   it is deleted
+#   python archive.py                # archive everything past the cutoff, ARCHIVE_BATCH rows per transaction
+#   python archive.py --days 30      # other cutoff
+#   python archive.py --vacuum       # then VACUUM, so the freed space is given back (SQLite) / reused (Postgres)
+#   python archive.py status         # hot and archived row counts, blob sizes
+# The same run is the "archive" job (POST /admin/archive). Nothing schedules it: use cron or similar.
+import argparse
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+
+import fast_json
+import jobs
+from config import settings
+from db import SessionLocal, engine
+from models import AnalysisLog, ArchiveBlob, ExamSession, ExamTurn
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib only
+    zstandard = None
+
+# What moves out of each table; everything else stays in place
+ARCHIVED = {
+    "analysis_logs": (AnalysisLog, ("input_text", "feedback_text")),
+    "exam_turns": (ExamTurn, ("transcript", "feedback_en", "corrected_answer_target", "tips_en")),
+}
+# Archives are written once and read rarely: compress hard
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+# Exam sessions per transaction: ARCHIVE_BATCH rows at about this many turns each
+TURNS_PER_SESSION = 20
+# Ids per IN (...) in hydrate_dicts
+ID_CHUNK = 500
+
+_cache = OrderedDict()  # blob id -> {str(row id): {column: value}}
+_cache_lock = threading.Lock()
+
+
+def _compress(raw: bytes):
+    if settings.ARCHIVE_CODEC == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("archive blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _store(db, table: str, rows: dict) -> int:
+    """ Writes {row id: {column: value}} as one blob and returns its id (flushed, not committed). """
+    raw = fast_json.dumps_bytes({str(k): v for k, v in rows.items()})
+    codec, data = _compress(raw)
+    blob = ArchiveBlob(table_name=table, codec=codec, data=data, row_count=len(rows), raw_bytes=len(raw))
+    db.add(blob)
+    db.flush()
+    return blob.id
+
+
+def _load(db, blob_id: int) -> dict:
+    """ A blob's rows, {str(row id): {column: value}}. Blobs never change, so they are cached by id. """
+    with _cache_lock:
+        if blob_id in _cache:
+            _cache.move_to_end(blob_id)
+            return _cache[blob_id]
+    found = db.execute(select(ArchiveBlob.codec, ArchiveBlob.data).where(ArchiveBlob.id == blob_id)).first()
+    rows = fast_json.loads(_decompress(found.codec, found.data)) if found else {}
+    with _cache_lock:
+        _cache[blob_id] = rows
+        while len(_cache) > max(settings.ARCHIVE_CACHE_BLOBS, 1):
+            _cache.popitem(last=False)
+    return rows
+
+
+# ---------------- Reading ----------------
+
+def hydrate(db, rows):
+    """
+    Fills in the archived columns of loaded AnalysisLog / ExamTurn instances. The values are set as if
+    they had been loaded, so nothing is written back on commit. Rows that aren't archived are left alone.
+    """
+    for row in rows:
+        if row is None or not row.archive_id:
+            continue
+        values = _load(db, row.archive_id).get(str(row.id), {})
+        for column, value in values.items():
+            set_committed_value(row, column, value)
+    return rows
+
+
+def hydrate_dicts(db, table: str, items: list) -> list:
+    """ The same for serialized rows (dicts with an "id" key), e.g. serializers.EXAM_TURN.many(). """
+    model, columns = ARCHIVED[table]
+    by_id = {item["id"]: item for item in items}
+    ids = list(by_id)
+    for i in range(0, len(ids), ID_CHUNK):
+        pointers = db.execute(
+            select(model.id, model.archive_id).where(model.id.in_(ids[i:i + ID_CHUNK]), model.archive_id.isnot(None))
+        ).all()
+        for row_id, blob_id in pointers:
+            item = by_id[row_id]
+            for column, value in _load(db, blob_id).get(str(row_id), {}).items():
+                if column in item:
+                    item[column] = value
+    return items
+
+
+# ---------------- Single rows ----------------
+
+def _remove_from_blob(db, model, blob_id: int, row_id: int) -> None:
+    """ Rewrites a blob without one row and repoints the rest of its rows (blob contents never change in place). """
+    rows = {k: v for k, v in _load(db, blob_id).items() if k != str(row_id)}
+    if rows:
+        new_id = _store(db, model.__tablename__, rows)
+        db.execute(
+            update(model).where(model.archive_id == blob_id, model.id != row_id).values(archive_id=new_id),
+            execution_options={"synchronize_session": False},
+        )
+    db.execute(delete(ArchiveBlob).where(ArchiveBlob.id == blob_id))
+
+
+def restore(db, row) -> None:
+    """ Moves one archived row's text back into its table, e.g. before it is edited. The caller commits. """
+    if not row.archive_id:
+        return
+    model, columns = ARCHIVED[row.__tablename__]
+    blob_id = row.archive_id
+    values = _load(db, blob_id).get(str(row.id), {})
+    for column in columns:
+        if column in values:
+            setattr(row, column, values[column])
+            # Written even if hydrate() already put the same value on the instance
+            flag_modified(row, column)
+    row.archive_id = None
+    db.flush()
+    _remove_from_blob(db, model, blob_id, row.id)
+
+
+def discard(db, row) -> None:
+    """ Drops a row's text from the archive before the row itself is deleted. The caller commits. """
+    if not row.archive_id:
+        return
+    model, _ = ARCHIVED[row.__tablename__]
+    blob_id = row.archive_id
+    row.archive_id = None
+    db.flush()
+    _remove_from_blob(db, model, blob_id, row.id)
+
+
+# ---------------- Archiving ----------------
+
+def _preview(s: str) -> str:
+    limit = settings.ARCHIVE_PREVIEW_CHARS
+    s = s or ""
+    return s if len(s) <= limit else s[:limit].rstrip() + "…"
+
+
+def _archive_logs(db, cutoff: datetime, batch: int) -> int:
+    rows = db.execute(
+        select(AnalysisLog.id, AnalysisLog.user_id, AnalysisLog.created_at, AnalysisLog.input_text, AnalysisLog.feedback_text)
+        .where(AnalysisLog.created_at < cutoff, AnalysisLog.archive_id.is_(None))
+        .order_by(AnalysisLog.id)
+        .limit(batch)
+    ).all()
+    groups = defaultdict(list)
+    for r in rows:
+        groups[(r.user_id, r.created_at.strftime("%Y-%m"))].append(r)
+
+    updates = []
+    for members in groups.values():
+        blob_id = _store(db, "analysis_logs", {
+            r.id: {"input_text": r.input_text, "feedback_text": r.feedback_text} for r in members
+        })
+        updates += [
+            {"id": r.id, "archive_id": blob_id, "input_text": _preview(r.input_text), "feedback_text": ""}
+            for r in members
+        ]
+    if updates:
+        db.execute(update(AnalysisLog), updates)
+    return len(rows)
+
+
+def _archive_turns(db, cutoff: datetime, batch: int) -> int:
+    _, columns = ARCHIVED["exam_turns"]
+    session_ids = db.execute(
+        select(ExamSession.id)
+        .where(
+            ExamSession.started_at < cutoff,
+            exists().where(ExamTurn.session_id == ExamSession.id, ExamTurn.archive_id.is_(None)),
+        )
+        .order_by(ExamSession.id)
+        .limit(max(batch // TURNS_PER_SESSION, 1))
+    ).scalars().all()
+    if not session_ids:
+        return 0
+    rows = db.execute(
+        select(ExamTurn.id, ExamTurn.session_id, *(getattr(ExamTurn, c) for c in columns))
+        .where(ExamTurn.session_id.in_(session_ids), ExamTurn.archive_id.is_(None))
+    ).all()
+    groups = defaultdict(list)
+    for r in rows:
+        groups[r.session_id].append(r)
+
+    updates = []
+    for members in groups.values():
+        blob_id = _store(db, "exam_turns", {r.id: {c: getattr(r, c) for c in columns} for r in members})
+        updates += [dict({c: None for c in columns}, id=r.id, archive_id=blob_id) for r in members]
+    db.execute(update(ExamTurn), updates)
+    return len(rows)
+
+
+def _drop_orphans() -> int:
+    """ Deletes blobs no row points at any more. """
+    with engine.begin() as conn:
+        return conn.execute(
+            delete(ArchiveBlob).where(
+                ~exists().where(AnalysisLog.archive_id == ArchiveBlob.id),
+                ~exists().where(ExamTurn.archive_id == ArchiveBlob.id),
+            )
+        ).rowcount
+
+
+def _vacuum() -> None:
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("VACUUM"))
+        else:
+            for table in ("analysis_logs", "exam_turns"):
+                conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+    print("   vacuumed")
+
+
+def run(days: int = None, batch: int = None, vacuum: bool = False) -> dict:
+    """ Archives every row older than days (default ARCHIVE_AFTER_DAYS); returns the counts. """
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    batch = batch or settings.ARCHIVE_BATCH
+    if days <= 0:
+        print("Archiving is disabled (ARCHIVE_AFTER_DAYS=0).")
+        return {}
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    counts = {}
+    for table, step in (("analysis_logs", _archive_logs), ("exam_turns", _archive_turns)):
+        counts[table] = 0
+        while True:
+            db = SessionLocal()
+            try:
+                n = step(db, cutoff, batch)
+                db.commit()
+            finally:
+                db.close()
+            if not n:
+                break
+            counts[table] += n
+    counts["orphan_blobs_dropped"] = _drop_orphans()
+    print(f"✅ Archived {counts['analysis_logs']} logs and {counts['exam_turns']} exam turns older than {days} days.")
+    if vacuum:
+        _vacuum()
+    return counts
+
+
+@jobs.handler("archive")
+def _archive_job(payload: dict):
+    """ POST /admin/archive """
+    return run(days=payload.get("days"), vacuum=bool(payload.get("vacuum")))
+
+
+def status() -> dict:
+    db = SessionLocal()
+    try:
+        result = {}
+        for table, (model, _) in ARCHIVED.items():
+            total, archived = db.execute(select(func.count(), func.count(model.archive_id)).select_from(model)).one()
+            blobs, raw, stored = db.execute(
+                select(func.count(), func.coalesce(func.sum(ArchiveBlob.raw_bytes), 0),
+                       func.coalesce(func.sum(func.length(ArchiveBlob.data)), 0))
+                .where(ArchiveBlob.table_name == table)
+            ).one()
+            result[table] = {"rows": total, "archived": archived, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored}
+        return result
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old analysis logs and exam turns")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "status"])
+    parser.add_argument("--days", type=int, help="archive rows older than this (default ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--batch", type=int, help="rows per transaction (default ARCHIVE_BATCH)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for table, s in status().items():
+            print(f"{table}: {s['archived']}/{s['rows']} rows archived in {s['blobs']} blobs, "
+                  f"{s['raw_bytes']} bytes -> {s['stored_bytes']} compressed")
+    else:
+        run(args.days, args.batch, args.vacuum)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# audio_metrics.py
+# Fluency measurements from the recorded answer itself, computed locally (no model call).
+# Runs on the 16 kHz mono samples audio_processing.py already decoded for Whisper:
+# - speaking time and articulation ratio (share of the answer spent speaking)
+# - pauses inside the answer: count, mean length, long pauses
+# - speech rate over the whole answer and over speaking time only, from the transcript's word count
+# - filled pauses ("um", "euh", "äh", ...) per minute, from the transcript. Whisper leaves most of them out
+#   of its transcripts, so this is only a lower bound (usually 0): it is stored, but neither the band
+#   evaluator nor fluency_band use it. The silent pauses above are measured from the audio and do count.
+# The numbers are stored on the ExamTurn, passed to the band evaluator, and give the fluency band.
+import re
+
+import numpy as np
+
+from audio_processing import FRAME_MS, TARGET_RATE, frame_levels, voiced_frames
+
+# Gaps shorter than this inside speech are part of a word (stop consonants), not pauses
+MIN_PAUSE_MS = 250
+LONG_PAUSE_MS = 1000
+# Voiced blips shorter than this are clicks or breaths, not speech
+MIN_VOICED_MS = 60
+
+FILLERS = {
+    "english": {"um", "umm", "uh", "uhm", "er", "erm", "hmm", "mm"},
+    "french": {"euh", "heu", "hum", "bah", "ben", "hmm"},
+    "german": {"äh", "ähm", "öh", "hm", "hmm", "ehm"},
+}
+_WORD = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)?", re.UNICODE)
+
+
+def _runs(mask: np.ndarray):
+    """ (starts, lengths, values) of the runs of equal values in a boolean mask. """
+    if mask.size == 0:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0, bool)
+    change = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [mask.size])))
+    return starts, lengths, mask[starts]
+
+
+def _smooth(voiced: np.ndarray) -> np.ndarray:
+    """ Drops voiced blips, then closes gaps too short to be pauses. """
+    voiced = voiced.copy()
+    min_voiced = max(1, MIN_VOICED_MS // FRAME_MS)
+    min_pause = max(1, MIN_PAUSE_MS // FRAME_MS)
+
+    starts, lengths, values = _runs(voiced)
+    for s, n in zip(starts[values & (lengths < min_voiced)], lengths[values & (lengths < min_voiced)]):
+        voiced[s:s + n] = False
+
+    starts, lengths, values = _runs(voiced)
+    inner = ~values & (lengths < min_pause) & (starts > 0) & (starts + lengths < voiced.size)
+    for s, n in zip(starts[inner], lengths[inner]):
+        voiced[s:s + n] = True
+    return voiced
+
+
+def count_words(transcript: str) -> int:
+    return len(_WORD.findall(transcript or ""))
+
+
+def count_fillers(transcript: str, language: str) -> int:
+    """ Fillers the transcript kept; Whisper drops most of them, so treat this as a lower bound. """
+    fillers = FILLERS.get((language or "").lower(), FILLERS["english"])
+    return sum(1 for w in _WORD.findall((transcript or "").lower()) if w in fillers)
+
+
+def compute(samples, transcript: str, language: str, rate: int = TARGET_RATE):
+    """ Metrics for one answer, or None when there is no audio to measure. """
+    if samples is None or samples.size < rate // 2:
+        return None
+
+    voiced = _smooth(voiced_frames(frame_levels(samples, rate)))
+    if not voiced.any():
+        return None
+    # Only the part between the first and the last word counts
+    idx = np.flatnonzero(voiced)
+    voiced = voiced[idx[0]: idx[-1] + 1]
+
+    frame_s = FRAME_MS / 1000
+    duration = voiced.size * frame_s
+    speaking = float(voiced.sum()) * frame_s
+    _, lengths, values = _runs(voiced)
+    pauses = lengths[~values] * frame_s
+
+    words = count_words(transcript)
+    fillers = count_fillers(transcript, language)
+    minutes = duration / 60
+
+    return {
+        "duration_s": round(duration, 2),
+        "speaking_s": round(speaking, 2),
+        "articulation_ratio": round(speaking / duration, 3),
+        "pause_count": int(pauses.size),
+        "mean_pause_s": round(float(pauses.mean()), 2) if pauses.size else 0.0,
+        "long_pause_count": int((pauses >= LONG_PAUSE_MS / 1000).sum()),
+        "speech_rate_wpm": round(words / minutes, 1) if minutes else 0.0,
+        "articulation_rate_wpm": round(words / (speaking / 60), 1) if speaking else 0.0,
+        "filler_per_min": round(fillers / minutes, 1) if minutes else 0.0,
+    }
+
+
+def fluency_band(metrics: dict):
+    """
+    Fluency band from the measurements (learner speech, roughly: 60 wpm halting, 110+ wpm fluent).
+    Frequent long pauses cost one band. filler_per_min is not used: the transcript it is counted from
+    has most fillers removed already, so it would reward the answers Whisper cleaned up the most.
+    """
+    if not metrics:
+        return None
+    bands = ["Needs Work", "OK", "Good", "Excellent"]
+    rate = metrics["speech_rate_wpm"]
+    level = 3 if rate >= 110 else 2 if rate >= 85 else 1 if rate >= 60 else 0
+
+    minutes = metrics["duration_s"] / 60 or 1
+    if metrics["long_pause_count"] / minutes > 4:
+        level = max(0, level - 1)
+    return bands[level]
@@ -0,0 +1,173 @@
+# audio_processing.py
+# Shrinks a recorded answer before it is sent to Whisper (routes_speech.transcribe_audio).
+# Browsers usually upload 48 kHz (often stereo) webm/opus with a second or two of silence at both ends;
+# Whisper only needs 16 kHz mono, and dead air costs upload time and transcription time.
+#   decode -> mono 16 kHz float32 -> trim leading/trailing silence -> encode (opus in ogg, or 16-bit WAV)
+# - Everything goes through in-memory buffers and ffmpeg pipes, no temp files
+# - WAV is decoded in-process; other formats need the ffmpeg binary (FFMPEG_BINARY)
+# - Any failure, or no ffmpeg for a webm upload, sends the original bytes unchanged
+# The decoded samples are also what audio_metrics.py measures.
+import io
+import shutil
+import subprocess
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+from config import settings
+
+TARGET_RATE = 16000
+FRAME_MS = 20
+# Silence kept before the first and after the last voiced frame, so word onsets aren't clipped
+PAD_MS = 250
+# A frame is voiced when it is this much louder than the quietest frames (the noise floor) ...
+VOICE_OVER_FLOOR_DB = 12.0
+# ... and louder than this absolute level (dBFS), so a silent recording isn't "all speech"
+MIN_VOICE_DBFS = -50.0
+OPUS_BITRATE = "24k"
+FFMPEG_TIMEOUT = 20
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_path():
+    return shutil.which(settings.FFMPEG_BINARY)
+
+
+def _run_ffmpeg(args, data: bytes) -> bytes:
+    proc = subprocess.run(
+        [ffmpeg_path(), "-hide_banner", "-loglevel", "error", *args],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=FFMPEG_TIMEOUT, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip()[:300] or "ffmpeg failed")
+    return proc.stdout
+
+
+def _is_wav(data: bytes) -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    """ Linear-interpolation resampling, with a moving-average low-pass first when downsampling. """
+    if rate == target or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+    if rate > target:
+        width = int(round(rate / target))
+        if width > 1:
+            samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    n_out = int(round(samples.size * target / rate))
+    positions = np.arange(n_out, dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def _decode_wav(data: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(data)) as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported WAV sample width: {width}")
+    if channels > 1:
+        samples = samples[: samples.size - samples.size % channels].reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+def decode(data: bytes):
+    """ Mono float32 samples at TARGET_RATE, or None when the format can't be decoded here. """
+    if _is_wav(data):
+        return _decode_wav(data)
+    if not ffmpeg_path():
+        return None
+    out = _run_ffmpeg(["-i", "pipe:0", "-ac", "1", "-ar", str(TARGET_RATE), "-f", "f32le", "pipe:1"], data)
+    return np.frombuffer(out, dtype="<f4").astype(np.float32)
+
+
+def frame_levels(samples: np.ndarray, rate: int = TARGET_RATE, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """ RMS level of each frame in dBFS (one vectorised pass over a frames x samples view). """
+    size = int(rate * frame_ms / 1000)
+    n = samples.size // size
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[: n * size].reshape(n, size)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def voiced_frames(levels: np.ndarray) -> np.ndarray:
+    """ Boolean mask of frames that contain speech (energy above the recording's noise floor). """
+    if levels.size == 0:
+        return np.zeros(0, dtype=bool)
+    floor = np.percentile(levels, 10)
+    return levels > max(floor + VOICE_OVER_FLOOR_DB, MIN_VOICE_DBFS)
+
+
+def trim_silence(samples: np.ndarray, rate: int = TARGET_RATE) -> np.ndarray:
+    """ Cuts leading and trailing silence; pauses inside the answer are kept. """
+    voiced = voiced_frames(frame_levels(samples, rate))
+    if not voiced.any():
+        return samples
+    size = int(rate * FRAME_MS / 1000)
+    pad = int(rate * PAD_MS / 1000)
+    idx = np.flatnonzero(voiced)
+    start = max(0, idx[0] * size - pad)
+    end = min(samples.size, (idx[-1] + 1) * size + pad)
+    return samples[start:end]
+
+
+def encode(samples: np.ndarray, rate: int = TARGET_RATE):
+    """ (bytes, filename): Opus in Ogg through ffmpeg, else 16-bit mono WAV. """
+    pcm = np.clip(samples, -1.0, 1.0).astype("<f4").tobytes()
+    if ffmpeg_path():
+        out = _run_ffmpeg([
+            "-f", "f32le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1",
+        ], pcm)
+        return out, "speech.ogg"
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    return buf.getvalue(), "speech.wav"
+
+
+def prepare_for_stt(data: bytes, filename: str):
+    """
+    Returns (bytes, filename, samples) to send to Whisper.
+    samples are the trimmed 16 kHz mono samples, or None when the upload was passed through as-is.
+    """
+    if not settings.AUDIO_PREPROCESS:
+        return data, filename, None
+    try:
+        samples = decode(data)
+        if samples is None or samples.size == 0:
+            return data, filename, None
+        trimmed = trim_silence(samples)
+        out, out_name = encode(trimmed)
+        print(f"[AUDIO] {len(data)} -> {len(out)} bytes, "
+              f"{samples.size / TARGET_RATE:.1f}s -> {trimmed.size / TARGET_RATE:.1f}s")
+        if len(out) >= len(data):
+            # Already compact (e.g. a short opus upload): the original is the better payload
+            return data, filename, trimmed
+        return out, out_name, trimmed
+    except Exception as e:
+        print("[AUDIO] preprocessing skipped:", type(e).__name__, e)
+        return data, filename, None
+
+
+def speech_samples(data: bytes):
+    """ Trimmed 16 kHz mono samples of an upload (for audio_metrics.py), or None if it can't be decoded. """
+    try:
+        samples = decode(data)
+        return trim_silence(samples) if samples is not None and samples.size else None
+    except Exception as e:
+        print("[AUDIO] decode failed:", type(e).__name__, e)
+        return None
@@ -0,0 +1,77 @@
+# benchmarks/import_budget.py
+# Cold-start budget for a web worker: imports app.py in fresh interpreters under `python -X importtime`
+# and exits with status 1 if
+# - the fastest of --runs imports took longer than --budget-ms, or
+# - a module from LAZY_MODULES was imported (those must only load on first use, see ai_client.LazyClient)
+# The slowest imports are listed either way, to show where a regression came from.
+#
+#   python benchmarks/import_budget.py
+#   python benchmarks/import_budget.py --budget-ms 900 --runs 5 --top 20
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported only when a request first needs them
+LAZY_MODULES = ("openai",)
+
+
+def measure(module: str = "app"):
+    """ One cold import: returns ({module: (self_us, cumulative_us)}, total_us). """
+    env = dict(os.environ)
+    # Importing app.py must not touch the database; point it somewhere harmless anyway
+    env.setdefault("DATABASE_URL", "sqlite://")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    modules, total = {}, 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules[name] = (int(self_us), int(cumulative_us))
+        if name == module:
+            total = int(cumulative_us)
+    return modules, total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=1000.0)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--module", default="app")
+    args = ap.parse_args()
+
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    modules, total = min(runs, key=lambda r: r[1])
+    total_ms = total / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (best of {len(runs)}, budget {args.budget_ms:.0f} ms)")
+    print("slowest (cumulative ms / self ms):")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda kv: -kv[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+    failed = False
+    eager = sorted({m for m in modules if m.split(".")[0] in LAZY_MODULES})
+    if eager:
+        print("FAIL: imported at startup but should load lazily:", ", ".join(eager[:10]))
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: cold import is over budget by {total_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/run_benchmarks.py
+# Micro-benchmarks for the CPU/DB work around the model calls (the model itself is stubbed).
+# - Runs against a seeded SQLite database (see seed_db.py), 10k users / 1M turns by default
+# - Appends every run to benchmarks/history.jsonl
+# - Compares each benchmark with the median of the last few runs at the same size and
+#   exits with status 1 if any got slower than the threshold
+#
+#   python benchmarks/run_benchmarks.py                 # full size
+#   python benchmarks/run_benchmarks.py --quick         # small database, for a fast check
+#   python benchmarks/run_benchmarks.py --only dashboard_stats --threshold 0.1
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HISTORY_PATH = Path(__file__).resolve().parent / "history.jsonl"
+sys.path.insert(0, str(ROOT))
+
+import seed_db  # noqa: E402  (same folder)
+
+SAMPLE_BAND_REPLY = json.dumps({
+    "feedback_en": ["Good range of everyday vocabulary.", "Watch the word order in longer sentences."],
+    "corrected_answer_target": "Normalement, je vais à l'école en bus avec mes amis.",
+    "tips_en": ["Add a reason or an example.", "Use a linking word such as 'parce que'."],
+    "bands": {"fluency": "Good", "grammar": "OK", "vocabulary": "Good", "pronunciation": "Good", "overall": "Good"},
+    "major_mistakes_en": ["Used 'je suis 15 ans' instead of 'j'ai 15 ans'."],
+}, ensure_ascii=False)
+
+
+def build_benchmarks():
+    """
+    Imports the app modules (after DATABASE_URL points at the seeded database)
+    and returns {name: zero-argument callable}.
+    """
+    import audit
+    import fast_json
+    import routes_ai
+    from app import dashboard_stats
+    from db import SessionLocal
+    from models import AnalysisLog
+    from serializers import ANALYSIS_LOG
+
+    db = SessionLocal()
+    # The same column SELECT as GET /api/logs
+    log_rows = db.execute(ANALYSIS_LOG.select().order_by(AnalysisLog.id.desc()).limit(100)).all()
+
+    audit.LOG_PATH = Path(tempfile.mkdtemp()) / "supervisor_log.txt"
+
+    def audit_write_event():
+        audit.write_event("AI_EXAM_TURN_CREATED", {"id": 123, "model": "gpt-4o-mini", "input_chars": 240})
+
+    return {
+        "parse_band_result": lambda: routes_ai.parse_band_result(SAMPLE_BAND_REPLY),
+        # The route reads build_question_sequence through an lru_cache; time the build itself, not a cache hit
+        "question_sequence_build": lambda: routes_ai.build_question_sequence.__wrapped__(15),
+        "serialize_100_logs": lambda: fast_json.dumps(ANALYSIS_LOG.many(log_rows)),
+        "dashboard_stats": lambda: dashboard_stats(db),
+        "audit_write_event": audit_write_event,
+    }
+
+
+def time_call(fn, repeat: int) -> dict:
+    """ Times fn with timeit: picks a loop count that takes ~0.2 s, then repeats. Per-call microseconds. """
+    fn()  # warm up caches / connections
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, number)
+    runs = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(runs), 3),
+        "min_us": round(min(runs), 3),
+        "loops": number,
+    }
+
+
+def load_history():
+    if not HISTORY_PATH.exists():
+        return []
+    with HISTORY_PATH.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline_for(history, scale: str, name: str, window: int):
+    """ Median of the last `window` recorded medians for this benchmark at this database size. """
+    values = [run["results"][name]["median_us"] for run in history
+              if run.get("scale") == scale and name in run.get("results", {})]
+    return statistics.median(values[-window:]) if values else None
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the request hot paths")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="use a small database (500 users, 15k turns)")
+    parser.add_argument("--only", action="append", help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown vs baseline (0.20 = 20%%)")
+    parser.add_argument("--window", type=int, default=5, help="how many previous runs form the baseline")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to history.jsonl")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.users, args.turns = 500, 15000
+
+    path = seed_db.db_path(args.users, args.turns, args.seed)
+
+    # Must be set before anything imports config.py / db.py
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["MODEL_BACKEND"] = "local"
+
+    if not path.exists():
+        print(f"Seeding {path.name} (first run only)…")
+        seed_db.seed(path, args.users, args.turns, args.seed)
+
+    benchmarks = build_benchmarks()
+    names = args.only or list(benchmarks)
+    scale = f"u{args.users}_t{args.turns}_s{args.seed}"
+    history = load_history()
+
+    results = {}
+    regressions = []
+    print(f"\n{'benchmark':<24}{'median µs':>14}{'min µs':>12}{'baseline µs':>14}{'change':>9}")
+    for name in names:
+        results[name] = time_call(benchmarks[name], args.repeat)
+        base = baseline_for(history, scale, name, args.window)
+        change = ""
+        if base:
+            ratio = results[name]["median_us"] / base - 1
+            change = f"{ratio:+.0%}"
+            if ratio > args.threshold:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<24}{results[name]['median_us']:>14.2f}{results[name]['min_us']:>12.2f}"
+              f"{(f'{base:.2f}' if base else '-'):>14}{change:>9}")
+
+    if not args.no_save:
+        with HISTORY_PATH.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "ts": datetime.utcnow().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "scale": scale,
+                "python": sys.version.split()[0],
+                "results": results,
+            }) + "\n")
+
+    if regressions:
+        print(f"\n❌ Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ No regressions.")
+
+
+if __name__ == "__main__":
+    main()
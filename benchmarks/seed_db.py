@@ -0,0 +1,157 @@
+# benchmarks/seed_db.py
+# Builds a seeded SQLite database of realistic size for the benchmarks.
+# Same seed + same sizes = the same rows, so results are comparable between runs.
+# The file name carries the schema revision, so a new migration gets a freshly seeded database.
+#
+#   python benchmarks/seed_db.py --users 10000 --turns 1000000
+import argparse
+import random
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import question_bank  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+LANGUAGES = ["english", "french", "german"]
+DIFFICULTIES = ["beginner", "moderate", "expert"]
+BANDS = ["Excellent", "Good", "OK", "Needs Work"]
+TURNS_PER_SESSION = 15
+
+SAMPLE_ANSWER = (
+    "I usually go to school by bus with my friends and in the evening I do my homework "
+    "before I play football or watch a series with my brother."
+)
+SAMPLE_FEEDBACK = (
+    "- Good range of everyday vocabulary.\n- Watch the word order in longer sentences.\n"
+    "- Try to add a reason or an example."
+)
+
+
+def migrations() -> list:
+    """ [(revision, name)] like migrate.available(), from the file names only: importing migrate.py would
+    build the engine before run_benchmarks.py has set DATABASE_URL. """
+    found = []
+    for path in MIGRATIONS_DIR.glob("m*.py"):
+        match = re.match(r"^m(\d{4})_\w+$", path.stem)
+        if match:
+            found.append((int(match.group(1)), path.stem))
+    return sorted(found)
+
+
+def schema_revision() -> int:
+    revisions = migrations()
+    return revisions[-1][0] if revisions else 0
+
+
+def db_path(users: int, turns: int, seed: int) -> Path:
+    return DATA_DIR / f"bench_u{users}_t{turns}_s{seed}_r{schema_revision()}.db"
+
+
+def seed(path: Path, users: int, turns: int, seed_value: int, logs_per_user: int = 20) -> Path:
+    """ Creates the database at path (if it does not exist yet) and returns the path. """
+    if path.exists():
+        return path
+
+    # Imported here so that run_benchmarks.py can set DATABASE_URL before db.py builds its engine
+    from db import Base
+    import models  # noqa: F401  (registers the tables on Base)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+
+    engine = create_engine(f"sqlite:///{tmp}", future=True)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(seed_value)
+    start = datetime(2025, 1, 1)
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.executemany(
+        "INSERT INTO users (id, email, password_hash, created_at, is_admin, preferred_language, preferred_difficulty) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"student{i}@example.com", "pbkdf2:sha256:1$x$y", start, i == 1,
+             rng.choice(LANGUAGES), rng.choice(DIFFICULTIES))
+            for i in range(1, users + 1)
+        ),
+    )
+
+    conn.executemany(
+        "INSERT INTO analysis_logs (user_id, input_text, feedback_text, model_name, created_at) VALUES (?, ?, ?, ?, ?)",
+        (
+            (rng.randint(1, users), SAMPLE_ANSWER, SAMPLE_FEEDBACK, "gpt-4o-mini",
+             start + timedelta(minutes=i))
+            for i in range(users * logs_per_user)
+        ),
+    )
+
+    sessions = max(1, turns // TURNS_PER_SESSION)
+    session_rows = []
+    for sid in range(1, sessions + 1):
+        session_rows.append((
+            sid, rng.randint(1, users), rng.choice(LANGUAGES), rng.choice(DIFFICULTIES),
+            "completed" if rng.random() < 0.8 else "in_progress",
+            start + timedelta(minutes=sid), TURNS_PER_SESSION,
+        ))
+    conn.executemany(
+        "INSERT INTO exam_sessions (id, user_id, language, difficulty, status, started_at, total_questions) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        session_rows,
+    )
+
+    sections = ["introduction", "school", "hobbies", "family_friends", "future_plans"]
+
+    def turn_rows():
+        for sid, _, language, difficulty, *_ in session_rows:
+            for n in range(1, TURNS_PER_SESSION + 1):
+                section = sections[(n - 1) // 3]
+                ids = question_bank.question_ids(section, language, difficulty)
+                qid = ids[(n - 1) % 3]
+                yield (sid, n, section, qid, question_bank.question_text(qid), SAMPLE_ANSWER,
+                       rng.choice(BANDS), rng.choice(BANDS))
+
+    conn.executemany(
+        "INSERT INTO exam_turns (session_id, question_number, section, question_id, question_text, transcript, "
+        "grammar_band, overall_band) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        turn_rows(),
+    )
+
+    # Stamped like a migrated database, so create_app()'s schema check accepts it
+    conn.execute("CREATE TABLE schema_migrations (revision INTEGER PRIMARY KEY, name VARCHAR(120) NOT NULL, "
+                 "applied_at DATETIME NOT NULL)")
+    conn.executemany(
+        "INSERT INTO schema_migrations (revision, name, applied_at) VALUES (?, ?, ?)",
+        ((revision, name, start) for revision, name in migrations()),
+    )
+
+    conn.commit()
+    conn.close()
+    tmp.rename(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a seeded benchmark database")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = seed(db_path(args.users, args.turns, args.seed), args.users, args.turns, args.seed)
+    print(f"✅ Benchmark database ready: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# compression.py
+# brotli/gzip for large JSON/text responses (admin listings, exports, exam reports).
+# brotli is used when the client accepts it and the brotli package is installed, gzip otherwise.
+# Small responses go out as they are: below COMPRESS_MIN_BYTES the encoding header and CPU cost buy nothing.
+# Streamed responses (SSE, audio) and anything already encoded (static files, see static_assets.py) are never touched.
+import gzip
+
+from flask import request
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "text/html", "text/plain", "text/css", "application/javascript", "text/javascript")
+
+
+def _encoding():
+    """ The encoding to answer with, or None when the client accepts neither. """
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    if (
+        settings.COMPRESS_MIN_BYTES <= 0
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE
+        or request.endpoint == "static"
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < settings.COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=settings.BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=settings.COMPRESS_LEVEL, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app) -> None:
+    app.after_request(compress_response)
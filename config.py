@@ -1,6 +1,7 @@
 #dotenv and load_dotenv I learned from ChatGPT
 from dotenv import load_dotenv #Helper library that reads .env files
 import os
+import tempfile
 
 # Load all variables from the .env  file
 load_dotenv()
@@ -18,8 +19,19 @@ class Settings:
         raw_db = raw_db.replace("postgres://", "postgresql://", 1)
     DATABASE_URL = raw_db
 
+    # Connection pool per process. Under gevent (gunicorn.conf.py) hundreds of requests share it,
+    # so sessions should not stay open while a request waits on the model.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # create_app() applies pending migrations itself (dev/test databases). Otherwise run `python migrate.py`
+    # before starting a new release; a boot only checks the schema revision (migrate.check_schema)
+    AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+
     # ---------------- OpenAI (standard) ----------------
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # Optional: point the client at another OpenAI-compatible server (e.g. loadtest/mock_openai_server.py)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
     # ---------------- Azure OpenAI (optional) ----------------
     # These are optional; if not set, the code will fall back to standard OpenAI.
@@ -27,6 +39,82 @@ class Settings:
     AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
     AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
+    # ---------------- Model backend ----------------
+    # "openai" (Azure/OpenAI above) or "local" (offline stand-in in local_model.py, no network)
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "openai").strip().lower()
+    # "local" answers from the local backend whenever a remote call fails; empty disables it
+    MODEL_FALLBACK = os.getenv("MODEL_FALLBACK", "").strip().lower()
+    # Smaller/faster model (or Azure deployment name) for dictionary look-ups and generated questions.
+    # Empty = everything uses the main model.
+    FAST_MODEL_ID = os.getenv("FAST_MODEL_ID", "").strip()
+
+    # ---------------- Audio ----------------
+    # Trim silence / downmix / re-encode recordings before Whisper (audio_processing.py).
+    # Formats other than WAV need the ffmpeg binary; without it uploads are sent unchanged.
+    AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+    FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+    # How long a transcript is reused for a byte-identical re-upload (stt_cache.py); 0 disables the cache
+    STT_CACHE_SECONDS = int(os.getenv("STT_CACHE_SECONDS", "600"))
+    # Identical concurrent model calls share one upstream call (single_flight.py). Lock files here coordinate
+    # web processes and worker.py on one host; empty = only threads of one process are coalesced
+    SINGLE_FLIGHT_DIR = os.getenv("SINGLE_FLIGHT_DIR", os.path.join(tempfile.gettempdir(), "oralexam-single-flight"))
+    # How long a leader's result stays readable by a process that waited on its lock file
+    SINGLE_FLIGHT_SHARE_SECONDS = int(os.getenv("SINGLE_FLIGHT_SHARE_SECONDS", "30"))
+
+    # ---------------- Background jobs ----------------
+    # "thread"   - each web process runs JOB_THREADS job threads itself (default, nothing else to start)
+    # "external" - web processes only enqueue; run `python worker.py` separately
+    # "inline"   - run jobs immediately in the enqueuing thread (debugging)
+    JOB_RUNNER = os.getenv("JOB_RUNNER", "thread").strip().lower()
+    JOB_THREADS = int(os.getenv("JOB_THREADS", "2"))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+    # Grade every mock-exam answer in the background (fills the band columns on exam_turns)
+    GRADE_EXAM_TURNS = os.getenv("GRADE_EXAM_TURNS", "1") == "1"
+    # Render the next exam question's audio in the background so /api/tts answers from disk
+    PRERENDER_TTS = os.getenv("PRERENDER_TTS", "1") == "1"
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    # Size cap of TTS_CACHE_DIR; the oldest files are removed beyond it. 0 = no limit
+    TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "500"))
+
+    # ---------------- Archive ----------------
+    # analysis_logs / exam_turns rows older than this many days keep only a summary in place; their
+    # text moves into compressed archive_blobs rows (archive.py, run `python archive.py`). 0 disables
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+    # Rows archived per transaction
+    ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+    # "zstd" (needs the zstandard package, zlib otherwise) or "zlib"
+    ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zstd").strip().lower()
+    # Characters of input_text left in place on an archived log (the /api/logs listing shows them)
+    ARCHIVE_PREVIEW_CHARS = int(os.getenv("ARCHIVE_PREVIEW_CHARS", "200"))
+    # Decompressed blobs kept per process for hydrate()
+    ARCHIVE_CACHE_BLOBS = int(os.getenv("ARCHIVE_CACHE_BLOBS", "64"))
+
+    # ---------------- Login ----------------
+    # Any werkzeug hash method with its cost parameters; older hashes are upgraded at the next login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # Hashes run on their own small pool (passwords.py) so a login burst can't take every web worker
+    PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", "2"))
+    # Logins allowed to wait for the pool; more get a 503 with Retry-After
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+    # Sliding-window limits "attempts/seconds" (rate_limit.py); "0" disables one
+    LOGIN_RATE_LIMIT_IP = os.getenv("LOGIN_RATE_LIMIT_IP", "60/60")
+    LOGIN_RATE_LIMIT_EMAIL = os.getenv("LOGIN_RATE_LIMIT_EMAIL", "8/300")
+    # "memory" (per process) or "db" (rate_limit_hits table, shared by all workers)
+    RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory").strip().lower()
+    # Number of reverse proxies in front of the app (X-Forwarded-For hops to trust); 0 = none
+    PROXY_HOPS = int(os.getenv("PROXY_HOPS", "0"))
+
+    # ---------------- Responses ----------------
+    # brotli/gzip JSON/text responses at least this big when the client accepts it (compression.py); 0 disables
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "2048"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+    # 0-11; 4-5 is about gzip's speed with smaller output. Static files are precompressed at 11 instead
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+    # ---------------- Metrics ----------------
+    # If set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-change-this")
     FLASK_ENV = os.getenv("FLASK_ENV", "development")
     PORT = int(os.getenv("PORT", "5000"))
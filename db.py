@@ -17,7 +17,17 @@ from config import settings
 # and handles the low-level connection details.
 # echo=False means: don’t print SQL statements in the console.
 # future=True just tells SQLAlchemy to use the modern 2.x-style API.
-engine = create_engine(settings.DATABASE_URL, echo=False, future=True)
+# pool_* : how many connections each process keeps (see DB_POOL_SIZE in config.py);
+# pool_pre_ping drops connections the server closed while idle.
+_pool_args = {}
+if not settings.DATABASE_URL.startswith("sqlite:///:memory:") and settings.DATABASE_URL != "sqlite://":
+    _pool_args = dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+engine = create_engine(settings.DATABASE_URL, echo=False, future=True, **_pool_args)
 
 
 
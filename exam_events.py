@@ -0,0 +1,101 @@
+# exam_events.py
+# Per-session event channel for the mock exam page (Server-Sent Events, GET /api/exam/<id>/events).
+# - publish() stores an event: next question, a graded answer, question audio ready, a finished
+#   section or the finished report. Request handlers and background jobs both publish.
+# - Events are rows in exam_events, so a job running in worker.py reaches a browser connected to
+#   any web process; the stream polls the table, and wakes at once for events published in-process
+# - The row id is the SSE id: a reconnecting EventSource sends Last-Event-ID and only gets what it missed
+# - Only the last BUFFER_SIZE events per session are kept
+import json
+import threading
+import time
+
+from sqlalchemy import delete
+
+from db import SessionLocal
+from models import ExamEvent
+
+BUFFER_SIZE = 50
+# A stream ends after this long; EventSource reconnects on its own with Last-Event-ID
+STREAM_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+POLL_SECONDS = 1.0
+RETRY_MS = 2000
+
+# The event after which the page has nothing more to wait for
+FINAL_EVENT = "report_ready"
+
+_published = threading.Condition()
+
+
+def publish(session_id: int, event_type: str, data: dict = None) -> None:
+    """ Stores an event for the session's page. Best effort: never raises into the caller. """
+    db = SessionLocal()
+    try:
+        db.add(ExamEvent(session_id=session_id, type=event_type, data=json.dumps(data or {}, ensure_ascii=False)))
+        db.flush()
+        # Keep the buffer small: drop everything older than the newest BUFFER_SIZE events
+        cutoff = (
+            db.query(ExamEvent.id)
+            .filter(ExamEvent.session_id == session_id)
+            .order_by(ExamEvent.id.desc())
+            .offset(BUFFER_SIZE)
+            .limit(1)
+            .scalar()
+        )
+        if cutoff is not None:
+            db.execute(delete(ExamEvent).where(ExamEvent.session_id == session_id, ExamEvent.id <= cutoff))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print("EXAM EVENT ERROR:", event_type, type(e).__name__, e)
+        return
+    finally:
+        db.close()
+
+    with _published:
+        _published.notify_all()
+
+
+def events_since(db, session_id: int, last_id: int = 0) -> list:
+    return (
+        db.query(ExamEvent)
+        .filter(ExamEvent.session_id == session_id, ExamEvent.id > (last_id or 0))
+        .order_by(ExamEvent.id.asc())
+        .all()
+    )
+
+
+def format_sse(event: ExamEvent) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n"
+
+
+def stream(session_id: int, last_id: int = 0):
+    """ Yields SSE text: the buffered events after last_id, then new ones as they are published. """
+    deadline = time.monotonic() + STREAM_SECONDS
+    last_beat = time.monotonic()
+    yield f"retry: {RETRY_MS}\n\n"
+
+    while time.monotonic() < deadline:
+        db = SessionLocal()
+        try:
+            events = events_since(db, session_id, last_id)
+            chunks = [format_sse(e) for e in events]
+            finished = any(e.type == FINAL_EVENT for e in events)
+            if events:
+                last_id = events[-1].id
+        finally:
+            db.close()
+
+        if chunks:
+            yield "".join(chunks)
+            last_beat = time.monotonic()
+            if finished:
+                return
+        elif time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+            # Comment line: keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            last_beat = time.monotonic()
+
+        with _published:
+            _published.wait(POLL_SECONDS)
@@ -0,0 +1,361 @@
+# exam_reports.py
+# Builds the end-of-exam report one section at a time.
+# - exam_answer calls schedule_section_report() as soon as the last question of a section is answered;
+#   a "section_report" job (jobs.py) summarises the section and stores it in exam_section_reports
+# - exam_finish merges the rows straight away when every section is done; otherwise it enqueues an
+#   "exam_report" job, which lets sections still running finish (jobs.Retry: it never blocks a job
+#   thread), fills in the ones that are missing (e.g. the exam was finished early) and merges them
+# - A bad model reply only costs that one section a retry; a report with a section that still can't be
+#   summarised is not stored or counted (ReportIncomplete): the exam_report job retries it with backoff,
+#   and if it gives up, finishing the exam again starts a new job
+# - The finished report is stored on the session (finalize_report) and served from there afterwards; storing it
+#   is a conditional UPDATE, so of two finish requests, or a finish racing the job, only one stores and counts it
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+import archive
+import exam_events
+import fast_json
+import jobs
+import progress
+import prompt_templates
+from ai_client import openai_client, MODEL_ID, answered_by_fallback, ModelUnavailable
+from db import SessionLocal
+from models import ExamSession, ExamTurn, ExamSectionReport
+
+# How long the exam_report job leaves section reports that are still being generated to finish,
+# and how often it looks again; after that it computes the missing ones itself
+FINISH_WAIT_SECONDS = 30
+FINISH_RECHECK_SECONDS = 1
+
+
+# Attempts of the exam_report job (backoff 2, 4, 8, 16 s between them) before the page shows an error
+REPORT_MAX_ATTEMPTS = 5
+
+
+class ReportIncomplete(RuntimeError):
+    """ Some answered section has no summary yet; the report is not stored in that state. """
+
+
+def section_ref(session_id: int) -> str:
+    """ Job ref shared by a session's section_report jobs. """
+    return f"session:{session_id}"
+
+
+def grade_ref(session_id: int) -> str:
+    """ Job ref of a session's grade_turn jobs; kept apart from section_ref so exam_finish never waits on grading. """
+    return f"grade:{session_id}"
+
+
+def report_ref(session_id: int) -> str:
+    """ Job ref of a session's exam_report job. """
+    return f"report:{session_id}"
+
+
+def summarize_sections_with_ai(language: str, difficulty: str, turns):
+    by_section = defaultdict(list)
+    for t in turns:
+        if (t.transcript or "").strip():
+            by_section[t.section].append(t)
+
+    payload = []
+    for section, items in by_section.items():
+        payload.append({
+            "section": section,
+            "answers": [
+                {
+                    "question": it.question_text,
+                    "transcript": it.transcript,
+                    "overall_band": it.overall_band
+                } for it in items
+            ]
+        })
+
+    resp = openai_client.chat.completions.create(
+        model=MODEL_ID,
+        messages=prompt_templates.build_messages(
+            "section_summaries", language, difficulty, prompt_templates.section_summaries_user(payload),
+        ),
+        temperature=0.3,
+        max_tokens=500,
+        response_format={"type": "json_object"},
+        timeout=30,
+    )
+    if answered_by_fallback(resp):
+        # Not stored as the section's score: the section_report job fails and is retried
+        raise ModelUnavailable("report model unavailable")
+
+    raw = (resp.choices[0].message.content or "").strip()
+
+    try:
+        parsed = fast_json.loads(raw)
+    except json.JSONDecodeError:
+        print("SECTION SUMMARY RAW (bad JSON):", raw)
+        return []
+
+    return parsed.get("sections", [])
+
+
+def _as_list(value):
+    if isinstance(value, list):
+        return [str(v) for v in value if v]
+    if isinstance(value, str) and value.strip():
+        return [value.strip()]
+    return []
+
+
+def _as_score(value):
+    try:
+        return max(0, min(10, int(round(float(value)))))
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bands(value):
+    if not isinstance(value, dict):
+        return {}
+    return {k: v for k, v in value.items() if k in progress.SKILLS and v in progress.BAND_VALUES}
+
+
+def _get_or_create_row(db, session_id: int, section: str) -> ExamSectionReport:
+    row = db.query(ExamSectionReport).filter_by(session_id=session_id, section=section).first()
+    if row:
+        return row
+    row = ExamSectionReport(session_id=session_id, section=section, status="pending")
+    db.add(row)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker created it first
+        db.rollback()
+        row = db.query(ExamSectionReport).filter_by(session_id=session_id, section=section).one()
+    return row
+
+
+def compute_section_report(session_id: int, section: str) -> str:
+    """ Summarises one section of a session and stores the result. Never raises; returns the row's status. """
+    db = SessionLocal()
+    try:
+        session = db.get(ExamSession, session_id)
+        if not session:
+            return "missing"
+
+        answered = [
+            t for t in archive.hydrate(db, db.query(ExamTurn)
+            .filter(ExamTurn.session_id == session_id, ExamTurn.section == section)
+            .order_by(ExamTurn.question_number.asc())
+            .all())
+            if (t.transcript or "").strip()
+        ]
+        row = _get_or_create_row(db, session_id, section)
+        row.answer_count = len(answered)
+
+        result = None
+        if answered:
+            try:
+                results = summarize_sections_with_ai(session.language, session.difficulty, answered)
+            except Exception as e:
+                print("SECTION REPORT ERROR:", section, type(e).__name__, e)
+                results = []
+            result = next((r for r in results if r.get("section") == section), None)
+            if result is None and len(results) == 1:
+                result = results[0]
+
+        if answered and result is None:
+            row.status = "failed"
+        else:
+            result = result or {}
+            old_score, old_bands = row.score, json.loads(row.bands or "{}")
+            row.status = "done"
+            row.score = _as_score(result.get("score"))
+            row.summary_en = (result.get("summary_en") or "").strip()
+            row.strengths = json.dumps(_as_list(result.get("strengths")), ensure_ascii=False)
+            row.improvements = json.dumps(_as_list(result.get("improvements")), ensure_ascii=False)
+            row.bands = json.dumps(_as_bands(result.get("bands")), ensure_ascii=False)
+            if answered:
+                # Same transaction as the report row, so the aggregates can't drift from the reports
+                progress.apply_section_report(db, session.user_id, row, old_score, old_bands)
+        db.commit()
+        return row.status
+    except Exception as e:
+        db.rollback()
+        print("SECTION REPORT ERROR:", section, type(e).__name__, e)
+        return "failed"
+    finally:
+        db.close()
+
+
+def schedule_section_report(session_id: int, section: str, user_id: int = None) -> int:
+    """ Queues the summary of one section. Returns the job id. """
+    return jobs.enqueue(
+        "section_report", {"session_id": session_id, "section": section}, ref=section_ref(session_id),
+        user_id=user_id,
+    )
+
+
+@jobs.handler("section_report")
+def _section_report_job(payload: dict):
+    status = compute_section_report(payload["session_id"], payload["section"])
+    exam_events.publish(payload["session_id"], "section_report", {"section": payload["section"], "status": status})
+    if status == "failed":
+        # Raising lets the job runner retry with backoff
+        raise RuntimeError(f"section {payload['section']!r} could not be summarised")
+    return {"status": status}
+
+
+def merge_section_reports(rows) -> dict:
+    """ Combines section rows into the report shape exam_finish returns. """
+    section_scores = {}
+    section_feedback = []
+    strengths, weaknesses = [], []
+    weighted, weight = 0, 0
+
+    for row in rows:
+        if row.status != "done":
+            continue
+        row_strengths = json.loads(row.strengths or "[]")
+        row_improvements = json.loads(row.improvements or "[]")
+        if row.score is not None:
+            section_scores[row.section] = row.score
+            weighted += row.score * max(row.answer_count, 1)
+            weight += max(row.answer_count, 1)
+        section_feedback.append({
+            "section": row.section,
+            "summary_en": row.summary_en or "",
+            "strengths": row_strengths,
+            "improvements": row_improvements,
+        })
+        # The first point of each section makes a balanced overall list
+        if row_strengths and row_strengths[0] not in strengths:
+            strengths.append(row_strengths[0])
+        if row_improvements and row_improvements[0] not in weaknesses:
+            weaknesses.append(row_improvements[0])
+
+    weaknesses = weaknesses[:3]
+
+    return {
+        "section_scores": section_scores,
+        "section_feedback": section_feedback,
+        "overall_strengths": strengths[:3],
+        "overall_weaknesses": weaknesses,
+        "overall_score": round(weighted / weight) if weight else 0,
+    }
+
+
+def stale_sections(db, session, turns) -> list:
+    """ Answered sections whose report is missing (finished early), failed, or older than the last answer. """
+    answered_counts = {}
+    for t in turns:
+        if (t.transcript or "").strip():
+            answered_counts[t.section] = answered_counts.get(t.section, 0) + 1
+    rows = {r.section: r for r in db.query(ExamSectionReport).filter_by(session_id=session.id).all()}
+    return [
+        section for section, count in answered_counts.items()
+        if section not in rows or rows[section].status != "done" or rows[section].answer_count != count
+    ]
+
+
+def build_final_report(db, session, turns) -> dict:
+    """
+    The end-of-exam report from the per-section rows.
+    Usually every section is already done and this is a single query; otherwise it computes what is
+    still missing itself, right away (the exam_report job first gives running section jobs a chance).
+    Raises ReportIncomplete if a section still has no summary after that.
+    """
+    stale = stale_sections(db, session, turns)
+    for section in stale:
+        compute_section_report(session.id, section)
+    if stale:
+        db.expire_all()
+
+    answered = []
+    for t in turns:
+        if (t.transcript or "").strip() and t.section not in answered:
+            answered.append(t.section)
+    rows = {r.section: r for r in db.query(ExamSectionReport).filter_by(session_id=session.id).all()}
+    missing = [s for s in answered if s not in rows or rows[s].status != "done"]
+    if missing:
+        raise ReportIncomplete(f"sections not summarised: {', '.join(missing)}")
+    return merge_section_reports(rows[s] for s in answered)
+
+
+def finalize_report(db, session) -> str:
+    """
+    Builds, stores and counts the report of a completed session (commits). Returns the stored JSON.
+    Raises ReportIncomplete (nothing stored) while a section can't be summarised.
+    The report is stored only while report_json is still NULL, and the exam is counted in the same
+    transaction, so only the caller whose UPDATE wins counts it; the others return the winner's report.
+    """
+    turns = archive.hydrate(db, db.query(ExamTurn).filter(
+        ExamTurn.session_id == session.id
+    ).order_by(ExamTurn.question_number.asc()).all())
+
+    report = build_final_report(db, session, turns)
+    claimed = db.execute(
+        update(ExamSession)
+        .where(ExamSession.id == session.id, ExamSession.report_json.is_(None))
+        .values(**report_columns(session, report))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != 1:
+        # Stored by another request or the exam_report job in the meantime
+        db.rollback()
+        db.refresh(session)
+        return session.report_json
+
+    db.refresh(session)
+    progress.apply_finished_exam(db, session)
+    db.commit()
+    exam_events.publish(session.id, "report_ready", {"report_url": f"/api/exam/{session.id}/report"})
+    return session.report_json
+
+
+@jobs.handler("exam_report")
+def _exam_report_job(payload: dict):
+    db = SessionLocal()
+    try:
+        session = db.get(ExamSession, payload["session_id"])
+        if session is None:
+            return None
+        if not session.report_json:  # finalize_report stores and counts it only once anyway
+            # Section jobs still running: look again shortly instead of holding this job thread
+            if jobs.pending_for(db, section_ref(session.id)) and time.time() < payload.get("wait_until", 0):
+                raise jobs.Retry(FINISH_RECHECK_SECONDS, "section reports still running")
+            finalize_report(db, session)
+        return {"session_id": session.id, "report_url": f"/api/exam/{session.id}/report"}
+    finally:
+        db.close()
+
+
+def report_columns(session, report: dict) -> dict:
+    """
+    The exam_sessions columns that store a finished report: report_json, plus the summary columns
+    that the developer dashboard and history list read.
+    """
+    payload = {
+        "status": session.status,
+        "language": session.language,
+        "difficulty": session.difficulty,
+        "overall_score": report.get("overall_score"),
+        "overall_strengths": report.get("overall_strengths", []),
+        "overall_weaknesses": report.get("overall_weaknesses", []),
+        "section_scores": report.get("section_scores", {}),
+        "section_feedback": report.get("section_feedback", []),
+    }
+    columns = {
+        "report_json": json.dumps(payload, ensure_ascii=False, sort_keys=True),
+        "report_generated_at": datetime.utcnow(),
+        "overall_score": payload["overall_score"],
+        "summary_feedback_en": "\n".join(
+            f"{f['section']}: {f['summary_en']}" for f in payload["section_feedback"] if f.get("summary_en")
+        ),
+        "major_mistakes_en": "\n".join(payload["overall_weaknesses"]),
+    }
+    if payload["section_scores"]:
+        columns["overall_band"] = progress.band_for_score(payload["overall_score"] or 0)
+    return columns
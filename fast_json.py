@@ -0,0 +1,78 @@
+# fast_json.py
+# JSON for API responses and model output, through orjson when it is installed (stdlib json otherwise).
+# - init_app() installs OrjsonProvider as the app's JSON provider, so every jsonify() goes through it;
+#   response bodies are built as bytes directly, without a str round trip
+# - datetimes and dates are written as ISO 8601 by the serializer itself (orjson does it in C), so
+#   serializers.py can hand over raw column values instead of calling isoformat() per row
+# - loads() parses model replies; orjson's decode error subclasses json.JSONDecodeError, so existing
+#   `except json.JSONDecodeError` handlers keep working
+# Output matches the stdlib provider: sorted keys, ISO dates (instead of Flask's HTTP-date default).
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib
+    orjson = None
+
+
+def _default(o):
+    """ Types neither serializer handles natively. """
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    if hasattr(o, "item"):  # numpy scalars
+        return o.item()
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+
+    def loads(s):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, default=_default, sort_keys=sort_keys, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    def loads(s):
+        return json.loads(s)
+
+
+def dumps(obj, sort_keys: bool = False) -> str:
+    return dumps_bytes(obj, sort_keys).decode("utf-8")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """ Flask JSON provider on top of dumps_bytes/loads. Calls with stdlib-only options (indent, cls...) use the stdlib. """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.sort_keys).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app) -> None:
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+# Serving settings, picked up automatically by `gunicorn application:application`.
+# Most of a request's time is spent waiting on the model API, so by default each worker process
+# runs gevent: every request is a greenlet and a process can hold GUNICORN_CONNECTIONS requests
+# that are waiting on the network, instead of one per process (or per thread).
+# - The openai/httpx client, the database drivers and the job threads all cooperate once gevent
+#   has patched the standard library (the gevent worker does this before the app is imported)
+# - psycopg2 needs psycogreen for that, see post_fork() below
+# - Without gevent installed it falls back to threaded workers
+#
+#   gunicorn application:application                          # defaults below
+#   GUNICORN_WORKER_CLASS=gthread gunicorn application:application
+import multiprocessing
+import os
+
+try:
+    import gevent  # noqa: F401
+    _default_class = "gevent"
+except ImportError:
+    _default_class = "gthread"
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", _default_class)
+# A few processes are enough when they don't block on I/O; one per core uses the CPU for JSON/templates
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 4))))
+# gevent: concurrent requests per process; gthread: threads per process
+worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "1000"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Model calls take up to ~30 s (their own timeout); give them room before the worker is killed
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "90"))
+graceful_timeout = 30
+keepalive = 5
+
+# Loading the app in each worker (not preload) lets gevent patch before anything opens sockets
+preload_app = False
+
+
+def post_fork(server, worker):
+    if worker_class != "gevent":
+        return
+    from config import settings
+    if settings.DATABASE_URL.startswith("postgresql"):
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen is not installed: Postgres queries will block the worker")
@@ -0,0 +1,33 @@
+# http_cache.py
+# Conditional GET for read-only JSON endpoints.
+#   @bp.get("/logs")
+#   @login_required
+#   @etagged
+#   def list_logs(): ...
+# The view still runs; @etagged adds a weak ETag (a hash of the body) and answers a matching
+# If-None-Match with 304 and no body. A polling page (job status, progress) or a re-opened dashboard
+# then skips the transfer, the compression and the client-side parse whenever nothing changed.
+# Responses are per user, so they are "private, no-cache": the browser keeps them but always revalidates.
+# The ETag is taken before compression.py encodes the body; being weak, it covers every encoding.
+from functools import wraps
+
+from flask import make_response, request
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def etagged(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if (
+            request.method not in ("GET", "HEAD")
+            or response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+        ):
+            return response
+        response.add_etag(weak=True)
+        response.headers.setdefault("Cache-Control", CACHE_CONTROL)
+        return response.make_conditional(request)
+    return wrapper
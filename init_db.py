@@ -1,10 +1,11 @@
-from db import engine, Base
-from models import AnalysisLog  # ensures the model is  registered
+# init_db.py
+# Creates a new database, or brings an existing one up to date. Same as `python migrate.py`:
+# an empty database is created from models.py, an existing one gets its pending migrations.
+#   python init_db.py
+import migrate
 
 def main():
-    # Create all tables defined on Base metadata ( includes AnalysisLog)
-    Base.metadata.create_all(bind=engine) # Looks at every model registered under base, and makes sure a corresponding table exists in the connected database
-    print("✅ Database tables created.")
+    migrate.upgrade()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,288 @@
+# jobs.py
+# A small durable job queue on top of the "jobs" table.
+# - enqueue() stores a job; handlers are registered with @handler("kind") in the module that owns the work
+# - Jobs are claimed with one conditional UPDATE (plus FOR UPDATE SKIP LOCKED on Postgres), so any number
+#   of web processes and worker.py processes can pull from the same table without running a job twice
+# - A failing job is retried with exponential backoff, then marked failed with its last error
+# - While a handler runs, a heartbeat thread keeps refreshing the job's locked_at; jobs left "running" by a
+#   process that died stop getting it and are put back in the queue after STALE_AFTER (long jobs are safe)
+# - A handler that has to wait for other jobs raises Retry(seconds) instead of blocking its thread
+# JOB_RUNNER in config.py decides where jobs run (threads in the web process, worker.py, or inline).
+import importlib
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import model_usage
+from config import settings
+from db import SessionLocal, engine
+from models import Job
+
+HANDLERS = {}
+
+# Modules that register handlers; imported by load_handlers() so a bare worker knows every job kind
+HANDLER_MODULES = ("exam_reports", "routes_ai", "tts_cache", "progress", "archive")
+
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 300
+STALE_AFTER = timedelta(minutes=10)
+HEARTBEAT_SECONDS = 60  # well under STALE_AFTER
+
+class Retry(Exception):
+    """ Raised by a handler to run the job again after `seconds`, without using up an attempt. """
+
+    def __init__(self, seconds: float, reason: str = ""):
+        super().__init__(reason or f"retry in {seconds}s")
+        self.seconds = seconds
+
+
+_wake = threading.Event()
+_runner_threads = []
+
+
+def handler(kind: str):
+    """ Registers fn(payload: dict) -> JSON-serialisable result as the handler for a job kind. """
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def load_handlers():
+    for name in HANDLER_MODULES:
+        importlib.import_module(name)
+
+
+def worker_name(suffix: str = "") -> str:
+    return f"{socket.gethostname()}:{os.getpid()}{suffix}"[:80]
+
+
+def enqueue(kind: str, payload: dict = None, ref: str = None, user_id: int = None,
+            delay_seconds: float = 0, max_attempts: int = 3) -> int:
+    """ Stores a job and returns its id. Commits in its own session, so it can be called from anywhere. """
+    db = SessionLocal()
+    try:
+        job = Job(
+            kind=kind,
+            payload=json.dumps(payload or {}, ensure_ascii=False),
+            ref=ref,
+            user_id=user_id,
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    if settings.JOB_RUNNER == "inline":
+        run_job(job_id, worker_name("/inline"))
+    else:
+        _wake.set()
+    return job_id
+
+
+def claim_next(worker: str):
+    """ Atomically moves the oldest due job to "running" for this worker. Returns its id or None. """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        q = (
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+        )
+        if engine.dialect.name == "postgresql":
+            q = q.with_for_update(skip_locked=True)
+        job_id = db.execute(q).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+
+        # Only one claimer can win: the row must still be queued when the UPDATE runs
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", locked_by=worker, locked_at=now, attempts=Job.attempts + 1)
+        ).rowcount
+        db.commit()
+        return job_id if claimed == 1 else None
+    finally:
+        db.close()
+
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+@contextmanager
+def _heartbeat(job_id: int, worker: str):
+    """ Refreshes locked_at every HEARTBEAT_SECONDS while the block runs, so requeue_stale leaves the job alone. """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "running", Job.locked_by == worker)
+                    .values(locked_at=datetime.utcnow())
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"JOB {job_id} heartbeat failed:", type(e).__name__, e)
+            finally:
+                db.close()
+
+    t = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join()
+
+
+def run_job(job_id: int, worker: str) -> None:
+    """ Runs one claimed job (or an unclaimed one, for JOB_RUNNER=inline) and records the outcome. """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return
+        if job.status == "queued":  # inline mode: claim it here
+            job.status, job.locked_by, job.locked_at = "running", worker, datetime.utcnow()
+            job.attempts += 1
+            db.commit()
+
+        fn = HANDLERS.get(job.kind)
+        payload = json.loads(job.payload or "{}")
+        kind, attempts, max_attempts, user_id = job.kind, job.attempts, job.max_attempts, job.user_id
+        db.commit()  # don't hold a transaction open while the handler runs (model calls take seconds)
+
+        try:
+            if fn is None:
+                raise LookupError(f"no handler registered for job kind {kind!r}")
+            with _heartbeat(job_id, worker), model_usage.job_context(kind, user_id):
+                result = fn(payload)
+        except Retry as r:
+            job = db.get(Job, job_id)
+            job.status, job.locked_by, job.locked_at = "queued", None, None
+            job.attempts = max(job.attempts - 1, 0)
+            job.run_after = datetime.utcnow() + timedelta(seconds=r.seconds)
+            db.commit()
+            return
+        except Exception as e:
+            print(f"JOB {job_id} ({kind}) failed on attempt {attempts}:", type(e).__name__, e)
+            job = db.get(Job, job_id)
+            job.last_error = "".join(traceback.format_exception_only(type(e), e)).strip()[:2000]
+            job.locked_by = job.locked_at = None
+            if attempts < max_attempts:
+                job.status = "queued"
+                job.run_after = datetime.utcnow() + timedelta(seconds=_backoff(attempts))
+            else:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+            db.commit()
+            return
+
+        job = db.get(Job, job_id)
+        job.status = "done"
+        job.result = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_stale() -> int:
+    """
+    Puts back jobs whose worker disappeared mid-run. A job that has used up its attempts (one that
+    crashes or kills its worker every time) is marked failed instead. Returns how many were requeued.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        stale = (Job.status == "running", Job.locked_at < now - STALE_AFTER)
+        db.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status="failed", locked_by=None, locked_at=None, finished_at=now,
+                    last_error="worker stopped while running the job (no attempts left)")
+        )
+        count = db.execute(
+            update(Job)
+            .where(*stale, Job.attempts < Job.max_attempts)
+            .values(status="queued", locked_by=None, locked_at=None, run_after=now)
+        ).rowcount
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def work(worker: str, stop: threading.Event, poll_seconds: float = None) -> None:
+    """ Claim-and-run loop used by the in-process threads and by worker.py. """
+    poll_seconds = poll_seconds or settings.JOB_POLL_SECONDS
+    last_stale_check = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_stale_check > 60:
+                requeue_stale()
+                last_stale_check = time.monotonic()
+
+            job_id = claim_next(worker)
+            if job_id is not None:
+                run_job(job_id, worker)
+                continue
+        except Exception as e:
+            # e.g. "database is locked" under SQLite; back off and keep the loop alive
+            print("JOB RUNNER ERROR:", type(e).__name__, e)
+
+        _wake.wait(poll_seconds)
+        _wake.clear()
+
+
+def start_runner(threads: int = None) -> None:
+    """ Starts the in-process job threads (JOB_RUNNER=thread). Safe to call more than once. """
+    if settings.JOB_RUNNER != "thread" or _runner_threads:
+        return
+    load_handlers()
+    stop = threading.Event()
+    for i in range(threads or settings.JOB_THREADS):
+        t = threading.Thread(target=work, args=(worker_name(f"/t{i}"), stop), name=f"job-runner-{i}", daemon=True)
+        t.start()
+        _runner_threads.append(t)
+
+
+def job_status(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.last_error if job.status == "failed" else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def pending_for(db, ref: str) -> int:
+    """ How many jobs about `ref` are still queued or running. """
+    return db.query(Job).filter(Job.ref == ref, Job.status.in_(("queued", "running"))).count()
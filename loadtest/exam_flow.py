@@ -0,0 +1,224 @@
+# loadtest/exam_flow.py
+# Drives full mock exams against a running server and reports latency per endpoint.
+# Each virtual student: signup -> exam/start -> exam/submit (audio) x N -> exam/finish
+#
+# Typical run (three terminals):
+#   python loadtest/mock_openai_server.py --port 8089
+#   DATABASE_URL=sqlite:///loadtest.db python migrate.py
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock DATABASE_URL=sqlite:///loadtest.db \
+#       LOGIN_RATE_LIMIT_IP=0 gunicorn -w 4 -b 127.0.0.1:8000 application:application
+#   python loadtest/exam_flow.py --base-url http://127.0.0.1:8000 --students 40 --concurrency 20
+# Every answer uploads different bytes, like real students, so the transcript cache (stt_cache.py) never
+# answers for the model; --repeat-audio sends one blob everywhere to measure the cache-hit path instead.
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+LANGUAGES = {"english": "en", "french": "fr", "german": "de"}
+
+FAKE_AUDIO_BYTES = 16000
+
+
+def fake_audio(seed) -> bytes:
+    """ A few seconds of fake "audio"; the mock server ignores the content, the app only checks the size. """
+    return random.Random(seed).randbytes(FAKE_AUDIO_BYTES)
+
+
+class Results:
+    """ Thread-safe latency samples per endpoint. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started
+        out = {}
+        for endpoint, values in self.samples.items():
+            values = sorted(values)
+            out[endpoint] = {
+                "count": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "rps": round(len(values) / wall, 2) if wall else 0.0,
+            }
+        return out
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """ Nearest-rank percentile of an already sorted list. """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Student:
+    """ One browser: its own cookie jar, so Flask-Login sessions stay separate. """
+
+    def __init__(self, base_url: str, results: Results, timeout: float, audio_seed=None):
+        self.base_url = base_url.rstrip("/")
+        self.results = results
+        self.timeout = timeout
+        # None: the same audio for every answer of every student
+        self.audio_seed = audio_seed
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, name: str, path: str, data: bytes = None, headers: dict = None, method: str = "POST"):
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {}, method=method)
+        start = time.perf_counter()
+        status, body = 0, b""
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                status, body = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except OSError:
+            status = 0
+        self.results.add(name, time.perf_counter() - start, 200 <= status < 400)
+        return status, body
+
+    def post_json(self, name: str, path: str, payload: dict) -> dict:
+        status, body = self.request(name, path, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+        if not 200 <= status < 300:
+            raise RuntimeError(f"{name} failed with HTTP {status}: {body[:200]!r}")
+        return json.loads(body or b"{}")
+
+    def get_json(self, name: str, path: str) -> dict:
+        status, body = self.request(name, path, method="GET")
+        if not 200 <= status < 300:
+            raise RuntimeError(f"{name} failed with HTTP {status}: {body[:200]!r}")
+        return json.loads(body or b"{}")
+
+    def post_form(self, name: str, path: str, fields: dict):
+        return self.request(name, path, urllib.parse.urlencode(fields).encode(),
+                            {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def post_audio(self, name: str, path: str, fields: dict, audio: bytes) -> dict:
+        boundary = uuid.uuid4().hex
+        parts = []
+        for key, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="speech.webm"\r\n'
+            "Content-Type: audio/webm\r\n\r\n".encode() + audio + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode())
+        status, body = self.request(name, path, b"".join(parts),
+                                    {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        if not 200 <= status < 300:
+            raise RuntimeError(f"{name} failed with HTTP {status}: {body[:200]!r}")
+        return json.loads(body or b"{}")
+
+    def audio_for(self, question_number: int) -> bytes:
+        if self.audio_seed is None:
+            return fake_audio(0)
+        return fake_audio(f"{self.audio_seed}:{question_number}")
+
+    def run_exam(self, language: str, difficulty: str, total_questions: int):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.post_form("auth/signup", "/auth/signup", {"email": email, "password": "loadtest-password"})
+
+        exam = self.post_json("exam/start", "/api/exam/start", {
+            "language": language, "difficulty": difficulty, "total_questions": total_questions,
+        })
+        session_id, question_number = exam["session_id"], exam["question_number"]
+
+        while True:
+            # One request per answer, like the browser: transcribe + save + next question
+            answer = self.post_audio("exam/submit", "/api/exam/submit", {
+                "lang": LANGUAGES[language],
+                "session_id": session_id,
+                "question_number": question_number,
+            }, self.audio_for(question_number))
+            if answer.get("done"):
+                break
+            question_number = answer["question_number"]
+
+        report = self.post_json("exam/finish", "/api/exam/finish", {"session_id": session_id})
+        # 202: the report is built by a background job; poll it like the browser does
+        if report.get("status") == "pending":
+            while self.get_json("jobs/status", report["status_url"])["status"] not in ("done", "failed"):
+                time.sleep(1)
+            self.get_json("exam/report", report["report_url"])
+
+
+def print_table(summary: dict):
+    header = f"{'endpoint':<14}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in sorted(summary.items()):
+        print(f"{endpoint:<14}{s['count']:>7}{s['errors']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}"
+              f"{s['p99_ms']:>10}{s['rps']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end mock exam load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=20, help="total number of exams to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="exams running at the same time")
+    parser.add_argument("--questions", type=int, default=15, choices=(5, 10, 15))
+    parser.add_argument("--difficulty", default="moderate", choices=("beginner", "moderate", "expert"))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat-audio", action="store_true",
+                        help="upload the same audio for every answer (transcript cache hits after the first)")
+    parser.add_argument("--json", dest="json_path", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    languages = [rng.choice(list(LANGUAGES)) for _ in range(args.students)]
+    results = Results()
+    failures = []
+
+    def one(language):
+        # Not derived from --seed: transcripts are cached in the database, so a second run would hit them
+        audio_seed = None if args.repeat_audio else uuid.uuid4().hex
+        try:
+            Student(args.base_url, results, args.timeout, audio_seed).run_exam(
+                language, args.difficulty, args.questions)
+        except Exception as e:
+            failures.append(str(e))
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, languages))
+    results.finished = time.perf_counter()
+
+    summary = results.summary()
+    wall = results.finished - results.started
+    print(f"\n{args.students} exams, concurrency {args.concurrency}, {wall:.1f}s wall time, "
+          f"{len(failures)} failed exams\n")
+    print_table(summary)
+    for msg in failures[:5]:
+        print("  failure:", msg)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "wall_seconds": round(wall, 2), "failed_exams": len(failures),
+                       "endpoints": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
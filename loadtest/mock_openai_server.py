@@ -0,0 +1,210 @@
+# loadtest/mock_openai_server.py
+# A local, deterministic stand-in for the OpenAI HTTP API, for load testing.
+# - /v1/chat/completions   canned answers for every prompt in routes_ai.py (JSON mode + streaming)
+# - /v1/audio/transcriptions   canned transcript (whisper-1)
+# - /v1/audio/speech   silent MP3 (gpt-4o-mini-tts)
+# Each endpoint sleeps for a latency drawn from a configurable distribution and can fail at a set rate.
+#
+# Usage:
+#   python loadtest/mock_openai_server.py --port 8089 --latency chat=lognormal:900:0.4 --error-rate 0.01
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock gunicorn -w 4 application:application
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import local_model  # noqa: E402  (reuses the same canned answers as MODEL_BACKEND=local)
+
+# Default latency per endpoint, roughly what the real API does for our prompts (milliseconds)
+DEFAULT_LATENCY = {
+    "chat": "lognormal:900:0.4",
+    "stt": "lognormal:700:0.3",
+    "tts": "lognormal:600:0.3",
+}
+
+
+class Latency:
+    """
+    Parses a latency spec and draws samples in seconds:
+      fixed:MS
+      uniform:MIN_MS:MAX_MS
+      normal:MEAN_MS:STDDEV_MS
+      lognormal:MEDIAN_MS:SIGMA   (long right tail, like real model calls)
+    """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(p[0], p[1])
+        else:
+            ms = p[0] * rng.lognormvariate(0, p[1])
+        return max(ms, 0.0) / 1000
+
+
+class MockState:
+    def __init__(self, latency: dict, error_rate: float, seed: int):
+        self.latency = {k: Latency(v) for k, v in latency.items()}
+        self.error_rate = error_rate
+        # One RNG shared by all handler threads, guarded by a lock so runs are repeatable for a seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def draw(self, endpoint: str):
+        """ Returns (delay seconds, should_fail) for one request. """
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            delay = self.latency[endpoint].sample(self.rng)
+            fail = self.rng.random() < self.error_rate
+        return delay, fail
+
+
+def _multipart_field(body: bytes, name: str) -> str:
+    # Only used for small text fields (language, response_format), so a regex is enough
+    m = re.search(rb'name="' + name.encode() + rb'"\r\n\r\n([^\r]*)\r\n', body)
+    return m.group(1).decode() if m else ""
+
+
+class Handler(BaseHTTPRequestHandler):
+    state: MockState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass  # keep the console quiet under load
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self):
+        body = {"error": {"message": "mock upstream error", "type": "server_error", "code": None}}
+        self._send(500, json.dumps(body).encode())
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            return self._send(200, json.dumps(self.state.counts).encode())
+        self._send(404, b'{"error": {"message": "not found"}}')
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path.endswith("/chat/completions"):
+            endpoint = "chat"
+        elif path.endswith("/audio/transcriptions"):
+            endpoint = "stt"
+        elif path.endswith("/audio/speech"):
+            endpoint = "tts"
+        else:
+            return self._send(404, b'{"error": {"message": "not found"}}')
+
+        delay, fail = self.state.draw(endpoint)
+        time.sleep(delay)
+        if fail:
+            return self._error()
+
+        if endpoint == "chat":
+            return self._chat(json.loads(body or b"{}"))
+        if endpoint == "stt":
+            return self._stt(body)
+        return self._send(200, local_model.SILENT_MP3, "audio/mpeg")
+
+    def _chat(self, req: dict):
+        messages = req.get("messages") or []
+        content = local_model.complete(messages, req.get("response_format"))
+        model = req.get("model") or "gpt-4o-mini"
+        created = int(time.time())
+
+        if req.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, piece in enumerate(re.findall(r"\S+\s*", content)):
+                chunk = {
+                    "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": ({"role": "assistant"} if i == 0 else {}) | {"content": piece},
+                                 "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            done = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+            self.close_connection = True
+            return
+
+        usage = local_model.estimate_usage(messages, content)
+        resp = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            },
+        }
+        self._send(200, json.dumps(resp, ensure_ascii=False).encode())
+
+    def _stt(self, body: bytes):
+        language = _multipart_field(body, "language") or "en"
+        text = local_model.LOCAL_TRANSCRIPTS.get(language, local_model.LOCAL_TRANSCRIPTS["en"])
+        if _multipart_field(body, "response_format") == "text":
+            return self._send(200, text.encode(), "text/plain; charset=utf-8")
+        self._send(200, json.dumps({"text": text}, ensure_ascii=False).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", action="append", default=[],
+                        help="ENDPOINT=SPEC, e.g. chat=lognormal:900:0.4 or stt=fixed:0 (endpoints: chat, stt, tts)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that return HTTP 500")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    latency = dict(DEFAULT_LATENCY)
+    for item in args.latency:
+        endpoint, _, spec = item.partition("=")
+        if endpoint not in latency:
+            parser.error(f"unknown endpoint in --latency: {endpoint}")
+        latency[endpoint] = spec
+
+    Handler.state = MockState(latency, args.error_rate, args.seed)
+    random.seed(args.seed)  # local_model picks bank questions with the module-level RNG
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1  latency={latency} error_rate={args.error_rate}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# local_model.py
+# Offline stand-in for the OpenAI client.
+# - Answers the same prompts routes_ai.py and routes_speech.py send, with the same JSON shapes
+# - Questions come from the exam question bank, scores from simple transcript rules
+# - No network, near-zero latency: used for load tests, CI and as a fallback when the provider is down
+import json
+import random
+import re
+
+import question_bank
+from progress import band_for_score
+
+LANGUAGE_CODES = {"English": "english", "French": "french", "German": "german"}
+
+# Maps the practice-mode topic names onto bank sections
+TOPIC_SECTIONS = {
+    "introducing yourself": "introduction",
+    "school life": "school",
+    "hobbies and free time": "hobbies",
+    "family and friends": "family_friends",
+    "future plans": "future_plans",
+}
+
+LOCAL_TRANSCRIPTS = {
+    "en": "I live in Dublin with my family and I like playing football with my friends at the weekend.",
+    "fr": "J'habite à Lyon avec ma famille et j'aime jouer au football avec mes amis le week-end.",
+    "de": "Ich wohne in Berlin mit meiner Familie und ich spiele gern Fußball mit meinen Freunden.",
+}
+
+# One silent MPEG-1 Layer III frame (32 kbps, 44.1 kHz, mono): 4-byte header + zeroed side info/data.
+# ~38 frames make one second of silence; enough for the browser audio element to play.
+_SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x10, 0xC0]) + bytes(100)
+SILENT_MP3 = _SILENT_MP3_FRAME * 38
+
+
+# Helpers for reading the prompts
+
+def _find(pattern: str, text: str, default: str = "") -> str:
+    m = re.search(pattern, text)
+    return m.group(1).strip() if m else default
+
+
+def _language(system_msg: str, user_msg: str) -> str:
+    name = (
+        _find(r"exam language is (\w+)", system_msg)
+        or _find(r"Target language[^:]*: (\w+)", system_msg)
+        or _find(r"(?:Exam language|Language)[^:]*: (\w+)", system_msg + "\n" + user_msg)
+    )
+    return LANGUAGE_CODES.get(name.capitalize(), "english")
+
+
+def _difficulty(text: str) -> str:
+    level = _find(r"Difficulty: (\w+)", text).lower()
+    if level in ("beginner", "moderate", "expert"):
+        return level
+    if "A2" in text:
+        return "beginner"
+    if "B2" in text:
+        return "expert"
+    return "moderate"
+
+
+def _transcript(user_msg: str) -> str:
+    return _find(r"Student answer[^:]*: (.*)", user_msg)
+
+
+def _json_after(marker: str, user_msg: str):
+    _, _, tail = user_msg.partition(marker)
+    try:
+        return json.loads(tail.strip() or "[]")
+    except json.JSONDecodeError:
+        return []
+
+
+# Rule-based scoring
+
+def score_transcript(transcript: str) -> int:
+    """
+    0..10 score from length, sentence count and vocabulary variety.
+    Crude, but stable and in the same range the model uses.
+    """
+    words = re.findall(r"\w+", (transcript or "").lower())
+    if not words:
+        return 0
+    variety = len(set(words)) / len(words)
+    sentences = max(1, len(re.findall(r"[.!?]", transcript)))
+    score = 3 + min(len(words), 40) / 10 + min(sentences, 3) * 0.5 + variety * 2
+    return max(1, min(10, round(score)))
+
+
+# One function per prompt shape
+
+def _evaluate(system_msg: str, user_msg: str) -> dict:
+    transcript = _transcript(user_msg)
+    band = band_for_score(score_transcript(transcript))
+    return {
+        "feedback_en": ["Local scoring: feedback is based on answer length and variety only."],
+        "corrected_answer_target": transcript,
+        "tips_en": ["Add a reason or an example to extend your answer."],
+        "bands": {k: band for k in ("fluency", "grammar", "vocabulary", "pronunciation", "overall")},
+        "major_mistakes_en": [],
+    }
+
+
+def _exam_turn(system_msg: str, user_msg: str) -> dict:
+    score = score_transcript(_transcript(user_msg))
+    return {
+        "feedback": "Local scoring: feedback is based on answer length and variety only.",
+        "corrected_answer": "NO_CHANGES_NEEDED",
+        "tip": "Add a reason or an example to extend your answer.",
+        "score": score,
+        "next_question": _question(system_msg, user_msg),
+    }
+
+
+def _dictionary(system_msg: str, user_msg: str) -> dict:
+    term = _find(r"'(.+)'", user_msg)
+    return {
+        "headword": term,
+        "part_of_speech": "",
+        "meaning": f"(offline mode) No dictionary entry is available for '{term}'.",
+        "examples": [],
+        "synonyms": [],
+    }
+
+
+def _section_summaries(system_msg: str, user_msg: str) -> dict:
+    sections = []
+    for group in _json_after("Answers grouped by section (JSON):", user_msg):
+        answers = group.get("answers", [])
+        scores = [score_transcript(a.get("transcript", "")) for a in answers] or [0]
+        band = band_for_score(round(sum(scores) / len(scores)))
+        sections.append({
+            "section": group.get("section", ""),
+            "score": round(sum(scores) / len(scores)),
+            "bands": {k: band for k in ("fluency", "grammar", "vocabulary", "pronunciation")},
+            "summary_en": f"{len(answers)} answer(s) scored locally.",
+            "strengths": ["Answered the question."] if max(scores) >= 5 else [],
+            "improvements": ["Give longer answers with reasons and examples."],
+        })
+    return {"sections": sections}
+
+
+def _question(system_msg: str, user_msg: str) -> str:
+    """ Templated question generator: a bank question for the language/section other than the previous one. """
+    language = _language(system_msg, user_msg)
+    difficulty = _difficulty(system_msg + "\n" + user_msg)
+
+    section = _find(r"Section: (\w+)", user_msg)
+    topic = _find(r"main topic is: ([^.]+)\.", system_msg).lower()
+    section = section or TOPIC_SECTIONS.get(topic) or random.choice(list(TOPIC_SECTIONS.values()))
+
+    previous = _find(r"(?:Previous|Examiner) question: (.*)", user_msg)
+    ids = [
+        q for q in question_bank.question_ids(section, language, difficulty)
+        if question_bank.question_text(q) != previous
+    ]
+    if not ids:
+        return "Can you tell me more about that?"
+    return question_bank.question_text(random.choice(ids))
+
+
+def _feedback_text(system_msg: str, user_msg: str) -> str:
+    score = score_transcript(_transcript(user_msg))
+    return (
+        "1) Key mistake: not assessed in offline mode.\n"
+        "2) Corrected answer: not available in offline mode.\n"
+        f"3) Score: {score}/10"
+    )
+
+
+def complete(messages, response_format=None) -> str:
+    """
+    Produces the assistant message content for a chat request.
+    JSON prompts are recognised by the keys their system message asks for.
+    """
+    system_msg = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    user_msg = "\n".join(m["content"] for m in messages if m["role"] == "user")
+    wants_json = (response_format or {}).get("type") == "json_object"
+
+    if wants_json:
+        if "'sections'" in system_msg:
+            result = _section_summaries(system_msg, user_msg)
+        elif "headword" in system_msg:
+            result = _dictionary(system_msg, user_msg)
+        elif "next_question" in system_msg:
+            result = _exam_turn(system_msg, user_msg)
+        else:
+            result = _evaluate(system_msg, user_msg)
+        return json.dumps(result, ensure_ascii=False)
+
+    if "Question (optional):" in user_msg:
+        return _feedback_text(system_msg, user_msg)
+    if "question" in system_msg.lower():
+        return _question(system_msg, user_msg)
+    return "That's interesting. Can you tell me more about it?"
+
+
+# Duck-typed replacements for the parts of the OpenAI SDK the app uses
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def estimate_usage(messages, content: str):
+    # Rough token estimate (about 4 characters per token) so usage accounting still sees numbers
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    completion = len(content) // 4
+    return _Obj(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+
+class _ChatStream:
+    def __init__(self, content: str):
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for word in re.findall(r"\S+\s*", self.content):
+            yield _Obj(type="content.delta", delta=word)
+
+
+class _Completions:
+    def create(self, model=None, messages=(), response_format=None, **kwargs):
+        content = complete(messages, response_format)
+        return _Obj(
+            model=model,
+            choices=[_Obj(index=0, finish_reason="stop", message=_Obj(role="assistant", content=content))],
+            usage=estimate_usage(messages, content),
+        )
+
+    def stream(self, model=None, messages=(), **kwargs):
+        return _ChatStream(complete(messages))
+
+
+class _Transcriptions:
+    def create(self, model=None, file=None, language=None, response_format=None, **kwargs):
+        text = LOCAL_TRANSCRIPTS.get(language or "en", LOCAL_TRANSCRIPTS["en"])
+        return text if response_format == "text" else _Obj(text=text)
+
+
+class _SpeechResponse:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self) -> bytes:
+        return SILENT_MP3
+
+    def iter_bytes(self, chunk_size: int = 4096):
+        for i in range(0, len(SILENT_MP3), chunk_size):
+            yield SILENT_MP3[i:i + chunk_size]
+
+    def stream_to_file(self, path) -> None:
+        with open(path, "wb") as f:
+            f.write(SILENT_MP3)
+
+
+class _Speech:
+    def __init__(self):
+        self.with_streaming_response = self
+
+    def create(self, **kwargs):
+        return _SpeechResponse()
+
+
+class LocalClient:
+    """ Drop-in for openai.OpenAI covering chat, transcription and speech. """
+
+    def __init__(self):
+        self.chat = _Obj(completions=_Completions())
+        self.audio = _Obj(transcriptions=_Transcriptions(), speech=_Speech())
@@ -0,0 +1,222 @@
+# metrics.py
+# In-process instrumentation exported in Prometheus text format on GET /metrics.
+# - Per-endpoint request latency (Flask before/after request hooks)
+# - Query count and query time per request (SQLAlchemy engine events)
+# - Model calls: latency, tokens and errors per model (recorded by the wrapper in ai_client.py)
+# Every request also gets a Server-Timing header (db / model / total) so slow exam steps
+# can be read straight from the browser dev tools.
+#
+# Values live in the worker process; with several gunicorn workers each one is a separate
+# scrape target (or scrape through the load balancer and sum over instances).
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, g, has_app_context, request
+from sqlalchemy import event
+
+from config import settings
+
+# Seconds. Covers a few-ms DB lookup up to a slow model call.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_labels(self.label_names, label_values)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            s = self.series.get(label_values)
+            if s is None:
+                s = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            items = sorted((k, list(v)) for k, v in self.series.items())
+        for label_values, s in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, s):
+                cumulative += n
+                le = 'le="%g"' % bound
+                yield f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {s[-1]}"
+            yield f"{self.name}_sum{_labels(self.label_names, label_values)} {s[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.label_names, label_values)} {s[-1]}"
+
+
+#  Metric definitions
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request.", ("endpoint", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("endpoint",), COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", ("endpoint",),
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Time per SQL statement.", (), QUERY_BUCKETS,
+)
+MODEL_LATENCY = Histogram(
+    "model_call_duration_seconds", "Time per model API call.", ("kind", "model"),
+)
+MODEL_TOKENS = Counter(
+    "model_tokens_total", "Tokens reported by the model API.", ("kind", "model", "type"),
+)
+MODEL_ERRORS = Counter(
+    "model_call_errors_total", "Model API calls that raised.", ("kind", "model"),
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls_total", "Identical concurrent calls by role (single_flight.py): leader calls, others wait.",
+    ("kind", "role"),
+)
+
+REGISTRY = [
+    REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, DB_QUERY_LATENCY,
+    MODEL_LATENCY, MODEL_TOKENS, MODEL_ERRORS, COALESCED_CALLS,
+]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+#  Recording helpers
+
+def _request_bucket():
+    """ The per-request totals in flask.g, or None outside an instrumented request. """
+    if has_app_context():
+        return g.get("metrics")
+    return None
+
+
+def observe_model_call(kind: str, model: str, seconds: float, usage=None, failed: bool = False):
+    """ Called by ai_client.py after every chat / transcription / speech call. """
+    model = model or "unknown"
+    MODEL_LATENCY.observe(seconds, kind, model)
+    if failed:
+        MODEL_ERRORS.inc(kind, model)
+    if usage is not None:
+        MODEL_TOKENS.inc(kind, model, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        MODEL_TOKENS.inc(kind, model, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+    totals = _request_bucket()
+    if totals is not None:
+        totals["model_calls"] += 1
+        totals["model_seconds"] += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # One statement at a time per connection, so a single slot is enough (a failed statement just gets overwritten)
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    DB_QUERY_LATENCY.observe(elapsed)
+    totals = _request_bucket()
+    if totals is not None:
+        totals["db_queries"] += 1
+        totals["db_seconds"] += elapsed
+
+
+def instrument_engine(engine):
+    """ Times every statement executed on the engine. Safe to call more than once. """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_app(app, engine):
+    """ Installs the request hooks, the engine listeners and the /metrics route. """
+    instrument_engine(engine)
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics = {
+            "start": time.perf_counter(),
+            "db_queries": 0,
+            "db_seconds": 0.0,
+            "model_calls": 0,
+            "model_seconds": 0.0,
+        }
+
+    @app.after_request
+    def _metrics_finish(response):
+        totals = g.pop("metrics", None)
+        if totals is None:
+            return response
+        elapsed = time.perf_counter() - totals["start"]
+        endpoint = request.endpoint or "unmatched"  # keeps 404 scans from creating new series
+
+        REQUEST_LATENCY.observe(elapsed, endpoint, request.method, str(response.status_code))
+        REQUEST_QUERIES.observe(totals["db_queries"], endpoint)
+        REQUEST_DB_TIME.observe(totals["db_seconds"], endpoint)
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={totals["db_seconds"] * 1000:.1f};desc="{totals["db_queries"]} queries", '
+            f'model;dur={totals["model_seconds"] * 1000:.1f};desc="{totals["model_calls"]} calls", '
+            f"total;dur={elapsed * 1000:.1f}"
+        )
+        return response
+
+    @app.get("/metrics")
+    def metrics_view():
+        # Open by default like /health; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+        if settings.METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+            abort(401)
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
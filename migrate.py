@@ -0,0 +1,276 @@
+# migrate.py
+# Versioned schema migrations (replaces the old one-off migrate_*.py scripts).
+# Every file migrations/mNNNN_<name>.py is one revision with an upgrade(op) function. Applied revisions
+# are rows in schema_migrations, so each migration runs once per database, in order:
+#   python migrate.py                # apply pending migrations
+#   python migrate.py status         # applied revision, head, pending files
+#   python migrate.py stamp [N]      # record revisions up to N (default head) as applied without running them
+# - A new, empty database is created straight from models.py and stamped at head
+# - A database from before versioned migrations (tables but no schema_migrations) runs them all; the
+#   operations below skip whatever already exists, so that is safe on any of the old states
+# - Each migration runs in one transaction together with its schema_migrations row. TRANSACTIONAL = False
+#   runs it in autocommit instead, which Postgres needs for CREATE INDEX CONCURRENTLY (op.create_index)
+# - SQLite can't change a column's type: op.alter_column_type rebuilds the table there (copy into a new
+#   table, drop the old one, rename); Postgres uses ALTER COLUMN ... TYPE
+# - On Postgres an advisory lock keeps two deploys from migrating at the same time
+# create_app() only calls check_schema(): one query for the applied revision instead of reflecting tables.
+import argparse
+import importlib
+import pkgutil
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+import models  # noqa: F401  (registers every model on Base)
+from db import Base, engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+_FILE_NAME = re.compile(r"^m(\d{4})_\w+$")
+# pg_advisory_lock key for "a migration is running"
+ADVISORY_LOCK_ID = 7_401_047
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("revision", Integer, primary_key=True),
+    Column("name", String(120), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class SchemaOutOfDate(RuntimeError):
+    """ The database is behind the migrations this code ships with. """
+
+
+class Operations:
+    """ What a migration's upgrade(op) works with. Every operation is a no-op if its result already exists. """
+
+    def __init__(self, conn, transactional: bool = True):
+        self.conn = conn
+        self.transactional = transactional
+        self.dialect = conn.dialect.name
+
+    def execute(self, sql: str, **params):
+        return self.conn.execute(text(sql), params)
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in {c["name"] for c in inspect(self.conn).get_columns(table)}
+
+    def has_index(self, table: str, name: str) -> bool:
+        return any(i["name"] == name for i in inspect(self.conn).get_indexes(table))
+
+    def create_table(self, table: Table) -> None:
+        """ Creates a table from its models.py definition, indexes included, after the tables its foreign keys point at. """
+        if self.has_table(table.name):
+            return
+        for fk in table.foreign_keys:
+            if fk.column.table is not table:
+                self.create_table(fk.column.table)
+        table.create(self.conn)
+        print(f"   created table {table.name}")
+
+    def add_column(self, table: str, column: str, ddl: str) -> bool:
+        """ ALTER TABLE ... ADD COLUMN; ddl is the type and constraints, e.g. "INTEGER NOT NULL DEFAULT 0". """
+        if not self.has_table(table) or self.has_column(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        print(f"   added {table}.{column}")
+        return True
+
+    def _concurrently(self) -> bool:
+        return self.dialect == "postgresql" and not self.transactional
+
+    def create_index(self, name: str, table: str, columns, unique: bool = False) -> None:
+        """
+        On Postgres in a TRANSACTIONAL = False migration the index is built CONCURRENTLY, so the table
+        stays writable while it builds. A concurrent build that failed half-way leaves an invalid index
+        behind; it is dropped and built again.
+        """
+        if not self.has_table(table):
+            return
+        if self._concurrently():
+            invalid = self.execute(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid", name=name,
+            ).first()
+            if invalid:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        if self.has_index(table, name):
+            return
+        unique_sql = "UNIQUE " if unique else ""
+        concurrently = "CONCURRENTLY " if self._concurrently() else ""
+        self.execute(f"CREATE {unique_sql}INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        print(f"   created index {name}")
+
+    def drop_index(self, name: str) -> None:
+        concurrently = "CONCURRENTLY " if self._concurrently() else ""
+        self.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+    def alter_column_type(self, table: Table, column: str, type_sql: str) -> None:
+        """ Changes a column to type_sql; table is the models.py Table, which already has the new type. """
+        if self.dialect == "sqlite":
+            self.rebuild_table(table)
+        else:
+            self.execute(f"ALTER TABLE {table.name} ALTER COLUMN {column} TYPE {type_sql} USING {column}::{type_sql}")
+
+    def rebuild_table(self, table: Table) -> None:
+        """
+        SQLite "batch" rebuild: creates the table as models.py defines it under a temporary name, copies
+        the columns both versions have, drops the old table and renames the new one into place.
+        """
+        name, tmp = table.name, f"_rebuild_{table.name}"
+        old_columns = {c["name"] for c in inspect(self.conn).get_columns(name)}
+        columns = ", ".join(c.name for c in table.columns if c.name in old_columns)
+
+        # The copy's foreign keys need the tables they point at in its MetaData
+        copy_meta = MetaData()
+        for fk in table.foreign_keys:
+            if fk.column.table.name not in copy_meta.tables:
+                fk.column.table.to_metadata(copy_meta)
+
+        self.execute(f"DROP TABLE IF EXISTS {tmp}")
+        self.conn.execute(CreateTable(table.to_metadata(copy_meta, name=tmp)))
+        self.execute(f"INSERT INTO {tmp} ({columns}) SELECT {columns} FROM {name}")
+        self.execute(f"DROP TABLE {name}")
+        self.execute(f"ALTER TABLE {tmp} RENAME TO {name}")
+        for index in table.indexes:
+            index.create(self.conn)
+        print(f"   rebuilt table {name}")
+
+
+def available():
+    """ [(revision, module name)] in migrations/, in order. Only file names are read, nothing is imported. """
+    found = []
+    for info in pkgutil.iter_modules([str(MIGRATIONS_DIR)]):
+        match = _FILE_NAME.match(info.name)
+        if match:
+            found.append((int(match.group(1)), info.name))
+    return sorted(found)
+
+
+def head() -> int:
+    revisions = available()
+    return revisions[-1][0] if revisions else 0
+
+
+def current(conn):
+    """ The highest applied revision, or None when the database has no schema_migrations table. """
+    if not inspect(conn).has_table(schema_migrations.name):
+        return None
+    return conn.execute(select(func.max(schema_migrations.c.revision))).scalar() or 0
+
+
+def check_schema() -> int:
+    """ Startup check: raises SchemaOutOfDate unless every migration in migrations/ has been applied. """
+    expected = head()
+    with engine.connect() as conn:
+        revision = current(conn)
+    if revision is None or revision < expected:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {revision or 0}, this code needs {expected}. Run `python migrate.py`."
+        )
+    if revision > expected:
+        # Normal during a rolling deploy: the new release migrated, this process is still the old code
+        print(f"⚠️ Database schema revision {revision} is newer than this code ({expected}).")
+    return revision
+
+
+@contextmanager
+def _migration_lock():
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def _record(conn, revision: int, name: str) -> None:
+    conn.execute(schema_migrations.insert().values(revision=revision, name=name, applied_at=datetime.utcnow()))
+
+
+def stamp(target: int = None) -> None:
+    """ Records every revision up to target as applied, without running it. """
+    target = head() if target is None else target
+    _meta.create_all(bind=engine)
+    with engine.begin() as conn:
+        done = {r for (r,) in conn.execute(select(schema_migrations.c.revision))}
+        for revision, name in available():
+            if revision <= target and revision not in done:
+                _record(conn, revision, name)
+    print(f"✅ Database stamped at revision {target}.")
+
+
+def _apply(revision: int, name: str) -> None:
+    module = importlib.import_module(f"migrations.{name}")
+    transactional = getattr(module, "TRANSACTIONAL", True)
+    print(f"-> {name}: {module.DESCRIPTION}")
+    if transactional:
+        with engine.begin() as conn:
+            module.upgrade(Operations(conn, transactional=True))
+            _record(conn, revision, name)
+    else:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            module.upgrade(Operations(conn, transactional=False))
+            _record(conn, revision, name)
+
+
+def upgrade(target: int = None) -> int:
+    """ Applies the pending migrations up to target (default head); returns the revision reached. """
+    target = head() if target is None else target
+    with _migration_lock():
+        with engine.connect() as conn:
+            revision = current(conn)
+            fresh = revision is None and not inspect(conn).has_table("users")
+
+        if fresh:
+            Base.metadata.create_all(bind=engine)
+            stamp(target)
+            return target
+
+        _meta.create_all(bind=engine)
+        pending = [(r, n) for r, n in available() if (revision or 0) < r <= target]
+        for r, name in pending:
+            _apply(r, name)
+        reached = max([revision or 0] + [r for r, _ in pending])
+        print(f"✅ Database schema at revision {reached}" + (" (nothing to do)." if not pending else "."))
+        return reached
+
+
+def status() -> None:
+    with engine.connect() as conn:
+        revision = current(conn)
+    print(f"applied: {'none (no schema_migrations table)' if revision is None else revision}, head: {head()}")
+    for r, name in available():
+        if revision is None or r > revision:
+            print(f"  pending {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "stamp"])
+    parser.add_argument("revision", nargs="?", type=int, help="target revision (default: head)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status()
+    elif args.command == "stamp":
+        stamp(args.revision)
+    else:
+        upgrade(args.revision)
+
+
+if __name__ == "__main__":
+    main()
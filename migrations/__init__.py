@@ -0,0 +1,5 @@
+# migrations/
+# One file per schema revision, applied in order by migrate.py. A new file is
+#   mNNNN_short_name.py   with   DESCRIPTION = "..."   and   def upgrade(op): ...
+# (op is migrate.Operations). Set TRANSACTIONAL = False for CREATE INDEX CONCURRENTLY on Postgres.
+# Never edit a migration that has shipped; add the next revision instead.
@@ -0,0 +1,33 @@
+# migrations/m0001_baseline.py
+# The schema as the old migrate_*.py scripts left it: the original tables and every column those
+# scripts added (is_admin, user_id, preferences, question ids, exam reports, progress).
+from models import AnalysisLog, ExamSectionReport, ExamSession, ExamTurn, ModelCall, User, UserProgress
+
+DESCRIPTION = "original tables and the columns added by migrate_*.py"
+
+
+def upgrade(op):
+    for model in (User, AnalysisLog, ExamSession, ExamTurn, ExamSectionReport, UserProgress, ModelCall):
+        op.create_table(model.__table__)
+
+    # migrate_add_is_admin.py, migrate_add_user_preferences.py
+    op.add_column("users", "is_admin", "BOOLEAN NOT NULL DEFAULT FALSE")
+    op.add_column("users", "preferred_language", "VARCHAR(20) NOT NULL DEFAULT 'english'")
+    op.add_column("users", "preferred_difficulty", "VARCHAR(20) NOT NULL DEFAULT 'moderate'")
+
+    # migrate_add_user_id.py
+    op.add_column("analysis_logs", "user_id", "INTEGER")
+    op.create_index("ix_analysis_logs_user_id", "analysis_logs", ["user_id"])
+
+    # migrate_add_question_ids.py
+    op.add_column("exam_turns", "question_id", "INTEGER")
+    op.add_column("exam_sessions", "used_questions", "VARCHAR(80)")
+
+    # migrate_add_exam_reports.py
+    op.add_column("exam_sessions", "overall_score", "INTEGER")
+    op.add_column("exam_sessions", "report_json", "TEXT")
+    op.add_column("exam_sessions", "report_generated_at", "TIMESTAMP")
+
+    # migrate_add_user_progress.py (the backfill is m0002)
+    op.add_column("exam_section_reports", "bands", "TEXT")
+    op.add_column("exam_section_reports", "progress_counted", "BOOLEAN NOT NULL DEFAULT FALSE")
@@ -0,0 +1,21 @@
+# migrations/m0002_user_progress_backfill.py
+# Fills user_progress from the section reports already stored (was the second half of
+# migrate_add_user_progress.py). rebuild_user recomputes from scratch, so running it again is harmless.
+from sqlalchemy.orm import Session
+
+import progress
+from models import User
+
+DESCRIPTION = "backfill user_progress from stored reports"
+
+
+def upgrade(op):
+    db = Session(bind=op.conn)
+    try:
+        user_ids = [u[0] for u in db.query(User.id).all()]
+        for user_id in user_ids:
+            progress.rebuild_user(db, user_id)
+        db.flush()
+    finally:
+        db.close()
+    print(f"   rebuilt progress for {len(user_ids)} users")
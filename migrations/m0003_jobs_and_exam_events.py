@@ -0,0 +1,10 @@
+# migrations/m0003_jobs_and_exam_events.py
+# Background job queue (jobs.py) and the per-session event buffer behind the exam SSE stream (exam_events.py).
+from models import ExamEvent, Job
+
+DESCRIPTION = "jobs and exam_events tables"
+
+
+def upgrade(op):
+    op.create_table(Job.__table__)
+    op.create_table(ExamEvent.__table__)
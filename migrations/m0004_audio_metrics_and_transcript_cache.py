@@ -0,0 +1,11 @@
+# migrations/m0004_audio_metrics_and_transcript_cache.py
+# Fluency measurements per answer (audio_metrics.py, was migrate_add_audio_metrics.py) and the
+# transcript cache for re-sent recordings (stt_cache.py).
+from models import TranscriptCache
+
+DESCRIPTION = "exam_turns.audio_metrics and transcript_cache table"
+
+
+def upgrade(op):
+    op.add_column("exam_turns", "audio_metrics", "TEXT")
+    op.create_table(TranscriptCache.__table__)
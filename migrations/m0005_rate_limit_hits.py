@@ -0,0 +1,9 @@
+# migrations/m0005_rate_limit_hits.py
+# Shared store for the login rate limits (rate_limit.py, RATE_LIMIT_STORE=db).
+from models import RateLimitHit
+
+DESCRIPTION = "rate_limit_hits table"
+
+
+def upgrade(op):
+    op.create_table(RateLimitHit.__table__)
@@ -0,0 +1,20 @@
+# migrations/m0006_model_indexes.py
+# Tables created before an index was added to models.py never got it (create_all skips existing
+# tables): exam_turns.session_id, exam_sessions.user_id, model_calls.created_at, ...
+# Creates every index models.py declares that is missing, CONCURRENTLY on Postgres so the tables stay
+# writable meanwhile.
+from db import Base
+
+DESCRIPTION = "create missing indexes declared in models.py"
+TRANSACTIONAL = False
+
+
+def upgrade(op):
+    for table in Base.metadata.sorted_tables:
+        if not op.has_table(table.name):
+            continue
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            # Columns a later migration adds get their index there
+            if not all(op.has_column(table.name, c.name) for c in index.columns):
+                continue
+            op.create_index(index.name, table.name, [c.name for c in index.columns], unique=index.unique)
@@ -0,0 +1,13 @@
+# migrations/m0007_archive.py
+# Archived detail of old analysis_logs / exam_turns rows (archive.py).
+from models import AnalysisLog, ArchiveBlob, ExamTurn
+
+DESCRIPTION = "archive_blobs table, archive_id on analysis_logs and exam_turns"
+
+
+def upgrade(op):
+    op.create_table(ArchiveBlob.__table__)
+    for model in (AnalysisLog, ExamTurn):
+        table = model.__tablename__
+        op.add_column(table, "archive_id", "INTEGER REFERENCES archive_blobs(id)")
+        op.create_index(f"ix_{table}_archive_id", table, ["archive_id"])
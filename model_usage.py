@@ -0,0 +1,144 @@
+# model_usage.py
+# Persists one ModelCall row per model API call and aggregates them for the admin usage report.
+# - Inside a request the rows are collected in flask.g and written in one commit at teardown,
+#   so a request that makes three model calls costs one extra write, not three
+# - Outside a request (streamed responses, background work) the row is written straight away
+# - Calls made by a job are recorded as endpoint "job:<kind>" with the job's user (jobs.run_job sets job_context)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from flask import g, has_app_context, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import case, func
+
+from db import SessionLocal
+from models import ModelCall
+
+# (job kind, user id) of the job running in this thread, if any
+_job = ContextVar("model_usage_job", default=None)
+
+
+@contextmanager
+def job_context(kind: str, user_id: int = None):
+    """ Attributes the model calls made inside the block to a job. """
+    token = _job.set((kind, user_id))
+    try:
+        yield
+    finally:
+        _job.reset(token)
+
+
+def _current_user_id():
+    try:
+        if current_user.is_authenticated:
+            return current_user.id
+    except Exception:
+        pass
+    return None
+
+
+def record_call(kind: str, model: str, seconds: float, usage=None, failed: bool = False):
+    """ Called by ai_client.py after every model call. Never raises: accounting must not break a request. """
+    row = dict(
+        kind=kind,
+        model=(model or "unknown")[:120],
+        prompt_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+        completion_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+        latency_ms=int(seconds * 1000),
+        ok=not failed,
+        created_at=datetime.utcnow(),
+    )
+
+    job = _job.get()
+    if job is not None:
+        # Checked first: with JOB_RUNNER=inline the job runs inside the request that enqueued it
+        row["endpoint"] = f"job:{job[0]}"[:80]
+        row["user_id"] = job[1]
+        _write([row])
+        return
+
+    if has_request_context():
+        row["endpoint"] = (request.endpoint or request.path)[:80]
+        row["user_id"] = _current_user_id()
+        pending = g.setdefault("model_calls", [])
+        pending.append(row)
+        return
+
+    row["endpoint"] = "background"
+    row["user_id"] = None
+    _write([row])
+
+
+def _write(rows):
+    db = SessionLocal()
+    try:
+        db.add_all(ModelCall(**r) for r in rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print("MODEL USAGE WRITE ERROR:", type(e).__name__, e)
+    finally:
+        db.close()
+
+
+def flush_pending(_exc=None):
+    """ teardown_request hook: writes the calls collected during the request. """
+    if not has_app_context():
+        return
+    rows = g.pop("model_calls", None)
+    if rows:
+        _write(rows)
+
+
+def init_app(app):
+    app.teardown_request(flush_pending)
+
+
+def daily_usage(db, days: int = 7, user_id: int = None):
+    """
+    Calls, tokens and latency per day / user / endpoint / model for the last `days` days.
+    Newest day first, then the most expensive rows.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    day = func.date(ModelCall.created_at)
+    total_tokens = func.sum(ModelCall.prompt_tokens + ModelCall.completion_tokens)
+
+    q = (
+        db.query(
+            day.label("day"),
+            ModelCall.user_id,
+            ModelCall.endpoint,
+            ModelCall.model,
+            func.count().label("calls"),
+            func.sum(case((ModelCall.ok.is_(False), 1), else_=0)).label("errors"),
+            func.sum(ModelCall.prompt_tokens).label("prompt_tokens"),
+            func.sum(ModelCall.completion_tokens).label("completion_tokens"),
+            func.avg(ModelCall.latency_ms).label("avg_latency_ms"),
+            func.max(ModelCall.latency_ms).label("max_latency_ms"),
+        )
+        .filter(ModelCall.created_at >= since)
+    )
+    if user_id is not None:
+        q = q.filter(ModelCall.user_id == user_id)
+
+    rows = (
+        q.group_by(day, ModelCall.user_id, ModelCall.endpoint, ModelCall.model)
+        .order_by(day.desc(), total_tokens.desc())
+        .all()
+    )
+    return [
+        {
+            "day": str(r.day),
+            "user_id": r.user_id,
+            "endpoint": r.endpoint,
+            "model": r.model,
+            "calls": r.calls,
+            "errors": int(r.errors or 0),
+            "prompt_tokens": int(r.prompt_tokens or 0),
+            "completion_tokens": int(r.completion_tokens or 0),
+            "avg_latency_ms": round(float(r.avg_latency_ms or 0)),
+            "max_latency_ms": int(r.max_latency_ms or 0),
+        }
+        for r in rows
+    ]
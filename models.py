@@ -6,10 +6,10 @@
 from sqlalchemy import Column, Integer, Text, String, DateTime, func
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Column, Integer, Text, String, DateTime, func, ForeignKey, Boolean
+import passwords
+from sqlalchemy import Column, Integer, Text, String, DateTime, Date, func, ForeignKey, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index
 
 
 # Import the Base class made in db.py, this links our model to the database setup
@@ -27,7 +27,7 @@ class AnalysisLog(Base):
 
     # Primary key column — unique ID for each record
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
 
     # Text input from the user (could be long, so use Text instead of String)
     input_text = Column(Text, nullable=False)
@@ -40,6 +40,10 @@ class AnalysisLog(Base):
 
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
+    # Set once archive.py moved input_text/feedback_text into an archive_blobs row; input_text then
+    # holds a short preview and feedback_text is empty until archive.hydrate() fills them in
+    archive_id = Column(Integer, ForeignKey("archive_blobs.id"), nullable=True, index=True)
+
 class ExamSession(Base):
     __tablename__ = "exam_sessions"
 
@@ -61,8 +65,16 @@ class ExamSession(Base):
     summary_feedback_en = Column(Text, nullable=True)
     major_mistakes_en = Column(Text, nullable=True)
 
+    # stored end-of-exam report (the exam_finish response as JSON), so it is generated only once
+    overall_score = Column(Integer, nullable=True)  # 0..10
+    report_json = Column(Text, nullable=True)
+    report_generated_at = Column(DateTime, nullable=True)
+
     total_questions = Column(Integer, default=15, nullable=False)
 
+    # bitset of bank question ids already asked in this session (hex string, see question_bank.py)
+    used_questions = Column(String(80), nullable=True)
+
     # relationship to turns
     turns = relationship(
         "ExamTurn",
@@ -80,6 +92,7 @@ class ExamTurn(Base):
 
     question_number = Column(Integer, nullable=False)  # 1..N
     section = Column(String(50), nullable=False)  # introduction/school/etc
+    question_id = Column(Integer, nullable=True)  # bank question id, NULL for AI follow-ups
     question_text = Column(Text, nullable=False)
 
     transcript = Column(Text, nullable=True)
@@ -96,12 +109,148 @@ class ExamTurn(Base):
     pronunciation_band = Column(String(20), nullable=True)
     overall_band = Column(String(20), nullable=True)
 
+    # Fluency measurements of the recorded answer (audio_metrics.py), JSON; NULL when there was no decodable audio
+    audio_metrics = Column(Text, nullable=True)
+
+    # Set once archive.py moved the transcript and feedback columns into an archive_blobs row (they are NULL here then)
+    archive_id = Column(Integer, ForeignKey("archive_blobs.id"), nullable=True, index=True)
+
     session = relationship("ExamSession", back_populates="turns")
 
     __table_args__ = (
         UniqueConstraint("session_id", "question_number", name="uq_exam_session_question_number"),
     )
 
+# Per-section report, computed in the background as soon as a section's last question is answered
+# (exam_reports.py). exam_finish only merges these rows, so the end-of-exam wait no longer grows with exam length.
+class ExamSectionReport(Base):
+    __tablename__ = "exam_section_reports"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"), nullable=False, index=True)
+    section = Column(String(50), nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")  # pending / done / failed
+    score = Column(Integer, nullable=True)  # 0..10
+    summary_en = Column(Text, nullable=True)
+    strengths = Column(Text, nullable=True)  # JSON list
+    improvements = Column(Text, nullable=True)  # JSON list
+    answer_count = Column(Integer, nullable=False, default=0)
+    bands = Column(Text, nullable=True)  # JSON {"fluency": "Good", ...}
+    # True once score/bands have been added to the user's UserProgress row (progress.py)
+    progress_counted = Column(Boolean, nullable=False, default=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("session_id", "section", name="uq_exam_section_report"),
+    )
+
+# Running progress aggregates for one user, updated as section reports and exams complete (progress.py).
+# The progress page reads this single row instead of scanning all of the user's sessions and turns.
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    exams_completed = Column(Integer, nullable=False, default=0)
+    sections_json = Column(Text, nullable=True)  # {section: {"sum": .., "count": ..}}
+    skills_json = Column(Text, nullable=True)  # {skill: {"sum": .., "count": .., "recent": [1..4, ...]}}
+    recent_scores_json = Column(Text, nullable=True)  # [{"date": "2025-01-31", "score": 7, "session_id": 12}, ...]
+
+    current_streak = Column(Integer, nullable=False, default=0)  # consecutive days with practice
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_active_date = Column(Date, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+# Events pushed to the exam page over Server-Sent Events (exam_events.py, GET /api/exam/<id>/events).
+# The id is the SSE event id; a reconnecting browser sends Last-Event-ID and gets everything after it.
+# Only the last few events per session are kept.
+class ExamEvent(Base):
+    __tablename__ = "exam_events"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"), nullable=False, index=True)
+    type = Column(String(40), nullable=False)  # question / turn_graded / tts_ready / section_report / report_ready
+    data = Column(Text, nullable=False, default="{}")  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# Recent Whisper results keyed on a hash of the uploaded audio (stt_cache.py), so a re-sent recording
+# isn't transcribed twice. Rows older than STT_CACHE_SECONDS are ignored and pruned.
+class TranscriptCache(Base):
+    __tablename__ = "transcript_cache"
+
+    id = Column(Integer, primary_key=True)
+    audio_sha256 = Column(String(64), nullable=False)
+    language = Column(String(10), nullable=False)
+    transcript = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("audio_sha256", "language", name="uq_transcript_cache_audio_language"),
+    )
+
+# Login/signup attempts for the sliding-window limits in rate_limit.py (RATE_LIMIT_STORE=db only)
+class RateLimitHit(Base):
+    __tablename__ = "rate_limit_hits"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(String(40), nullable=False)  # which limit, e.g. "login_ip"
+    key = Column(String(255), nullable=False)  # client address or email
+    at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_rate_limit_hits_bucket_key_at", "bucket", "key", "at"),
+    )
+
+# Durable background job queue (jobs.py): section reports, turn grading, TTS prerendering, analytics.
+# Workers claim queued rows atomically, so several web processes and worker.py can share the table.
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # handler name, e.g. "section_report"
+    payload = Column(Text, nullable=False, default="{}")  # JSON arguments for the handler
+    ref = Column(String(80), nullable=True, index=True)  # what the job is about, e.g. "session:12"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # owner, for /api/jobs/<id>
+
+    status = Column(String(20), nullable=False, default="queued")  # queued / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = Column(String(80), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+
+    result = Column(Text, nullable=True)  # JSON
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+# One row per model API call (chat, speech-to-text, text-to-speech), written by model_usage.py.
+# Lets us see which endpoint and which users spend the tokens and the latency.
+class ModelCall(Base):
+    __tablename__ = "model_calls"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+
+    endpoint = Column(String(80), nullable=False)  # Flask endpoint, e.g. ai_bp.exam_answer
+    kind = Column(String(10), nullable=False)  # chat / stt / tts
+    model = Column(String(120), nullable=False)
+
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False)
+    ok = Column(Boolean, nullable=False, default=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
 # server_default=func.now() means the database automatically fills this in
 # UserMixin and Base inherited to do login and create tables
 # This tabel represents the users table. It stores login credentials for each user.
@@ -130,13 +279,17 @@ class User(UserMixin, Base):
 
 #Stores a securley hashed version of the users password
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
-        """ Converts a plain text to a password hash """
+        """ Converts a plain text to a password hash (on the hashing pool, passwords.py) """
+        self.password_hash = passwords.hash_password(password)
 
 #This verifies whether a login password matches against the stored password
     def check_password(self, password: str) -> bool:
         """ Checks a plain text password against the password hash """
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        """ True when the hash was made with other parameters than PASSWORD_HASH_METHOD """
+        return passwords.needs_rehash(self.password_hash)
 
 """ This is the ChatGPT Prompt for class Analysislog
 Design a SQLAlchemy ORM model called **AnalysisLog** for a Flask-based language learning application.
@@ -154,4 +307,21 @@ The table should include:
 * a timestamp for when the analysis was created
 
 Ensure the model uses appropriate SQLAlchemy column types and can be used with a Flask SQLAlchemy session.
-"""
\ No newline at end of file
+"""
+
+# Compressed detail of old analysis_logs / exam_turns rows (archive.py): one JSON object
+# {row id: {column: value}} per exam session or per user and month, zstd- or zlib-compressed.
+# The rows stay in their tables as summaries and point here through archive_id.
+class ArchiveBlob(Base):
+    __tablename__ = "archive_blobs"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)  # "analysis_logs" or "exam_turns"
+    codec = Column(String(10), nullable=False)  # "zstd" or "zlib"
+    data = Column(LargeBinary, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)  # size before compression
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Blob ids are cache keys in archive.py: never reuse a deleted one (SQLite would, without AUTOINCREMENT)
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,85 @@
+# passwords.py
+# Password hashing off the request thread.
+# A scrypt hash costs ~0.1 s of CPU; done inline, a class logging in at once ties up every web worker
+# and exam requests queue behind the logins. Here hashing runs on a small pool of its own:
+# - at most PASSWORD_HASH_THREADS hashes run at a time (hashlib releases the GIL, so they run in parallel
+#   with request handling); under gevent the pool is gevent's real-thread pool, so the hub keeps serving
+# - at most PASSWORD_HASH_QUEUE logins wait for the pool; beyond that HashingBusy (the route answers 503)
+# - PASSWORD_HASH_METHOD is any werkzeug method ("scrypt:32768:8:1", "pbkdf2:sha256:600000", ...);
+#   a hash made with other parameters is replaced on the user's next successful login (needs_rehash)
+import threading
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+_waiting = 0
+
+
+class HashingBusy(Exception):
+    """ Too many password hashes queued; the caller should ask the client to retry. """
+
+
+def _gevent_patched() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if _gevent_patched():
+                    from gevent.threadpool import ThreadPoolExecutor
+                else:
+                    from concurrent.futures import ThreadPoolExecutor
+                _pool = ThreadPoolExecutor(max_workers=max(1, settings.PASSWORD_HASH_THREADS))
+    return _pool
+
+
+def _run(fn, *args):
+    global _waiting
+    with _pool_lock:
+        if _waiting >= settings.PASSWORD_HASH_QUEUE:
+            raise HashingBusy()
+        _waiting += 1
+    try:
+        return _executor().submit(fn, *args).result()
+    finally:
+        with _pool_lock:
+            _waiting -= 1
+
+
+def hash_password(password: str) -> str:
+    return _run(generate_password_hash, password, settings.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return generate_password_hash("not-a-real-password", settings.PASSWORD_HASH_METHOD)
+
+
+def verify_missing_user(password: str) -> bool:
+    """ Same work as a real check, so a login for an unknown email takes as long as a wrong password. """
+    return _run(lambda: check_password_hash(_dummy_hash(), password) and False)
+
+
+@lru_cache(maxsize=1)
+def current_prefix() -> str:
+    """ The method prefix of new hashes, e.g. "scrypt:32768:8:1" (werkzeug fills in defaults). """
+    return _dummy_hash().split("$", 1)[0]
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return (password_hash or "").split("$", 1)[0] != current_prefix()
@@ -0,0 +1,228 @@
+# progress.py
+# Per-user progress, kept as running aggregates in one UserProgress row.
+# - apply_section_report(): called when a section report is stored (exam_reports.py)
+# - apply_finished_exam(): called when an exam report is stored (exam_finish)
+# - progress_summary(): what /api/user/progress returns, computed from that one row
+# Reads cost the same whether the student took one exam or five hundred.
+import json
+from datetime import date, datetime
+
+import jobs
+from db import SessionLocal
+from models import ExamSectionReport, ExamSession, User, UserProgress
+
+SKILLS = ("fluency", "grammar", "vocabulary", "pronunciation")
+BAND_VALUES = {"Needs Work": 1, "OK": 2, "Good": 3, "Excellent": 4}
+RECENT_LIMIT = 20  # points kept for the trend lines
+
+# Below these averages a section / skill is reported as a weak area
+WEAK_SECTION_SCORE = 6.0  # 0..10
+WEAK_SKILL_BAND = 2.5  # between OK and Good
+
+
+def band_for_score(score: int) -> str:
+    """ Band label for a 0..10 score (exam reports, and the local backend's grading). """
+    if score >= 9:
+        return "Excellent"
+    if score >= 7:
+        return "Good"
+    if score >= 5:
+        return "OK"
+    return "Needs Work"
+
+
+def _loads(value, default):
+    return json.loads(value) if value else default
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_progress_row(db, user_id: int, for_update: bool = True) -> UserProgress:
+    """ The user's row, created empty on first use. Locked on databases that support it (Postgres). """
+    q = db.query(UserProgress).filter(UserProgress.user_id == user_id)
+    if for_update:
+        q = q.with_for_update()
+    row = q.first()
+    if row is None:
+        row = UserProgress(user_id=user_id, exams_completed=0, current_streak=0, longest_streak=0)
+        db.add(row)
+        db.flush()
+    return row
+
+
+def _mark_active(row: UserProgress, day: date) -> None:
+    """ Streak of consecutive days with at least one finished section or exam. """
+    if row.last_active_date == day:
+        return
+    if row.last_active_date and (day - row.last_active_date).days == 1:
+        row.current_streak = (row.current_streak or 0) + 1
+    elif row.last_active_date and row.last_active_date > day:
+        return  # old data replayed by rebuild_user(); doesn't move the streak backwards
+    else:
+        row.current_streak = 1
+    row.longest_streak = max(row.longest_streak or 0, row.current_streak)
+    row.last_active_date = day
+
+
+def _add_section(row: UserProgress, section: str, score, bands: dict, sign: int) -> None:
+    sections = _loads(row.sections_json, {})
+    if score is not None:
+        entry = sections.setdefault(section, {"sum": 0, "count": 0})
+        entry["sum"] += sign * score
+        entry["count"] += sign
+        if entry["count"] <= 0:
+            del sections[section]
+    row.sections_json = _dumps(sections)
+
+    skills = _loads(row.skills_json, {})
+    for skill in SKILLS:
+        value = BAND_VALUES.get((bands or {}).get(skill))
+        if value is None:
+            continue
+        entry = skills.setdefault(skill, {"sum": 0, "count": 0, "recent": []})
+        entry["sum"] += sign * value
+        entry["count"] += sign
+        if sign > 0:
+            entry["recent"] = (entry["recent"] + [value])[-RECENT_LIMIT:]
+        elif value in entry["recent"]:
+            # Undo: drop the most recent occurrence of that value
+            idx = len(entry["recent"]) - 1 - entry["recent"][::-1].index(value)
+            del entry["recent"][idx]
+    row.skills_json = _dumps(skills)
+
+
+def apply_section_report(db, user_id: int, report: ExamSectionReport, old_score=None, old_bands=None) -> None:
+    """
+    Adds a stored section report to the user's aggregates (caller commits).
+    If the section was already counted (a recomputed report), its old values are taken out first.
+    """
+    row = get_progress_row(db, user_id)
+    if report.progress_counted:
+        _add_section(row, report.section, old_score, old_bands, -1)
+    _add_section(row, report.section, report.score, _loads(report.bands, {}), +1)
+    report.progress_counted = True
+    _mark_active(row, (report.updated_at or datetime.utcnow()).date())
+
+
+def apply_finished_exam(db, session: ExamSession) -> None:
+    """ Adds a finished exam's overall score to the user's aggregates (caller commits). """
+    row = get_progress_row(db, session.user_id)
+    row.exams_completed = (row.exams_completed or 0) + 1
+    finished = session.completed_at or datetime.utcnow()
+    if session.overall_score is not None:
+        recent = _loads(row.recent_scores_json, [])
+        recent.append({"date": finished.date().isoformat(), "score": session.overall_score, "session_id": session.id})
+        row.recent_scores_json = _dumps(recent[-RECENT_LIMIT:])
+    _mark_active(row, finished.date())
+
+
+def _band_label(value: float) -> str:
+    return min(BAND_VALUES, key=lambda label: abs(BAND_VALUES[label] - value))
+
+
+def _direction(points) -> str:
+    """ Compares the average of the last three points with the three before them. """
+    if len(points) < 4:
+        return "flat"
+    last, before = points[-3:], points[-6:-3]
+    delta = sum(last) / len(last) - sum(before) / len(before)
+    if delta > 0.25:
+        return "up"
+    if delta < -0.25:
+        return "down"
+    return "flat"
+
+
+def progress_summary(row: UserProgress, today: date = None) -> dict:
+    today = today or datetime.utcnow().date()
+    if row is None:
+        return {
+            "exams_completed": 0, "current_streak": 0, "longest_streak": 0, "last_active": None,
+            "sections": {}, "skills": {}, "recent_scores": [], "weak_areas": [],
+        }
+
+    sections = {
+        name: round(e["sum"] / e["count"], 1)
+        for name, e in _loads(row.sections_json, {}).items() if e["count"] > 0
+    }
+    skills = {}
+    for name, e in _loads(row.skills_json, {}).items():
+        if e["count"] <= 0:
+            continue
+        average = e["sum"] / e["count"]
+        skills[name] = {
+            "average": round(average, 2),
+            "band": _band_label(average),
+            "trend": e["recent"],
+            "direction": _direction(e["recent"]),
+        }
+
+    weak = [(avg / 10, "section", name) for name, avg in sections.items() if avg < WEAK_SECTION_SCORE]
+    weak += [(s["average"] / 4, "skill", name) for name, s in skills.items() if s["average"] < WEAK_SKILL_BAND]
+    weak_areas = [{"type": kind, "name": name} for _, kind, name in sorted(weak)[:3]]
+
+    # A streak only counts if the student practised today or yesterday
+    streak = row.current_streak or 0
+    if not row.last_active_date or (today - row.last_active_date).days > 1:
+        streak = 0
+
+    return {
+        "exams_completed": row.exams_completed or 0,
+        "current_streak": streak,
+        "longest_streak": row.longest_streak or 0,
+        "last_active": row.last_active_date.isoformat() if row.last_active_date else None,
+        "sections": sections,
+        "skills": skills,
+        "recent_scores": _loads(row.recent_scores_json, []),
+        "weak_areas": weak_areas,
+    }
+
+
+def rebuild_user(db, user_id: int) -> UserProgress:
+    """
+    Recomputes a user's row from their stored reports (caller commits).
+    Only for backfilling existing data and repairs; normal updates are incremental.
+    """
+    row = get_progress_row(db, user_id)
+    row.exams_completed, row.current_streak, row.longest_streak = 0, 0, 0
+    row.sections_json = row.skills_json = row.recent_scores_json = None
+    row.last_active_date = None
+
+    sessions = (
+        db.query(ExamSession)
+        .filter(ExamSession.user_id == user_id)
+        .order_by(ExamSession.started_at.asc(), ExamSession.id.asc())
+        .all()
+    )
+    for session in sessions:
+        reports = (
+            db.query(ExamSectionReport)
+            .filter(ExamSectionReport.session_id == session.id, ExamSectionReport.status == "done")
+            .order_by(ExamSectionReport.updated_at.asc())
+            .all()
+        )
+        for report in reports:
+            report.progress_counted = False
+            apply_section_report(db, user_id, report)
+        if session.report_json:
+            apply_finished_exam(db, session)
+    return row
+
+
+@jobs.handler("progress_rebuild")
+def _rebuild_job(payload: dict):
+    """ Rebuilds one user's row, or every user's when payload has no user_id (POST /admin/progress/rebuild). """
+    db = SessionLocal()
+    try:
+        if payload.get("user_id"):
+            user_ids = [payload["user_id"]]
+        else:
+            user_ids = [uid for (uid,) in db.query(User.id).order_by(User.id).all()]
+        for user_id in user_ids:
+            rebuild_user(db, user_id)
+            db.commit()
+        return {"users": len(user_ids)}
+    finally:
+        db.close()
@@ -0,0 +1,279 @@
+# prompt_templates.py
+# Registry of the long system prompts used in routes_ai.py.
+# - Each system prompt depends only on (language, difficulty), so it is built once and cached
+# - Everything that changes per call (question, transcript, answers) goes in the LAST user message,
+#   so the system message is a byte-identical prefix across calls and the provider's prompt cache can reuse it
+# - Transcripts are trimmed to a token budget before they are sent
+import json
+from functools import lru_cache
+
+LANGUAGE_NAMES = {"english": "English", "french": "French", "german": "German"}
+
+LEVELS = {
+    "beginner": "A2 (beginner)",
+    "moderate": "B1 (intermediate)",
+    "expert": "B2–C1 (advanced)",
+}
+
+# Token budgets (estimated, see estimate_tokens)
+TRANSCRIPT_TOKEN_BUDGET = 350  # one spoken answer of 20–40 seconds is ~60–120 tokens
+REPORT_TOKEN_BUDGET = 2400  # all transcripts of one exam together
+TRIM_MARKER = " […] "
+
+
+def language_name(language: str) -> str:
+    return LANGUAGE_NAMES.get((language or "").lower(), "English")
+
+
+def level_name(difficulty: str) -> str:
+    return LEVELS.get((difficulty or "").lower(), LEVELS["moderate"])
+
+
+def _key(language: str, difficulty: str):
+    """ Normalises the cache key so 'French'/'french ' don't build separate copies. """
+    language = (language or "").strip().lower()
+    difficulty = (difficulty or "").strip().lower()
+    return (language if language in LANGUAGE_NAMES else "english",
+            difficulty if difficulty in LEVELS else "moderate")
+
+
+#  Token budgets
+
+def estimate_tokens(text: str) -> int:
+    """ Rough token count (about 4 characters per token for the languages we use). """
+    return (len(text or "") + 3) // 4
+
+
+def trim_to_budget(text: str, max_tokens: int) -> str:
+    """
+    Shortens text to about max_tokens, keeping the start and the end of the answer
+    (where students state their point and their conclusion) and cutting at word boundaries.
+    """
+    text = (text or "").strip()
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+
+    keep = max(0, max_chars - len(TRIM_MARKER))
+    head = text[: keep * 2 // 3].rsplit(" ", 1)[0]
+    tail = text[len(text) - keep // 3:].split(" ", 1)[-1]
+    return head + TRIM_MARKER + tail
+
+
+def trim_all_to_budget(texts, total_tokens: int):
+    """
+    Trims a list of transcripts so together they fit total_tokens.
+    Short answers are kept whole; the budget they don't use is shared by the long ones.
+    """
+    texts = [(t or "").strip() for t in texts]
+    if sum(estimate_tokens(t) for t in texts) <= total_tokens:
+        return texts
+
+    budgets = [0] * len(texts)
+    remaining = total_tokens
+    order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+    for pos, i in enumerate(order):
+        fair_share = remaining // (len(order) - pos)
+        budgets[i] = min(estimate_tokens(texts[i]), fair_share)
+        remaining -= budgets[i]
+    return [trim_to_budget(t, b) for t, b in zip(texts, budgets)]
+
+
+def compact_json(value) -> str:
+    """ JSON without the default spaces: the same content in fewer tokens. """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+#  System prompts (static per language / difficulty)
+
+@lru_cache(maxsize=None)
+def _band_evaluator(language: str, difficulty: str) -> str:
+    lang = language_name(language)
+    return (
+        "You are a strict but helpful oral-exam evaluator.\n"
+        "You MUST output valid JSON only.\n"
+        f"Exam language (student target): {lang}\n"
+        f"Difficulty: {difficulty}\n"
+        "Rules:\n"
+        "- Feedback MUST be in English.\n"
+        f"- The corrected answer MUST be written in {lang}.\n"
+        "- Use ONLY these band labels: Excellent, Good, OK, Needs Work.\n"
+        "- If there are no serious errors, return major_mistakes_en as an empty list.\n"
+        "- NEVER use placeholders like [your city], [your country], [your hobbies].\n"
+        "- Do NOT invent personal facts the student did not say.\n"
+        "- If info is missing, keep the corrected answer general and faithful to what was said.\n"
+        "- The corrected answer MUST NOT add any new factual details.\n"
+        "- Only use facts explicitly stated in the student's transcript.\n"
+        "- You may add polite generic filler (e.g., 'Nice to meet you.') but no invented specifics.\n"
+        "- If the student's answer correctly answers the question but is short, do NOT treat it as a major problem. "
+        "Mention it as optional improvement only.\n"
+        "- If audio measurements are given, judge fluency from them (words per minute, pauses), "
+        "not from the transcript's punctuation.\n"
+        "\n"
+        "Return JSON with keys:\n"
+        "feedback_en: short bullet points in English\n"
+        f"corrected_answer_target: one strong corrected answer in {lang}\n"
+        "tips_en: 1–2 short tips in English\n"
+        "bands: object with keys fluency, grammar, vocabulary, pronunciation, overall\n"
+        "major_mistakes_en: list of 1–3 serious mistakes, or empty list if none\n"
+        "Important: corrected_answer_target must not contain bracket placeholders and must not invent details.\n"
+    )
+
+
+@lru_cache(maxsize=None)
+def _exam_turn(language: str, difficulty: str) -> str:
+    lang = language_name(language)
+    return (
+        f"You are a strict but fair oral-exam tutor for a {level_name(difficulty)} learner.\n"
+        f"Target language (student should speak): {lang}.\n"
+        "IMPORTANT OUTPUT RULES:\n"
+        "- You MUST return a JSON object with keys: feedback, corrected_answer, tip, score, next_question.\n"
+        "- feedback and tip MUST be in English.\n"
+        f"- corrected_answer MUST be written in {lang}.\n"
+        "- Do NOT give generic advice. Only mention issues that actually appear in the student's transcript.\n"
+        "- In feedback, include 1–2 short quoted snippets from the student's transcript as evidence "
+        "for any criticism. If there are no real errors, explicitly say so.\n"
+        "- corrected_answer rules:\n"
+        f"  * If the student answer is already good and natural in {lang}, set corrected_answer to 'NO_CHANGES_NEEDED'.\n"
+        f"  * If there are problems, corrected_answer MUST be a better version in {lang} and MUST differ from the original.\n"
+        "\n"
+        "SCORING RUBRIC (be strict, avoid inflated scores):\n"
+        "1–2: mostly unintelligible / off-topic\n"
+        "3–4: very limited, many basic errors, hard to follow\n"
+        "5–6: understandable, some errors and/or limited detail\n"
+        "7: good, minor errors only, mostly natural\n"
+        "8: very good, clear + natural, minor slips\n"
+        "9: excellent, fluent + accurate, strong vocabulary\n"
+        "10: near-native for this level (rare)\n"
+        "\n"
+        "The next_question MUST be one clear open-ended question in the TARGET language "
+        f"({lang}) and should fit a 20–40 second spoken answer.\n"
+        "Analyse each answer as a SPOKEN answer: prioritize clarity and natural phrasing over perfect writing punctuation.\n"
+    )
+
+
+_FOLLOWUP_HINTS = {
+    "beginner": (
+        "The student is a beginner (A2). "
+        "Use very simple vocabulary and short sentences. "
+        "Ask a clear, concrete question about familiar topics. "
+        "Avoid abstract ideas or complex grammar."
+    ),
+    "moderate": (
+        "The student is intermediate (B1). "
+        "Ask a natural follow-up question that encourages some detail. "
+        "Use everyday vocabulary but allow moderate complexity."
+    ),
+    "expert": (
+        "The student is advanced (B2–C1). "
+        "Ask a more detailed or analytical follow-up question. "
+        "Encourage explanation, justification, or reflection. "
+        "You may explore opinions, consequences, or comparisons."
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _followup_question(language: str, difficulty: str) -> str:
+    lang = language_name(language)
+    return (
+        "You are an oral exam examiner.\n"
+        f"The exam language is {lang}. You MUST output only ONE question in {lang}.\n"
+        f"Difficulty: {difficulty}\n"
+        f"{_FOLLOWUP_HINTS[difficulty]}\n"
+        "Rules:\n"
+        "- Ask ONE clear follow-up question based on what the student just said.\n"
+        "- Do not give feedback.\n"
+        "- Do not include multiple questions.\n"
+        "- Keep it answerable in 20–40 seconds.\n"
+    )
+
+
+@lru_cache(maxsize=None)
+def _section_summaries(language: str, difficulty: str) -> str:
+    return (
+        "You are an oral exam examiner. "
+        "Return JSON with key 'sections'. "
+        "Each section must include: section, score (integer 0..10), summary_en, strengths (list), improvements (list), "
+        "bands (object with keys fluency, grammar, vocabulary, pronunciation; "
+        "use ONLY these labels: Excellent, Good, OK, Needs Work). "
+        "Be specific and professional. "
+        "Be fair: short but correct answers should not be heavily penalized. Do NOT invent facts.\n"
+        f"Language: {language}\n"
+        f"Difficulty: {difficulty}\n"
+        f"Long answers are shortened with '{TRIM_MARKER.strip()}'; do not penalise the cut.\n"
+    )
+
+
+TEMPLATES = {
+    "band_evaluator": _band_evaluator,
+    "exam_turn": _exam_turn,
+    "followup_question": _followup_question,
+    "section_summaries": _section_summaries,
+}
+
+
+def system_prompt(name: str, language: str, difficulty: str) -> str:
+    return TEMPLATES[name](*_key(language, difficulty))
+
+
+def build_messages(name: str, language: str, difficulty: str, user_msg: str) -> list:
+    """ [static system prompt, per-call user message]: the static part always comes first. """
+    return [
+        {"role": "system", "content": system_prompt(name, language, difficulty)},
+        {"role": "user", "content": user_msg},
+    ]
+
+
+#  Per-call user messages
+
+# The audio measurements the evaluator sees (audio_metrics.py), under short keys.
+# filler_per_min is left out: it comes from the transcript, which has most fillers removed
+_METRIC_KEYS = {
+    "speech_rate_wpm": "wpm",
+    "articulation_ratio": "speaking_share",
+    "pause_count": "pauses",
+    "mean_pause_s": "mean_pause_s",
+    "long_pause_count": "long_pauses",
+}
+
+
+def band_evaluator_user(question: str, transcript: str, metrics: dict = None) -> str:
+    msg = (
+        f"Question: {question}\n"
+        f"Student answer (transcript): {trim_to_budget(transcript, TRANSCRIPT_TOKEN_BUDGET)}\n"
+    )
+    if metrics:
+        shown = {short: metrics[k] for k, short in _METRIC_KEYS.items() if k in metrics}
+        msg += "Audio measurements: " + compact_json(shown) + "\n"
+    return msg
+
+
+def exam_turn_user(topic: str, last_question: str, transcript: str) -> str:
+    return (
+        f"Exam topic: {topic}\n"
+        f"Examiner question: {last_question}\n"
+        f"Student answer (spoken transcript): {trim_to_budget(transcript, TRANSCRIPT_TOKEN_BUDGET)}\n\n"
+        "Now analyse the student's answer and continue the exam."
+    )
+
+
+def followup_question_user(section: str, last_question: str, transcript: str) -> str:
+    return (
+        f"Section: {section}\n"
+        f"Previous question: {last_question}\n"
+        f"Student answer (transcript): {trim_to_budget(transcript, TRANSCRIPT_TOKEN_BUDGET)}\n\n"
+        "Write the next follow-up question."
+    )
+
+
+def section_summaries_user(groups) -> str:
+    """ groups: [{"section": ..., "answers": [{"question", "transcript", "overall_band"}, ...]}, ...] """
+    answers = [a for g in groups for a in g["answers"]]
+    trimmed = iter(trim_all_to_budget([a["transcript"] for a in answers], REPORT_TOKEN_BUDGET))
+    payload = [
+        {"section": g["section"], "answers": [dict(a, transcript=next(trimmed)) for a in g["answers"]]}
+        for g in groups
+    ]
+    return "Answers grouped by section (JSON):\n" + compact_json(payload)
+
@@ -0,0 +1,113 @@
+# question_bank.py
+# The fixed exam question bank.
+# - Questions live in data/exam_question_bank.json (section -> language -> difficulty -> questions)
+# - Every question has a stable integer id, so ExamTurn can store the id instead of comparing long strings
+# - The file is only read the first time a question is needed, not at import
+import json
+import random
+from functools import lru_cache
+from pathlib import Path
+
+BANK_PATH = Path(__file__).resolve().parent / "data" / "exam_question_bank.json"
+
+
+@lru_cache(maxsize=1)
+def _load_bank():
+    """
+    Reads the JSON file once and builds two lookups:
+      texts: question id -> question text
+      index: (section, language, difficulty) -> tuple of question ids (in bank order)
+    """
+    with BANK_PATH.open(encoding="utf-8") as f:
+        raw = json.load(f)
+
+    texts = {}
+    index = {}
+    for section, by_language in raw.items():
+        for language, by_difficulty in by_language.items():
+            for difficulty, items in by_difficulty.items():
+                ids = []
+                for item in items:
+                    texts[item["id"]] = item["text"]
+                    ids.append(item["id"])
+                index[(section, language, difficulty)] = tuple(ids)
+
+    return texts, index
+
+
+def question_ids(section: str, language: str, difficulty: str) -> tuple:
+    """ Returns the question ids for one section/language/difficulty (empty tuple if unknown). """
+    return _load_bank()[1].get((section, language, difficulty), ())
+
+
+def question_text(question_id: int) -> str:
+    """ Returns the text of a bank question. """
+    return _load_bank()[0][question_id]
+
+
+def all_questions() -> dict:
+    """ Returns {question id: question text} for the whole bank. """
+    return _load_bank()[0]
+
+
+@lru_cache(maxsize=1)
+def _bank_texts() -> frozenset:
+    return frozenset(_load_bank()[0].values())
+
+
+def is_bank_question(text: str) -> bool:
+    """ True if text is exactly one of the bank's questions. """
+    return text in _bank_texts()
+
+
+def get_exam_question_bank() -> dict:
+    """
+    Returns the bank in the old nested shape:
+    { section: { language: { difficulty: [question text, ...] } } }
+    """
+    texts, index = _load_bank()
+    bank = {}
+    for (section, language, difficulty), ids in index.items():
+        bank.setdefault(section, {}).setdefault(language, {})[difficulty] = [texts[i] for i in ids]
+    return bank
+
+
+# Per-session "used questions" bitset.
+# Bit N is set when bank question N has been asked in the session.
+# It is stored on ExamSession as a hex string because the ids go past 64 bits.
+def decode_used(value) -> int:
+    return int(value, 16) if value else 0
+
+
+def encode_used(bits: int) -> str:
+    return format(bits, "x")
+
+
+def mark_used(bits: int, question_id: int) -> int:
+    return bits | (1 << question_id)
+
+
+def is_used(bits: int, question_id: int) -> bool:
+    return bool(bits >> question_id & 1)
+
+
+def pick_unused(ids, used_bits: int = 0, exclude=None):
+    """
+    Picks a random question id from ids that is not in used_bits.
+    A few random probes usually hit an unused question straight away; we only
+    fall back to filtering the list when most of the section has been used.
+    If every question has been used, any id except `exclude` is allowed.
+    Returns None if ids is empty.
+    """
+    if not ids:
+        return None
+
+    for _ in range(4):
+        qid = random.choice(ids)
+        if not is_used(used_bits, qid) and qid != exclude:
+            return qid
+
+    candidates = [q for q in ids if not is_used(used_bits, q) and q != exclude]
+    if not candidates:
+        candidates = [q for q in ids if q != exclude] or list(ids)
+    return random.choice(candidates)
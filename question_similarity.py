@@ -0,0 +1,83 @@
+# question_similarity.py
+# Cheap local check for "is this question basically one we already asked?"
+# - Each question becomes a hashed character n-gram vector (NumPy, no model call)
+# - Cosine similarity against the session's questions and the bank catches paraphrases
+#   like "What do you do in your free time?" vs "What do you like doing in your free time?"
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+import question_bank
+
+# Size of the hashed feature space; plenty for short one-sentence questions
+DIMENSIONS = 2048
+NGRAM_SIZES = (3, 4, 5)
+
+# Questions scoring at or above this cosine similarity count as duplicates
+DUPLICATE_THRESHOLD = 0.75
+
+
+def _normalize(text: str) -> str:
+    text = (text or "").strip().lower()
+    text = re.sub(r"[^\w\s]", " ", text)  # drop punctuation
+    return " " + re.sub(r"\s+", " ", text).strip() + " "
+
+
+def vectorize(texts) -> np.ndarray:
+    """
+    Returns an (n, DIMENSIONS) float32 matrix, one L2-normalised row per text.
+    n-grams are hashed with crc32 so the vectors are the same in every worker process.
+    """
+    matrix = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        s = _normalize(text)
+        buckets = [
+            zlib.crc32(s[i:i + n].encode("utf-8")) % DIMENSIONS
+            for n in NGRAM_SIZES
+            for i in range(len(s) - n + 1)
+        ]
+        if buckets:
+            np.add.at(matrix[row], buckets, 1.0)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@lru_cache(maxsize=1)
+def _bank_index():
+    """ Vectors for every bank question, built once. Returns (ids array, matrix). """
+    texts = question_bank.all_questions()
+    ids = np.fromiter(texts.keys(), dtype=np.int64, count=len(texts))
+    return ids, vectorize(list(texts.values()))
+
+
+def used_bank_vectors(used_bits: int) -> np.ndarray:
+    """ Vectors for every bank question marked in a session's used-question bitset. """
+    ids, matrix = _bank_index()
+    mask = np.fromiter((question_bank.is_used(used_bits, int(q)) for q in ids), dtype=bool, count=len(ids))
+    return matrix[mask]
+
+
+def max_similarity(candidate: str, asked_texts=(), asked_vectors=None) -> float:
+    """
+    Highest cosine similarity between candidate and anything already asked.
+    asked_texts are vectorised on the fly; asked_vectors can be precomputed rows (e.g. from the bank).
+    """
+    parts = []
+    if asked_texts:
+        parts.append(vectorize(list(asked_texts)))
+    if asked_vectors is not None and len(asked_vectors):
+        parts.append(asked_vectors)
+    if not parts:
+        return 0.0
+
+    others = np.vstack(parts)
+    return float((others @ vectorize([candidate])[0]).max())
+
+
+def is_near_duplicate(candidate: str, asked_texts=(), asked_vectors=None,
+                      threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    return max_similarity(candidate, asked_texts, asked_vectors) >= threshold
@@ -0,0 +1,134 @@
+# rate_limit.py
+# Sliding-window rate limits for the login and signup forms.
+# A limit "N/S" allows N hits per key in any S seconds; once reached, retry_after() says how long until
+# the oldest hit in the window expires. Keys are e.g. the client IP or the email being logged into.
+# - RATE_LIMIT_STORE=memory (default): a deque of timestamps per key in this process. With several web
+#   workers each one counts on its own, so the effective limit is up to WEB_CONCURRENCY x N.
+# - RATE_LIMIT_STORE=db: hits are rows in rate_limit_hits, shared by all workers
+# Behind a reverse proxy set PROXY_HOPS (app.py) so request.remote_addr is the student's address.
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func
+
+from config import settings
+from db import SessionLocal
+from models import RateLimitHit
+
+# The memory store drops idle keys once it tracks more than this many
+MAX_KEYS = 10000
+
+
+def parse_limit(spec: str):
+    """ "20/60" -> (20, 60.0). An empty or "0" spec disables the limit (None). """
+    spec = (spec or "").strip()
+    if not spec or spec == "0":
+        return None
+    count, _, seconds = spec.partition("/")
+    return int(count), float(seconds or 60)
+
+
+class SlidingWindow:
+    def __init__(self, name: str, spec: str):
+        self.name = name
+        self.limit = parse_limit(spec)
+        self.hits = {}  # key -> deque of time.time() stamps (memory store)
+        self.lock = threading.Lock()
+
+    # ---- memory store ----
+    def _memory_hits(self, key: str, now: float):
+        window = self.limit[1]
+        q = self.hits.get(key)
+        if q is None:
+            return deque()
+        while q and q[0] <= now - window:
+            q.popleft()
+        return q
+
+    def _memory_sweep(self, now: float) -> None:
+        if len(self.hits) <= MAX_KEYS:
+            return
+        window = self.limit[1]
+        for key in [k for k, q in self.hits.items() if not q or q[-1] <= now - window]:
+            del self.hits[key]
+
+    # ---- db store ----
+    def _db_window(self, db, key: str, now: datetime):
+        since = now - timedelta(seconds=self.limit[1])
+        return db.query(func.count(RateLimitHit.id), func.min(RateLimitHit.at)).filter(
+            RateLimitHit.bucket == self.name, RateLimitHit.key == key, RateLimitHit.at > since,
+        ).one()
+
+    def retry_after(self, key: str) -> int:
+        """ Seconds until key may hit again; 0 when it is under the limit. """
+        if self.limit is None or not key:
+            return 0
+        count, window = self.limit
+
+        if settings.RATE_LIMIT_STORE == "db":
+            now = datetime.utcnow()
+            db = SessionLocal()
+            try:
+                hits, oldest = self._db_window(db, key, now)
+            finally:
+                db.close()
+            if hits < count:
+                return 0
+            return max(1, int((oldest + timedelta(seconds=window) - now).total_seconds() + 0.999))
+
+        now = time.time()
+        with self.lock:
+            q = self._memory_hits(key, now)
+            if len(q) < count:
+                return 0
+            return max(1, int(q[0] + window - now + 0.999))
+
+    def hit(self, key: str) -> None:
+        if self.limit is None or not key:
+            return
+
+        if settings.RATE_LIMIT_STORE == "db":
+            now = datetime.utcnow()
+            db = SessionLocal()
+            try:
+                db.add(RateLimitHit(bucket=self.name, key=key, at=now))
+                # Old hits are never needed again
+                db.execute(delete(RateLimitHit).where(
+                    RateLimitHit.bucket == self.name, RateLimitHit.at <= now - timedelta(seconds=self.limit[1]),
+                ))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print("RATE LIMIT ERROR:", type(e).__name__, e)
+            finally:
+                db.close()
+            return
+
+        now = time.time()
+        with self.lock:
+            q = self._memory_hits(key, now)
+            q.append(now)
+            self.hits[key] = q
+            self._memory_sweep(now)
+
+    def reset(self, key: str) -> None:
+        if self.limit is None or not key:
+            return
+        if settings.RATE_LIMIT_STORE == "db":
+            db = SessionLocal()
+            try:
+                db.execute(delete(RateLimitHit).where(RateLimitHit.bucket == self.name, RateLimitHit.key == key))
+                db.commit()
+            finally:
+                db.close()
+            return
+        with self.lock:
+            self.hits.pop(key, None)
+
+
+# Every login/signup attempt from one address (a classroom behind one NAT shares it, so this is generous)
+LOGIN_BY_IP = SlidingWindow("login_ip", settings.LOGIN_RATE_LIMIT_IP)
+# Failed logins for one email, whatever the address; cleared by a successful login
+LOGIN_BY_EMAIL = SlidingWindow("login_email", settings.LOGIN_RATE_LIMIT_EMAIL)
@@ -1,32 +1,30 @@
 # routes_admin.py
-from flask import Blueprint, jsonify
-from sqlalchemy import select
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func
 
 from db import SessionLocal
-from models import User, AnalysisLog
+from models import User, AnalysisLog, ExamSession, ExamTurn, Job
 from admin_utils import admin_required
+from http_cache import etagged
+from model_usage import daily_usage
+from serializers import ANALYSIS_LOG, EXAM_SESSION, EXAM_TURN, USER
+import jobs
+import archive
 
 bp_admin = Blueprint("admin", __name__, url_prefix="/admin")
 
 # Returns a list of all registered users in the system
 @bp_admin.get("/users")
 @admin_required
+@etagged
 def admin_list_users():
     """
     Admin: list all users.
     """
     db = SessionLocal()
     try:
-        users = db.execute(select(User).order_by(User.id.asc())).scalars().all()
-        return jsonify([
-            {
-                "id": u.id,
-                "email": u.email,
-                "is_admin": bool(u.is_admin),
-                "created_at": u.created_at.isoformat() if u.created_at else None
-            }
-            for u in users
-        ]), 200
+        users = db.execute(USER.select().order_by(User.id.asc())).all()
+        return jsonify(USER.many(users)), 200
     finally:
         db.close()
 
@@ -58,23 +56,142 @@ def admin_delete_user(user_id: int):
 # Allows admins to view analysis logs in the system
 @bp_admin.get("/logs")
 @admin_required
+@etagged
 def admin_list_all_logs():
     """
     Admin: view all logs (unfiltered).
     """
     db = SessionLocal()
     try:
-        logs = db.execute(select(AnalysisLog).order_by(AnalysisLog.id.desc())).scalars().all()
-        return jsonify([
-            {
-                "id": l.id,
-                "user_id": l.user_id,
-                "input_text": l.input_text,
-                "feedback_text": l.feedback_text,
-                "model_name": l.model_name,
-                "created_at": l.created_at.isoformat() if l.created_at else None
-            }
-            for l in logs
-        ]), 200
+        logs = db.execute(ANALYSIS_LOG.select().order_by(AnalysisLog.id.desc())).all()
+        return jsonify(ANALYSIS_LOG.many(logs)), 200
+    finally:
+        db.close()
+
+
+# Token and latency usage of the model API, per day / user / endpoint / model
+@bp_admin.get("/usage")
+@admin_required
+@etagged
+def admin_model_usage():
+    """
+    Admin: model usage report.
+    Query params: days (default 7, max 90), user_id (optional)
+    """
+    try:
+        days = min(max(int(request.args.get("days", 7)), 1), 90)
+        user_id = request.args.get("user_id", type=int)
+    except ValueError:
+        return jsonify({"error": "days must be a number"}), 400
+
+    db = SessionLocal()
+    try:
+        rows = daily_usage(db, days=days, user_id=user_id)
+        totals = {
+            "calls": sum(r["calls"] for r in rows),
+            "errors": sum(r["errors"] for r in rows),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in rows),
+            "completion_tokens": sum(r["completion_tokens"] for r in rows),
+        }
+        return jsonify({"days": days, "totals": totals, "rows": rows}), 200
+    finally:
+        db.close()
+
+
+# Queue health: how many jobs of each kind are waiting, running, done or failed, plus the latest failures
+@bp_admin.get("/jobs")
+@admin_required
+@etagged
+def admin_jobs():
+    db = SessionLocal()
+    try:
+        counts = {}
+        for kind, status, n in db.query(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status).all():
+            counts.setdefault(kind, {})[status] = n
+        failed = (
+            db.query(Job).filter(Job.status == "failed").order_by(Job.id.desc()).limit(20).all()
+        )
+        return jsonify({
+            "counts": counts,
+            "recent_failures": [
+                dict(jobs.job_status(j), ref=j.ref, error=j.last_error) for j in failed
+            ],
+        }), 200
+    finally:
+        db.close()
+
+
+# Recomputes the progress aggregates from the stored reports, in the background
+@bp_admin.post("/progress/rebuild")
+@admin_required
+def admin_rebuild_progress():
+    """
+    Admin: rebuild user progress.
+    JSON (optional): { "user_id": 5 }  - omit to rebuild every user
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    job_id = jobs.enqueue("progress_rebuild", {"user_id": int(user_id) if user_id else None}, max_attempts=1)
+    return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+
+# Moves the text of old logs and exam turns into compressed archive rows (archive.py), in the background
+@bp_admin.post("/archive")
+@admin_required
+def admin_archive():
+    """
+    Admin: archive old data now.
+    JSON (optional): { "days": 90, "vacuum": true }  - days defaults to ARCHIVE_AFTER_DAYS
+    """
+    data = request.get_json(silent=True) or {}
+    days = data.get("days")
+    job_id = jobs.enqueue("archive", {"days": int(days) if days else None, "vacuum": bool(data.get("vacuum"))},
+                          ref="archive", max_attempts=1)
+    return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+
+# Hot and archived row counts per table
+@bp_admin.get("/archive")
+@admin_required
+def admin_archive_status():
+    return jsonify(archive.status()), 200
+
+
+# Exports finished and in-progress exams with every answer, a page of sessions at a time
+@bp_admin.get("/exams/export")
+@admin_required
+@etagged
+def admin_export_exams():
+    """
+    Admin: export exams.
+    Query params: after_id (default 0), limit (default 200, max 1000), user_id (optional)
+    Returns the sessions with id > after_id, their turns as a flat list (turn.session_id links them),
+    and next_after_id for the next page (null at the end).
+    """
+    after_id = max(request.args.get("after_id", 0, type=int), 0)
+    limit = min(max(request.args.get("limit", 200, type=int), 1), 1000)
+    user_id = request.args.get("user_id", type=int)
+
+    db = SessionLocal()
+    try:
+        stmt = EXAM_SESSION.select().where(ExamSession.id > after_id)
+        if user_id:
+            stmt = stmt.where(ExamSession.user_id == user_id)
+        sessions = db.execute(stmt.order_by(ExamSession.id.asc()).limit(limit)).all()
+
+        turns = []
+        if sessions:
+            ids = [s[0] for s in sessions]
+            turns = db.execute(
+                EXAM_TURN.select()
+                .where(ExamTurn.session_id.in_(ids))
+                .order_by(ExamTurn.session_id.asc(), ExamTurn.question_number.asc())
+            ).all()
+
+        return jsonify({
+            "sessions": EXAM_SESSION.many(sessions),
+            "turns": archive.hydrate_dicts(db, "exam_turns", EXAM_TURN.many(turns)),
+            "next_after_id": sessions[-1][0] if len(sessions) == limit else None,
+        }), 200
     finally:
         db.close()
@@ -1,14 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
 from sqlalchemy.orm import Session
 from db import get_db
-from models import AnalysisLog, ExamSession, ExamTurn
+from models import AnalysisLog, ExamSession, ExamTurn, Job
 from config import settings
 from audit import write_event
+import question_bank
+import prompt_templates
+import question_similarity
+import exam_reports
+import exam_events
+import jobs
+import tts_cache
+import audio_metrics
+import audio_processing
+import single_flight
+import archive
+import fast_json
+from serializers import EXAM_REPORT_ROW
+from http_cache import etagged
+from routes_speech import transcribe_audio, stt_unavailable
 from flask_login import login_required, current_user
-import openai
 import json
+import os
+import time
 from datetime import datetime
-from collections import defaultdict
+from functools import lru_cache
 import re
 import random
 
@@ -63,20 +79,9 @@ TOPIC_ANGLES = {
         "where you see yourself in 10 years"
     ]
 }
-#  Configure the OpenAI client (OpenAI)  I am going with OpenAI
-# This code is from ChatGPT
-if settings.AZURE_OPENAI_ENDPOINT and settings.AZURE_OPENAI_API_KEY:
-    # Azure OpenAI
-    openai_client = openai.AzureOpenAI(
-        api_key=settings.AZURE_OPENAI_API_KEY,
-        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-        api_version="2024-05-01-preview",
-    )
-    MODEL_ID = settings.AZURE_OPENAI_DEPLOYMENT  # your deployment name
-else:
-    # Standard OpenAI
-    openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-    MODEL_ID = "gpt-4o-mini"  # small/fast model
+#  The OpenAI client (or the local/offline backend) is configured in ai_client.py
+#  model_for() picks the deployment per task: cheap tasks may go to FAST_MODEL_ID, grading stays on MODEL_ID
+from ai_client import openai_client, MODEL_ID, model_for, answered_by_fallback, ModelUnavailable
 
 
 # Defining the scoring criteria used to evaluate the students answer. Provides more consistency
@@ -84,7 +89,8 @@ BANDS = ["Excellent", "Good", "OK", "Needs Work"]
 
 # ChatGPT helped write this
 # Here we actually Evaluate the students answer using the band scoring system and generate feedback
-def evaluate_answer_with_bands(language: str, difficulty: str, question: str, transcript: str) -> dict:
+def evaluate_answer_with_bands(language: str, difficulty: str, question: str, transcript: str,
+                               metrics: dict = None) -> dict:
     """
     Returns a dict with:
       feedback_en, corrected_answer_target, tips_en,
@@ -95,74 +101,47 @@ def evaluate_answer_with_bands(language: str, difficulty: str, question: str, tr
     - feedback_en and tips_en are always English
     - corrected_answer_target is in the exam target language
     - major_mistakes_en should only contain serious errors
+    - with audio measurements (audio_metrics.py) the model sees them, and fluency_band comes from them
     """
 
-    BANDS = ["Excellent", "Good", "OK", "Needs Work"]
-
-    def band_or_default(value):
-        return value if value in BANDS else "OK"
-
-    def normalize_text(value):
-        if isinstance(value, list):
-            return "\n".join(str(v) for v in value).strip()
-        if isinstance(value, str):
-            return value.strip()
-        return ""
-
-    if language == "french":
-        target_lang_name = "French"
-    elif language == "german":
-        target_lang_name = "German"
-    else:
-        target_lang_name = "English"
-
-    system_msg = (
-        "You are a strict but helpful oral-exam evaluator.\n"
-        "You MUST output valid JSON only.\n"
-        "Rules:\n"
-        "- Feedback MUST be in English.\n"
-        f"- The corrected answer MUST be written in {target_lang_name}.\n"
-        "- Use ONLY these band labels: Excellent, Good, OK, Needs Work.\n"
-        "- If there are no serious errors, return major_mistakes_en as an empty list.\n"
-        "- NEVER use placeholders like [your city], [your country], [your hobbies].\n"
-        "- Do NOT invent personal facts the student did not say.\n"
-        "- If info is missing, keep the corrected answer general and faithful to what was said.\n"
-        "- The corrected answer MUST NOT add any new factual details.\n"
-        "- Only use facts explicitly stated in the student's transcript.\n"
-        "- You may add polite generic filler (e.g., 'Nice to meet you.') but no invented specifics.\n"
-        "- If the student's answer correctly answers the question but is short, do NOT treat it as a major problem. Mention it as optional improvement only.\n"
-
-    )
-
-    user_msg = (
-        f"Exam language (student target): {target_lang_name}\n"
-        f"Difficulty: {difficulty}\n"
-        f"Question: {question}\n"
-        f"Student answer (transcript): {transcript}\n\n"
-        "Return JSON with keys:\n"
-        "feedback_en: short bullet points in English\n"
-        f"corrected_answer_target: one strong corrected answer in {target_lang_name}\n"
-        "tips_en: 1–2 short tips in English\n"
-        "bands: object with keys fluency, grammar, vocabulary, pronunciation, overall\n"
-        "major_mistakes_en: list of 1–3 serious mistakes, or empty list if none\n"
-        "Important: corrected_answer_target must not contain bracket placeholders and must not invent details.\n"
-
-    )
-
+    # Static rules come from the template registry; only the question and transcript change per call
     resp = openai_client.chat.completions.create(
         model=MODEL_ID,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
+        messages=prompt_templates.build_messages(
+            "band_evaluator", language, difficulty,
+            prompt_templates.band_evaluator_user(question, transcript, metrics),
+        ),
         temperature=0.2,
         max_tokens=500,
         response_format={"type": "json_object"},
         timeout=30,  # <-- ADD THIS LINE
     )
+    if answered_by_fallback(resp):
+        # Canned local bands would be stored like real ones; grade_turn retries instead
+        raise ModelUnavailable("grading model unavailable")
 
     raw = (resp.choices[0].message.content or "").strip()
-    result = json.loads(raw)
+    result = parse_band_result(raw)
+    if metrics:
+        result["fluency_band"] = audio_metrics.fluency_band(metrics)
+    return result
+
+
+def _band_or_default(value):
+    return value if value in BANDS else "OK"
+
+
+def _normalize_text(value):
+    if isinstance(value, list):
+        return "\n".join(str(v) for v in value).strip()
+    if isinstance(value, str):
+        return value.strip()
+    return ""
+
+
+# Turns the model's JSON reply from evaluate_answer_with_bands into the flat dict we store on ExamTurn
+def parse_band_result(raw: str) -> dict:
+    result = fast_json.loads(raw)
 
     bands = result.get("bands") or {}
 
@@ -171,20 +150,47 @@ def evaluate_answer_with_bands(language: str, difficulty: str, question: str, tr
         major = [major]
 
     return {
-        "feedback_en": normalize_text(result.get("feedback_en")),
-        "corrected_answer_target": normalize_text(result.get("corrected_answer_target")),
-        "tips_en": normalize_text(result.get("tips_en")),
+        "feedback_en": _normalize_text(result.get("feedback_en")),
+        "corrected_answer_target": _normalize_text(result.get("corrected_answer_target")),
+        "tips_en": _normalize_text(result.get("tips_en")),
 
-        "fluency_band": band_or_default(bands.get("fluency")),
-        "grammar_band": band_or_default(bands.get("grammar")),
-        "vocabulary_band": band_or_default(bands.get("vocabulary")),
-        "pronunciation_band": band_or_default(bands.get("pronunciation")),
-        "overall_band": band_or_default(bands.get("overall")),
+        "fluency_band": _band_or_default(bands.get("fluency")),
+        "grammar_band": _band_or_default(bands.get("grammar")),
+        "vocabulary_band": _band_or_default(bands.get("vocabulary")),
+        "pronunciation_band": _band_or_default(bands.get("pronunciation")),
+        "overall_band": _band_or_default(bands.get("overall")),
 
         "major_mistakes_en": "\n".join(f"- {m}" for m in major) if major else "",
     }
 
 
+# Background grading of one mock-exam answer (enqueued by exam_answer)
+@jobs.handler("grade_turn")
+def grade_turn_job(payload: dict):
+    db = db_session()
+    try:
+        turn = db.get(ExamTurn, payload["turn_id"])
+        if not turn or not (turn.transcript or "").strip():
+            return None
+        session = turn.session
+        metrics = json.loads(turn.audio_metrics) if turn.audio_metrics else None
+        result = evaluate_answer_with_bands(session.language, session.difficulty, turn.question_text, turn.transcript,
+                                            metrics)
+        result.pop("major_mistakes_en", None)  # kept per session, not per turn
+        for key, value in result.items():
+            setattr(turn, key, value)
+        db.commit()
+        exam_events.publish(turn.session_id, "turn_graded", {
+            "question_number": turn.question_number,
+            "section": turn.section,
+            "bands": {k: result[k] for k in ("fluency_band", "grammar_band", "vocabulary_band",
+                                              "pronunciation_band", "overall_band")},
+        })
+        return {"turn_id": turn.id, "overall_band": turn.overall_band}
+    finally:
+        db.close()
+
+
 
 
 
@@ -194,422 +200,8 @@ def db_session():
 # generates a SQLAlchemy session, Calling above pulls one session you can use with a block.
 
 
-# Generated using ChatGPT
-EXAM_QUESTION_BANK = {
-    "introduction": {
-        "english": {
-            "beginner": [
-                "Can you introduce yourself?",
-                "How old are you?",
-                "Where do you live?",
-                "What do you like doing at the weekend?",
-                "What is your favourite food?",
-                "Tell me one thing you like about your town or city."
-            ],
-            "moderate": [
-                "Can you introduce yourself?",
-                "Where are you from, and what do you like about where you live?",
-                "What do you usually do on a typical weekday?",
-                "What do you like to do in your free time, and why?",
-                "How would your friends describe you?",
-                "What is one thing you are proud of about yourself?"
-            ],
-            "expert": [
-                "Can you introduce yourself and give some background about your interests?",
-                "How has the place where you live influenced you?",
-                "What personal quality helps you most in study or work, and why?",
-                "Tell me about a recent experience that taught you something important.",
-                "How do you manage your time, and what would you improve?",
-                "What goal are you working towards at the moment, and why does it matter?"
-            ],
-        },
-        "french": {
-            "beginner": [
-                "Peux-tu te présenter ?",
-                "Quel âge as-tu ?",
-                "Où habites-tu ?",
-                "Qu'est-ce que tu aimes faire le week-end ?",
-                "Quel est ton plat préféré ?",
-                "Dis-moi une chose que tu aimes dans ta ville."
-            ],
-            "moderate": [
-                "Peux-tu te présenter ?",
-                "D'où viens-tu et qu'est-ce que tu aimes dans l'endroit où tu habites ?",
-                "Que fais-tu pendant une journée normale en semaine ?",
-                "Qu'est-ce que tu aimes faire pendant ton temps libre et pourquoi ?",
-                "Comment tes amis te décriraient-ils ?",
-                "De quoi es-tu fier(e) chez toi ?"
-            ],
-            "expert": [
-                "Peux-tu te présenter et donner un peu de contexte sur tes centres d'intérêt ?",
-                "En quoi l'endroit où tu vis t'a-t-il influencé(e) ?",
-                "Quelle qualité personnelle t'aide le plus dans tes études ou ton travail, et pourquoi ?",
-                "Raconte une expérience récente qui t'a appris quelque chose d'important.",
-                "Comment gères-tu ton temps et que voudrais-tu améliorer ?",
-                "Quel objectif poursuis-tu en ce moment et pourquoi est-ce important pour toi ?"
-            ],
-        },
-        "german": {
-            "beginner": [
-                "Kannst du dich vorstellen?",
-                "Wie alt bist du?",
-                "Wo wohnst du?",
-                "Was machst du gern am Wochenende?",
-                "Was ist dein Lieblingsessen?",
-                "Nenne eine Sache, die dir an deiner Stadt gefällt."
-            ],
-            "moderate": [
-                "Kannst du dich vorstellen?",
-                "Woher kommst du und was gefällt dir an deinem Wohnort?",
-                "Was machst du normalerweise an einem typischen Wochentag?",
-                "Was machst du gern in deiner Freizeit und warum?",
-                "Wie würden dich deine Freunde beschreiben?",
-                "Worauf bist du besonders stolz?"
-            ],
-            "expert": [
-                "Kannst du dich vorstellen und etwas über deine Interessen erzählen?",
-                "Wie hat dich der Ort, an dem du lebst, beeinflusst?",
-                "Welche persönliche Eigenschaft hilft dir am meisten beim Lernen oder Arbeiten, und warum?",
-                "Erzähl von einer Erfahrung, aus der du etwas Wichtiges gelernt hast.",
-                "Wie organisierst du deine Zeit und was würdest du verbessern?",
-                "Welches Ziel verfolgst du gerade und warum ist es dir wichtig?"
-            ],
-        },
-    },
-
-    "school": {
-        "english": {
-            "beginner": [
-                "Do you go to school or college?",
-                "What subjects do you study?",
-                "What is your favourite subject?",
-                "What time do you start school?",
-                "Do you have homework? Tell me about it.",
-                "Do you like your teachers?"
-            ],
-            "moderate": [
-                "What subjects are you studying?",
-                "What do you like and dislike about school or college?",
-                "Tell me about a recent project or assignment you worked on.",
-                "Which subject do you find most interesting, and why?",
-                "How do you usually study for exams or tests?",
-                "What skills do you think you are improving at school or college?"
-            ],
-            "expert": [
-                "How would you evaluate your current course or programme overall?",
-                "Tell me about a project that challenged you and what you learned from it.",
-                "Which skill is most important in your field of study, and why?",
-                "How do you handle stress during busy academic periods?",
-                "What changes would you make to improve your school or college experience?",
-                "How do you think education prepares people for real life?"
-            ],
-        },
-        "french": {
-            "beginner": [
-                "Tu vas à l'école ou à l'université ?",
-                "Quelles matières étudies-tu ?",
-                "Quelle est ta matière préférée ?",
-                "À quelle heure commences-tu les cours ?",
-                "As-tu des devoirs ? Parle-m'en.",
-                "Aimes-tu tes professeurs ?"
-            ],
-            "moderate": [
-                "Quelles matières étudies-tu ?",
-                "Qu'est-ce que tu aimes et que n'aimes-tu pas à l'école ou à l'université ?",
-                "Parle-moi d'un projet ou d'un devoir récent que tu as fait.",
-                "Quelle matière trouves-tu la plus intéressante et pourquoi ?",
-                "Comment révises-tu normalement pour les examens ?",
-                "Quelles compétences penses-tu améliorer grâce à tes études ?"
-            ],
-            "expert": [
-                "Comment évaluerais-tu ton programme d'études dans l'ensemble ?",
-                "Parle-moi d'un projet difficile et de ce que tu en as appris.",
-                "Quelle compétence est la plus importante dans ton domaine et pourquoi ?",
-                "Comment gères-tu le stress pendant les périodes chargées ?",
-                "Qu'est-ce que tu changerais pour améliorer ton expérience scolaire ?",
-                "Selon toi, à quoi sert l'éducation dans la vie réelle ?"
-            ],
-        },
-        "german": {
-            "beginner": [
-                "Gehst du zur Schule oder zur Uni?",
-                "Welche Fächer lernst du?",
-                "Was ist dein Lieblingsfach?",
-                "Wann beginnt die Schule/Uni?",
-                "Hast du Hausaufgaben? Erzähl davon.",
-                "Magst du deine Lehrer?"
-            ],
-            "moderate": [
-                "Welche Fächer lernst du?",
-                "Was magst du und was magst du nicht an der Schule oder Universität?",
-                "Erzähl mir von einem Projekt oder einer Aufgabe, die du kürzlich gemacht hast.",
-                "Welches Fach findest du am interessantesten und warum?",
-                "Wie lernst du normalerweise für Prüfungen?",
-                "Welche Fähigkeiten verbesserst du deiner Meinung nach in der Schule/Uni?"
-            ],
-            "expert": [
-                "Wie würdest du dein aktuelles Studium insgesamt bewerten?",
-                "Erzähl von einem Projekt, das dich gefordert hat, und was du daraus gelernt hast.",
-                "Welche Fähigkeit ist in deinem Studienbereich am wichtigsten und warum?",
-                "Wie gehst du mit Stress in intensiven Phasen um?",
-                "Was würdest du ändern, um deine Schul-/Uni-Erfahrung zu verbessern?",
-                "Wie bereitet Bildung deiner Meinung nach auf das echte Leben vor?"
-            ],
-        },
-    },
-
-    "hobbies": {
-        "english": {
-            "beginner": [
-                "What do you do in your free time?",
-                "Do you like sports?",
-                "Do you like music?",
-                "Do you like watching films or TV?",
-                "Do you like reading?",
-                "Tell me about your favourite hobby."
-            ],
-            "moderate": [
-                "What do you like to do in your free time?",
-                "Tell me about a hobby you enjoy and why you like it.",
-                "How often do you do it, and who do you usually do it with?",
-                "Do you prefer indoor or outdoor activities? Why?",
-                "Tell me about a film or TV series you enjoyed recently.",
-                "What hobby would you like to try in the future, and why?"
-            ],
-            "expert": [
-                "How do your hobbies affect your mood or stress levels?",
-                "Tell me about a hobby that helped you develop a useful skill.",
-                "Do you think hobbies should be productive, or just enjoyable? Why?",
-                "How has your free time changed over the last few years?",
-                "Describe a memorable experience connected to one of your hobbies.",
-                "If you had more free time, what would you do differently and why?"
-            ],
-        },
-        "french": {
-            "beginner": [
-                "Qu'est-ce que tu fais pendant ton temps libre ?",
-                "Aimes-tu le sport ?",
-                "Aimes-tu la musique ?",
-                "Aimes-tu regarder des films ou des séries ?",
-                "Aimes-tu lire ?",
-                "Parle-moi de ton loisir préféré."
-            ],
-            "moderate": [
-                "Qu'est-ce que tu aimes faire pendant ton temps libre ?",
-                "Parle-moi d'un loisir que tu aimes et explique pourquoi.",
-                "À quelle fréquence fais-tu cette activité et avec qui ?",
-                "Tu préfères les activités à l'intérieur ou à l'extérieur ? Pourquoi ?",
-                "Parle-moi d'un film ou d'une série que tu as apprécié(e) récemment.",
-                "Quel loisir aimerais-tu essayer dans le futur et pourquoi ?"
-            ],
-            "expert": [
-                "Comment tes loisirs influencent-ils ton humeur ou ton stress ?",
-                "Parle-moi d'un loisir qui t'a aidé à développer une compétence utile.",
-                "Selon toi, un loisir doit-il être productif ou simplement agréable ? Pourquoi ?",
-                "Comment ton temps libre a-t-il changé ces dernières années ?",
-                "Décris une expérience mémorable liée à un de tes loisirs.",
-                "Si tu avais plus de temps libre, que ferais-tu différemment et pourquoi ?"
-            ],
-        },
-        "german": {
-            "beginner": [
-                "Was machst du in deiner Freizeit?",
-                "Magst du Sport?",
-                "Magst du Musik?",
-                "Schaust du gern Filme oder Serien?",
-                "Liest du gern?",
-                "Erzähl mir von deinem Lieblingshobby."
-            ],
-            "moderate": [
-                "Was machst du gern in deiner Freizeit?",
-                "Erzähl mir von einem Hobby, das dir gefällt, und warum.",
-                "Wie oft machst du das und mit wem?",
-                "Magst du lieber Aktivitäten drinnen oder draußen? Warum?",
-                "Erzähl mir von einem Film oder einer Serie, die dir kürzlich gefallen hat.",
-                "Welches Hobby würdest du gern in Zukunft ausprobieren und warum?"
-            ],
-            "expert": [
-                "Wie beeinflussen deine Hobbys deine Stimmung oder deinen Stress?",
-                "Erzähl von einem Hobby, durch das du eine nützliche Fähigkeit gelernt hast.",
-                "Sollten Hobbys deiner Meinung nach produktiv sein oder einfach Spaß machen? Warum?",
-                "Wie hat sich deine Freizeit in den letzten Jahren verändert?",
-                "Beschreibe ein besonderes Erlebnis, das mit einem Hobby verbunden ist.",
-                "Wenn du mehr Freizeit hättest, was würdest du anders machen und warum?"
-            ],
-        },
-    },
-
-    "family_friends": {
-        "english": {
-            "beginner": [
-                "Do you have a big family or a small family?",
-                "Do you have brothers or sisters?",
-                "Who do you live with?",
-                "Tell me about your best friend.",
-                "What do you do with your friends?",
-                "Do you like spending time with your family?"
-            ],
-            "moderate": [
-                "Can you tell me about your family?",
-                "Who are you closest to, and why?",
-                "What do you and your family or friends like to do together?",
-                "Tell me about a friend who is important to you.",
-                "What do you value most in a friend?",
-                "How do you keep in touch with friends or family members?"
-            ],
-            "expert": [
-                "How have your family or friends influenced your decisions?",
-                "What makes a friendship strong in your opinion?",
-                "Describe a time when someone supported you and how it helped.",
-                "Do you think social media improves or harms friendships? Why?",
-                "How do you deal with disagreements with friends or family?",
-                "What do you think is the most important value in relationships?"
-            ],
-        },
-        "french": {
-            "beginner": [
-                "Tu as une grande famille ou une petite famille ?",
-                "As-tu des frères ou des sœurs ?",
-                "Avec qui habites-tu ?",
-                "Parle-moi de ton/ta meilleur(e) ami(e).",
-                "Qu'est-ce que tu fais avec tes amis ?",
-                "Aimes-tu passer du temps avec ta famille ?"
-            ],
-            "moderate": [
-                "Peux-tu me parler de ta famille ?",
-                "Avec qui es-tu le plus proche et pourquoi ?",
-                "Qu'est-ce que toi et ta famille ou tes amis aimez faire ensemble ?",
-                "Parle-moi d'un ami important pour toi.",
-                "Qu'est-ce que tu apprécies le plus chez un ami ?",
-                "Comment gardes-tu le contact avec tes amis ou les membres de ta famille ?"
-            ],
-            "expert": [
-                "Comment ta famille ou tes amis ont-ils influencé tes choix ?",
-                "Selon toi, qu'est-ce qui rend une amitié solide ?",
-                "Décris un moment où quelqu'un t'a soutenu et comment cela t'a aidé(e).",
-                "Penses-tu que les réseaux sociaux améliorent ou abîment les amitiés ? Pourquoi ?",
-                "Comment gères-tu les désaccords avec tes proches ?",
-                "Quelle est, selon toi, la valeur la plus importante dans une relation ?"
-            ],
-        },
-        "german": {
-            "beginner": [
-                "Hast du eine große oder eine kleine Familie?",
-                "Hast du Brüder oder Schwestern?",
-                "Mit wem wohnst du?",
-                "Erzähl mir von deinem besten Freund/deiner besten Freundin.",
-                "Was machst du mit deinen Freunden?",
-                "Verbringst du gern Zeit mit deiner Familie?"
-            ],
-            "moderate": [
-                "Kannst du mir von deiner Familie erzählen?",
-                "Mit wem bist du am engsten verbunden und warum?",
-                "Was machst du gern mit deiner Familie oder deinen Freunden zusammen?",
-                "Erzähl mir von einem Freund, der dir wichtig ist.",
-                "Was ist dir bei einem Freund am wichtigsten?",
-                "Wie hältst du Kontakt zu Freunden oder Familienmitgliedern?"
-            ],
-            "expert": [
-                "Wie haben Familie oder Freunde deine Entscheidungen beeinflusst?",
-                "Was macht eine Freundschaft deiner Meinung nach stark?",
-                "Beschreibe eine Situation, in der dich jemand unterstützt hat, und warum das wichtig war.",
-                "Verbessern oder verschlechtern soziale Medien Freundschaften? Warum?",
-                "Wie gehst du mit Konflikten in der Familie oder im Freundeskreis um?",
-                "Welche Werte sind dir in Beziehungen am wichtigsten?"
-            ],
-        },
-    },
-
-    "future_plans": {
-        "english": {
-            "beginner": [
-                "What do you want to do in the future?",
-                "What job would you like to have?",
-                "Do you want to travel in the future?",
-                "Do you want to study more?",
-                "Where would you like to live in the future?",
-                "Tell me one goal you have."
-            ],
-            "moderate": [
-                "What would you like to do in the future?",
-                "What career interests you, and why?",
-                "What is one goal you want to achieve in the next few years?",
-                "Would you like to study more in the future? What and why?",
-                "Do you want to work in your country or abroad? Why?",
-                "What skills do you want to develop for your future?"
-            ],
-            "expert": [
-                "What does success mean to you personally?",
-                "How do you plan to reach your long-term goals?",
-                "What challenges might you face in your future career, and how will you handle them?",
-                "Would you rather have a stable job or take risks? Why?",
-                "How do you think technology will change your future work or life?",
-                "If you could change one thing about your future, what would it be and why?"
-            ],
-        },
-        "french": {
-            "beginner": [
-                "Qu'est-ce que tu veux faire dans le futur ?",
-                "Quel métier aimerais-tu faire ?",
-                "Veux-tu voyager dans le futur ?",
-                "Veux-tu continuer tes études ?",
-                "Où aimerais-tu vivre plus tard ?",
-                "Dis-moi un objectif que tu as."
-            ],
-            "moderate": [
-                "Qu'aimerais-tu faire dans le futur ?",
-                "Quel métier t'intéresse et pourquoi ?",
-                "Quel est un objectif que tu veux atteindre dans les prochaines années ?",
-                "Aimerais-tu continuer tes études ? Quoi et pourquoi ?",
-                "Veux-tu travailler dans ton pays ou à l'étranger ? Pourquoi ?",
-                "Quelles compétences veux-tu développer pour ton avenir ?"
-            ],
-            "expert": [
-                "Que signifie la réussite pour toi, personnellement ?",
-                "Comment comptes-tu atteindre tes objectifs à long terme ?",
-                "Quels défis pourrais-tu rencontrer dans ta future carrière et comment vas-tu les gérer ?",
-                "Préfères-tu un travail stable ou prendre des risques ? Pourquoi ?",
-                "Selon toi, comment la technologie va-t-elle changer ton futur travail ou ta vie ?",
-                "Si tu pouvais changer une chose dans ton avenir, laquelle serait-ce et pourquoi ?"
-            ],
-        },
-        "german": {
-            "beginner": [
-                "Was möchtest du in der Zukunft machen?",
-                "Welchen Beruf möchtest du haben?",
-                "Möchtest du in Zukunft reisen?",
-                "Möchtest du weiter studieren?",
-                "Wo möchtest du später wohnen?",
-                "Nenne ein Ziel, das du hast."
-            ],
-            "moderate": [
-                "Was möchtest du in der Zukunft machen?",
-                "Welcher Beruf interessiert dich und warum?",
-                "Welches Ziel möchtest du in den nächsten Jahren erreichen?",
-                "Möchtest du in Zukunft weiter studieren? Was und warum?",
-                "Möchtest du in deinem Land oder im Ausland arbeiten? Warum?",
-                "Welche Fähigkeiten möchtest du für deine Zukunft entwickeln?"
-            ],
-            "expert": [
-                "Was bedeutet Erfolg für dich persönlich?",
-                "Wie planst du, deine langfristigen Ziele zu erreichen?",
-                "Welche Herausforderungen erwartest du in deiner Karriere, und wie gehst du damit um?",
-                "Würdest du lieber einen sicheren Job haben oder Risiken eingehen? Warum?",
-                "Wie wird Technologie deiner Meinung nach deine Arbeit oder dein Leben verändern?",
-                "Wenn du eine Sache an deiner Zukunft ändern könntest, was wäre das und warum?"
-            ],
-        },
-    },
-}
-
-
-
-
-
-
-
-
-
+# How many times we ask the model again when it repeats an earlier question
+MAX_DUPLICATE_RETRIES = 2
 
 
 # Generates the first practise quesiton or a new one when skipping.
@@ -622,7 +214,9 @@ def start_exam():
     JSON:
     {
       "topic": "school life",
-      "difficulty": "beginner" | "moderate" | "expert"
+      "difficulty": "beginner" | "moderate" | "expert",
+      "last_question": "...",          (optional)
+      "asked_questions": ["...", ...]  (optional, questions already shown in this practice run)
     }
     """
 
@@ -632,6 +226,11 @@ def start_exam():
     language = (data.get("language") or "english").strip().lower()
     last_question = (data.get("last_question") or "").strip()
 
+    # Questions the client has already shown in this practice run (most recent last)
+    asked_questions = [str(q) for q in (data.get("asked_questions") or [])[-20:] if q]
+    if last_question:
+        asked_questions.append(last_question)
+
     # Map your difficulty labels to approximate CEFR-like descriptions.
     if difficulty == "beginner":
         level_desc = "A2 (beginner)"
@@ -652,107 +251,258 @@ def start_exam():
 
     # Choose angle
     angles = TOPIC_ANGLES.get(topic.lower(), ["general discussion"])
-    angle = random.choice(angles)
 
     # Avoid repeating same angle if last_question exists
     if last_question:
         # remove angle if it appears in last question
         filtered = [a for a in angles if a.lower() not in last_question.lower()]
         if filtered:
-            angle = random.choice(filtered)
-
-    system_msg = (
-        f"You are an oral-exam interlocutor for a {level_desc} learner. "
-        f"The exam language is {lang_name}. "
-        f"ALWAYS speak and write in {lang_name}. "
-        f"The main topic is: {topic}. "
-        f"The specific focus of this question must be: {angle}. "
-        f"{difficulty_hint} "
-        "Ask ONE clear, open-ended question that the student can answer in 20–40 seconds. "
-        "Do not include explanations. Output only the question."
-    )
+            angles = filtered
 
     try:
-        resp = openai_client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": f"Start the exam with a question about: {topic}."},
-            ],
-            temperature=0.7,
-            max_tokens=100,
-        )
-        question = (resp.choices[0].message.content or "").strip()
+        best_question, best_score = "", None
+        for _ in range(MAX_DUPLICATE_RETRIES + 1):
+            angle = random.choice(angles)
+
+            system_msg = (
+                f"You are an oral-exam interlocutor for a {level_desc} learner. "
+                f"The exam language is {lang_name}. "
+                f"ALWAYS speak and write in {lang_name}. "
+                f"The main topic is: {topic}. "
+                f"The specific focus of this question must be: {angle}. "
+                f"{difficulty_hint} "
+                "Ask ONE clear, open-ended question that the student can answer in 20–40 seconds. "
+                "Do not include explanations. Output only the question."
+            )
+
+            resp = openai_client.chat.completions.create(
+                model=model_for("question"),
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": f"Start the exam with a question about: {topic}."},
+                ],
+                temperature=0.7,
+                max_tokens=100,
+            )
+            question = (resp.choices[0].message.content or "").strip()
+
+            # Keep the least repetitive question; stop as soon as one is new enough
+            score = question_similarity.max_similarity(question, asked_questions)
+            if best_score is None or score < best_score:
+                best_question, best_score = question, score
+            if score < question_similarity.DUPLICATE_THRESHOLD:
+                break
+
+            # Try a different angle next time
+            angles = [a for a in angles if a != angle] or angles
+
         return jsonify({
-            "question": question,
-            "model": MODEL_ID
+            "question": best_question,
+            "model": model_for("question")
         }), 200
 
     except Exception as e:
         return jsonify({"error": "start_exam failed", "details": str(e)}), 500
 
 # Generates follow up questions.
-def generate_followup_question(language: str, difficulty: str, section: str, last_question: str, transcript: str) -> str:
-    # Map language code to display name
-    target_lang_name = "English"
-    if language == "french":
-        target_lang_name = "French"
-    elif language == "german":
-        target_lang_name = "German"
+# Raises ValueError if every attempt was a near-duplicate of a question already asked,
+# so the caller can fall back to an unused bank question instead.
+def generate_followup_question(language: str, difficulty: str, section: str, last_question: str, transcript: str,
+                               asked_questions=(), used_bits: int = 0) -> str:
+    system_msg = prompt_templates.system_prompt("followup_question", language, difficulty)
+    user_msg = prompt_templates.followup_question_user(section, last_question, transcript)
+
+    asked = list(asked_questions) or [last_question]
+    asked_vectors = question_similarity.used_bank_vectors(used_bits)
+
+    for attempt in range(MAX_DUPLICATE_RETRIES + 1):
+        messages = [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg},
+        ]
+        if attempt:
+            # Tell the model what it repeated and nudge it somewhere new
+            messages.append({"role": "assistant", "content": q})
+            messages.append({"role": "user", "content": "That is too similar to a question already asked. "
+                                                        "Ask about a different aspect."})
 
-    if difficulty == "beginner":
-        difficulty_instruction = (
-            "The student is a beginner (A2). "
-            "Use very simple vocabulary and short sentences. "
-            "Ask a clear, concrete question about familiar topics. "
-            "Avoid abstract ideas or complex grammar."
-        )
-    elif difficulty == "expert":
-        difficulty_instruction = (
-            "The student is advanced (B2–C1). "
-            "Ask a more detailed or analytical follow-up question. "
-            "Encourage explanation, justification, or reflection. "
-            "You may explore opinions, consequences, or comparisons."
-        )
-    else:
-        difficulty_instruction = (
-            "The student is intermediate (B1). "
-            "Ask a natural follow-up question that encourages some detail. "
-            "Use everyday vocabulary but allow moderate complexity."
+        resp = openai_client.chat.completions.create(
+            model=model_for("question"),
+            messages=messages,
+            temperature=0.4 + 0.2 * attempt,
+            max_tokens=80,
+            timeout=30,
         )
 
-    system_msg = (
-        "You are an oral exam examiner.\n"
-        f"The exam language is {target_lang_name}. You MUST output only ONE question in {target_lang_name}.\n"
-        f"{difficulty_instruction}\n"
-        "Rules:\n"
-        "- Ask ONE clear follow-up question based on what the student just said.\n"
-        "- Do not give feedback.\n"
-        "- Do not include multiple questions.\n"
-        "- Keep it answerable in 20–40 seconds.\n"
-    )
+        q = (resp.choices[0].message.content or "").strip().strip('"').strip()
+        if not question_similarity.is_near_duplicate(q, asked, asked_vectors):
+            return q
 
-    user_msg = (
-        f"Section: {section}\n"
-        f"Difficulty: {difficulty}\n"
-        f"Previous question: {last_question}\n"
-        f"Student answer (transcript): {transcript}\n\n"
-        "Write the next follow-up question."
-    )
+    raise ValueError("follow-up question was a near-duplicate of an earlier question")
 
-    resp = openai_client.chat.completions.create(
-        model=MODEL_ID,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-        temperature=0.4,
-        max_tokens=80,
-        timeout=30,
+
+# Whisper language code per exam language (exam/submit without a "lang" field)
+STT_LANGUAGES = {"english": "en", "french": "fr", "german": "de"}
+
+EXAM_SECTIONS = ("introduction", "school", "hobbies", "family_friends", "future_plans")
+
+
+# The order of (section, question slot) pairs for an exam of a given length.
+# Slots 0 and 1 are bank questions, slot 2 is the AI follow-up.
+# It only depends on the length, so it is built once per length and reused.
+@lru_cache(maxsize=None)
+def build_question_sequence(total_questions: int) -> tuple:
+    questions_per_section = total_questions // len(EXAM_SECTIONS)
+
+    sequence = []
+
+    for section in EXAM_SECTIONS:
+        if questions_per_section == 1:
+            # 5-question exam → bank only
+            sequence.append((section, 0))
+
+        elif questions_per_section == 2:
+            # 10-question exam → bank then AI
+            sequence.append((section, 0))
+            sequence.append((section, 2))  # AI follow-up
+
+        else:
+            # 15-question exam → bank, bank, AI
+            sequence.append((section, 0))
+            sequence.append((section, 1))
+            sequence.append((section, 2))
+
+    return tuple(sequence)
+
+
+# Loads the student's session and the turn being answered; returns (session, turn, error response)
+def _load_answer_turn(db, session_id, question_number):
+    # 1) Load session and confirm ownership
+    session = db.get(ExamSession, int(session_id))
+    if not session or session.user_id != current_user.id:
+        return None, None, (jsonify({"error": "session not found"}), 404)
+    if session.status != "in_progress":
+        return None, None, (jsonify({"error": "session is not in progress"}), 400)
+
+    # 2) Load the current turn
+    turn = db.query(ExamTurn).filter(
+        ExamTurn.session_id == session.id,
+        ExamTurn.question_number == int(question_number)
+    ).first()
+    if not turn:
+        return None, None, (jsonify({"error": "turn not found"}), 404)
+    return session, turn, None
+
+
+# Saves the transcript of the current turn and creates the next question (shared by exam/answer and exam/submit).
+# Returns the JSON body for the page.
+def _save_answer_and_advance(db, session, turn, transcript: str, metrics: dict = None) -> dict:
+    question_number = turn.question_number
+
+    # 3) Save transcript
+    turn.transcript = transcript
+    turn.audio_metrics = json.dumps(metrics) if metrics else None
+    db.add(turn)
+    db.commit()
+
+    # Band grading of this answer runs as a job; the student gets the next question without waiting for it
+    if settings.GRADE_EXAM_TURNS:
+        jobs.enqueue("grade_turn", {"turn_id": turn.id}, ref=exam_reports.grade_ref(session.id),
+                     user_id=current_user.id)
+
+    # 4) Decide next question (fixed bank)
+    # For now: 2 intro questions, then 2 school questions, then finish.
+    language = session.language
+
+    sequence = build_question_sequence(session.total_questions)
+
+    next_index = question_number  # if we just answered #1, next_index points to item 2
+
+    # Last answer of a section: summarise that section in the background so exam_finish only has to merge
+    if next_index >= len(sequence) or sequence[next_index][0] != turn.section:
+        exam_reports.schedule_section_report(session.id, turn.section, user_id=session.user_id)
+    if next_index >= len(sequence):
+        # no more questions -> finish (we'll make a proper /finish endpoint next)
+        session.status = "completed"
+        session.completed_at = datetime.utcnow()
+        db.add(session)
+        db.commit()
+        exam_events.publish(session.id, "completed", {"question_number": question_number})
+
+        return {
+            "done": True,
+            "needs_finish": True,
+            "session_id": session.id,
+        }
+
+    next_section, q_idx = sequence[next_index]
+
+    bank_ids = question_bank.question_ids(next_section, language, session.difficulty)
+    used = question_bank.decode_used(session.used_questions)
+    next_question_id = None
+
+    # Bank questions for first 2 in the section (q_idx 0 and 1)
+    if q_idx in (0, 1):
+        next_question_id = bank_ids[q_idx]
+        # Don't ask a bank question twice in one session (e.g. it was picked by start or skip)
+        if question_bank.is_used(used, next_question_id):
+            next_question_id = question_bank.pick_unused(bank_ids, used, exclude=turn.question_id)
+        next_question_text = question_bank.question_text(next_question_id)
+
+    # AI-generated ONLY for the final question in the section (q_idx 2)
+    else:  # q_idx == 2
+        asked_questions = [
+            q[0] for q in db.query(ExamTurn.question_text).filter(ExamTurn.session_id == session.id)
+        ]
+        last_question, difficulty = turn.question_text, session.difficulty
+        # End the read transaction so the pooled connection isn't held while the model runs
+        db.commit()
+        try:
+            next_question_text = generate_followup_question(
+                language=language,
+                difficulty=difficulty,
+                section=next_section,
+                last_question=last_question,  # question they just answered
+                transcript=transcript,  # what they just said
+                asked_questions=asked_questions,
+                used_bits=used,
+            )
+        except Exception as e:
+            print("FOLLOWUP GEN ERROR:", e)
+            # fallback to an unused bank question if AI fails
+            next_question_id = question_bank.pick_unused(bank_ids, used, exclude=turn.question_id)
+            next_question_text = question_bank.question_text(next_question_id)
+
+    if next_question_id is not None:
+        session.used_questions = question_bank.encode_used(question_bank.mark_used(used, next_question_id))
+        db.add(session)
+
+    next_q_number = question_number + 1
+
+    # 5) Create next turn (question only)
+    next_turn = ExamTurn(
+        session_id=session.id,
+        question_number=next_q_number,
+        section=next_section,
+        question_id=next_question_id,
+        question_text=next_question_text,
     )
+    db.add(next_turn)
+    db.commit()
 
-    q = (resp.choices[0].message.content or "").strip()
-    return q.strip('"').strip()
+    exam_events.publish(session.id, "question", {
+        "question_number": next_q_number, "section": next_section, "question": next_question_text,
+    })
+    # Render the question's audio now, so the page's /api/tts call is served from the cache
+    tts_cache.prerender(next_question_text, language, session.id, user_id=session.user_id)
+
+    return {
+        "done": False,
+        "session_id": session.id,
+        "question_number": next_q_number,
+        "section": next_section,
+        "question": next_question_text,
+    }
 
 
 # This code is from ChatGPT
@@ -782,111 +532,69 @@ def exam_answer():
 
     db = db_session()
     try:
-        # 1) Load session and confirm ownership
-        session = db.get(ExamSession, int(session_id))
-        if not session or session.user_id != current_user.id:
-            return jsonify({"error": "session not found"}), 404
-        if session.status != "in_progress":
-            return jsonify({"error": "session is not in progress"}), 400
-
-        # 2) Load the current turn
-        turn = db.query(ExamTurn).filter(
-            ExamTurn.session_id == session.id,
-            ExamTurn.question_number == int(question_number)
-        ).first()
-        if not turn:
-            return jsonify({"error": "turn not found"}), 404
-
-        # 3) Save transcript
-        turn.transcript = transcript
-        db.add(turn)
-        db.commit()
-
-        # 4) Decide next question (fixed bank)
-        # For now: 2 intro questions, then 2 school questions, then finish.
-        language = session.language
-
-        sections = ["introduction", "school", "hobbies", "family_friends", "future_plans"]
-
-        questions_per_section = session.total_questions // len(sections)
-
-        sequence = []
-
-        for section in sections:
-            if questions_per_section == 1:
-                # 5-question exam → bank only
-                sequence.append((section, 0))
-
-            elif questions_per_section == 2:
-                # 10-question exam → bank then AI
-                sequence.append((section, 0))
-                sequence.append((section, 2))  # AI follow-up
+        session, turn, error = _load_answer_turn(db, session_id, question_number)
+        if error:
+            return error
+        return jsonify(_save_answer_and_advance(db, session, turn, transcript)), 200
+    finally:
+        db.close()
 
-            else:
-                # 15-question exam → bank, bank, AI
-                sequence.append((section, 0))
-                sequence.append((section, 1))
-                sequence.append((section, 2))
 
-        next_index = int(question_number)  # if we just answered #1, next_index points to item 2
-        if next_index >= len(sequence):
-            # no more questions -> finish (we'll make a proper /finish endpoint next)
-            session.status = "completed"
-            session.completed_at = datetime.utcnow()
-            db.add(session)
-            db.commit()
-
-            return jsonify({
-                "done": True,
-                "needs_finish": True,
-                "session_id": session.id
-            }), 200
+@bp_ai.post("/exam/submit")
+@login_required
+def exam_submit():
+    """
+    One step of the mock exam in one request: transcribes the recorded answer, saves it
+    and returns the next question (exam/answer), with its audio URL when it is already rendered.
 
-        next_section, q_idx = sequence[next_index]
+    Multipart form-data:
+      file: audio file (webm/ogg/wav/mp3/m4a)
+      session_id, question_number
+      lang: BCP-47 like 'fr-FR' (optional, defaults to the exam language)
+    """
+    f = request.files.get("file")
+    session_id = request.form.get("session_id")
+    question_number = request.form.get("question_number")
 
-        # Bank questions for first 2 in the section (q_idx 0 and 1)
-        if q_idx in (0, 1):
-            next_question_text = EXAM_QUESTION_BANK[next_section][language][session.difficulty][q_idx]
+    if not session_id or not question_number:
+        return jsonify({"error": "session_id and question_number are required"}), 400
+    if not f:
+        return jsonify({"error": "audio file is required (form field 'file')"}), 400
 
-        # AI-generated ONLY for the final question in the section (q_idx 2)
-        else:  # q_idx == 2
-            try:
-                next_question_text = generate_followup_question(
-                    language=language,
-                    difficulty=session.difficulty,
-                    section=next_section,
-                    last_question=turn.question_text,  # question they just answered
-                    transcript=transcript  # what they just said
-                )
-            except Exception as e:
-                print("FOLLOWUP GEN ERROR:", e)
-                # fallback to bank q_idx 2 if AI fails
-                next_question_text = EXAM_QUESTION_BANK[next_section][language][session.difficulty][2]
-
-        next_q_number = int(question_number) + 1
-
-        # 5) Create next turn (question only)
-        next_turn = ExamTurn(
-            session_id=session.id,
-            question_number=next_q_number,
-            section=next_section,
-            question_text=next_question_text,
-        )
-        db.add(next_turn)
+    db = db_session()
+    try:
+        session, turn, error = _load_answer_turn(db, session_id, question_number)
+        if error:
+            return error
+        lang_in = request.form.get("lang") or STT_LANGUAGES.get(session.language, "en")
+        # Release the pooled connection while Whisper runs
         db.commit()
 
-
-        return jsonify({
-            "done": False,
-            "session_id": session.id,
-            "question_number": next_q_number,
-            "section": next_section,
-            "question": next_question_text,
-
-        }), 200
-
-
-
+        audio = f.read()
+        try:
+            transcript, lang_used, samples = transcribe_audio(audio, f.filename, lang_in)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return stt_unavailable(e)
+        if not transcript:
+            return jsonify({"error": "empty transcript", "transcript": ""}), 422
+
+        # Speech rate and pauses: measured here from the audio, used when the answer is graded
+        if samples is None:  # transcript came from the cache
+            samples = audio_processing.speech_samples(audio)
+        metrics = audio_metrics.compute(samples, transcript, session.language)
+
+        result = _save_answer_and_advance(db, session, turn, transcript, metrics)
+        result["transcript"] = transcript
+        result["lang_used"] = lang_used
+        result["audio_metrics"] = metrics
+        if not result["done"]:
+            # Usually still rendering; the tts_ready event (exam_events.py) brings the URL when it isn't
+            voice = tts_cache.voice_for(session.language)
+            cached = os.path.exists(tts_cache.cache_path(result["question"], voice))
+            result["audio_url"] = tts_cache.cached_url(result["question"], voice) if cached else None
+        return jsonify(result), 200
     finally:
         db.close()
 
@@ -921,75 +629,16 @@ def exam_turn():
     if not last_question:
         return jsonify({"error": "last_question is required"}), 400
 
-    # Map difficulty to descriptive text for the model.
-    if difficulty == "beginner":
-        level_desc = "A2 (beginner)"
-        difficulty_hint = (
-            "Expect short, simple answers with basic vocabulary. "
-            "Focus feedback on simple grammar and basic mistakes."
-        )
-    elif difficulty == "expert":
-        level_desc = "B2–C1 (advanced)"
-        difficulty_hint = (
-            "Expect longer, detailed answers with more complex grammar. "
-            "Focus feedback on nuance, cohesion, and advanced accuracy."
-        )
-    else:
-        level_desc = "B1 (intermediate)"
-        difficulty_hint = (
-            "Expect answers with everyday vocabulary and some detail. "
-            "Focus feedback on common grammar mistakes and fluency."
-        )
-
-    if language == "french":
-        lang_name = "French"
-    elif language == "german":
-        lang_name = "German"
-    else:
-        lang_name = "English"
-
-    system_msg = (
-        f"You are a strict but fair oral-exam tutor for a {level_desc} learner.\n"
-        f"Target language (student should speak): {lang_name}.\n"
-        "IMPORTANT OUTPUT RULES:\n"
-        "- You MUST return a JSON object with keys: feedback, corrected_answer, tip, score, next_question.\n"
-        "- feedback and tip MUST be in English.\n"
-        f"- corrected_answer MUST be written in {lang_name}.\n"
-        "- Do NOT give generic advice. Only mention issues that actually appear in the student's transcript.\n"
-        "- In feedback, include 1–2 short quoted snippets from the student's transcript as evidence "
-        "for any criticism. If there are no real errors, explicitly say so.\n"
-        "- corrected_answer rules:\n"
-        f"  * If the student answer is already good and natural in {lang_name}, set corrected_answer to 'NO_CHANGES_NEEDED'.\n"
-        f"  * If there are problems, corrected_answer MUST be a better version in {lang_name} and MUST differ from the original.\n"
-        "\n"
-        "SCORING RUBRIC (be strict, avoid inflated scores):\n"
-        "1–2: mostly unintelligible / off-topic\n"
-        "3–4: very limited, many basic errors, hard to follow\n"
-        "5–6: understandable, some errors and/or limited detail\n"
-        "7: good, minor errors only, mostly natural\n"
-        "8: very good, clear + natural, minor slips\n"
-        "9: excellent, fluent + accurate, strong vocabulary\n"
-        "10: near-native for this level (rare)\n"
-        "\n"
-        "The next_question MUST be one clear open-ended question in the TARGET language "
-        f"({lang_name}) and should fit a 20–40 second spoken answer.\n"
-    )
-
-    user_msg = (
-        f"Exam topic: {topic}\n"
-        f"Examiner question: {last_question}\n"
-        f"Student answer (spoken transcript): {transcript}\n\n"
-        "Analyse this as a SPOKEN answer: prioritize clarity and natural phrasing over perfect writing punctuation.\n"
-        "Now analyse the student's answer and continue the exam."
+    # Static per (language, difficulty): the system message is the cacheable prefix
+    messages = prompt_templates.build_messages(
+        "exam_turn", language, difficulty,
+        prompt_templates.exam_turn_user(topic, last_question, transcript),
     )
 
     try:
         resp = openai_client.chat.completions.create(
             model=MODEL_ID,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
+            messages=messages,
             temperature=0.3,
             max_tokens=400,
             response_format={"type": "json_object"},  # Ask the model for proper JSON
@@ -997,7 +646,7 @@ def exam_turn():
         raw = (resp.choices[0].message.content or "").strip()
 
         try:
-            result = json.loads(raw)
+            result = fast_json.loads(raw)
         except json.JSONDecodeError:
             # Fallback: if the model gives non-JSON, still return something useful.
             result = {
@@ -1130,6 +779,50 @@ def get_feedback(): # Registers a post endpoint at /api/feedback. lays out expec
 
 
 # This code is from ChatGPT
+def _define_term(term: str, system_msg: str, user_msg: str) -> dict:
+    """ One dictionary_ai model call, parsed into the response fields. """
+    resp = openai_client.chat.completions.create(
+        model=model_for("dictionary"),
+        messages=[
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg},
+        ],
+        temperature=0.2,
+        max_tokens=250,
+        response_format={"type": "json_object"},
+    )
+    raw = (resp.choices[0].message.content or "").strip()
+
+    try:
+        result = fast_json.loads(raw)
+    except json.JSONDecodeError:
+        # Fallback: return something useful even if JSON parsing fails
+        result = {
+            "headword": term,
+            "part_of_speech": "",
+            "meaning": raw,
+            "examples": [],
+            "synonyms": []
+        }
+
+    # Small cleanup: make sure examples and synonyms are always lists
+    examples = result.get("examples") or []
+    synonyms = result.get("synonyms") or []
+    if isinstance(examples, str):
+        examples = [examples]
+    if isinstance(synonyms, str):
+        synonyms = [synonyms]
+
+    clean = {
+        "headword": result.get("headword", term),
+        "part_of_speech": result.get("part_of_speech", ""),
+        "meaning": result.get("meaning", ""),
+        "examples": examples,
+        "synonyms": synonyms,
+    }
+    return clean
+
+
 @bp_ai.post("/dictionary_ai")
 def dictionary_ai():
     """
@@ -1197,46 +890,11 @@ def dictionary_ai():
     )
 
     try:
-        resp = openai_client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0.2,
-            max_tokens=250,
-            response_format={"type": "json_object"},
+        # A class looking up the same word at once costs one model call (single_flight.py)
+        key = f"dictionary:{model_for('dictionary')}:{level_desc}:{' '.join(term.lower().split())}"
+        clean = single_flight.do(
+            key, lambda: _define_term(term, system_msg, user_msg), kind="dictionary", share=True,
         )
-        raw = (resp.choices[0].message.content or "").strip()
-
-        try:
-            result = json.loads(raw)
-        except json.JSONDecodeError:
-            # Fallback: return something useful even if JSON parsing fails
-            result = {
-                "headword": term,
-                "part_of_speech": "",
-                "meaning": raw,
-                "examples": [],
-                "synonyms": []
-            }
-
-        # Small cleanup: make sure examples and synonyms are always lists
-        examples = result.get("examples") or []
-        synonyms = result.get("synonyms") or []
-        if isinstance(examples, str):
-            examples = [examples]
-        if isinstance(synonyms, str):
-            synonyms = [synonyms]
-
-        clean = {
-            "headword": result.get("headword", term),
-            "part_of_speech": result.get("part_of_speech", ""),
-            "meaning": result.get("meaning", ""),
-            "examples": examples,
-            "synonyms": synonyms,
-        }
-
         return jsonify(clean), 200
 
     except Exception as e:
@@ -1278,31 +936,32 @@ def exam_skip():
         section = turn.section
         language = session.language
 
-        # Get the question bank for this section/language
-        section_bank = (EXAM_QUESTION_BANK.get(section, {})
-                        .get(language, {})
-                        .get(session.difficulty, []))
+        # Get the question ids for this section/language
+        section_ids = question_bank.question_ids(section, language, session.difficulty)
 
-        if not section_bank:
+        if not section_ids:
             return jsonify({"error": f"no question bank for section={section}, language={language}"}), 400
 
-        # Avoid repeating already-used questions in the section if possible
-        used = set(
-            q[0] for q in db.query(ExamTurn.question_text).filter(
-                ExamTurn.session_id == session.id,
-                ExamTurn.section == section
-            ).all()
-        )
-        candidates = [q for q in section_bank if q not in used]
-        if not candidates:
-            # fallback: allow any other question except the current one
-            candidates = [q for q in section_bank if q != turn.question_text] or section_bank
+        # Avoid repeating already-used questions using the session's bitset (no need to scan the turns)
+        used = question_bank.decode_used(session.used_questions)
+        if turn.question_id is not None:
+            used = question_bank.mark_used(used, turn.question_id)
 
-        new_q = random.choice(candidates)
+        new_id = question_bank.pick_unused(section_ids, used, exclude=turn.question_id)
+        new_q = question_bank.question_text(new_id)
+
+        session.used_questions = question_bank.encode_used(question_bank.mark_used(used, new_id))
+        turn.question_id = new_id
         turn.question_text = new_q
+        db.add(session)
         db.add(turn)
         db.commit()
 
+        exam_events.publish(session.id, "question", {
+            "question_number": turn.question_number, "section": section, "question": new_q,
+        })
+        tts_cache.prerender(new_q, language, session.id, user_id=session.user_id)
+
         return jsonify({
             "session_id": session.id,
             "question_number": turn.question_number,
@@ -1330,8 +989,11 @@ def exam_start():
 
     # For now, always start with introduction section
     section = "introduction"
-    bank = EXAM_QUESTION_BANK[section][language][difficulty]
-    question_text = random.choice(bank)
+    bank_ids = question_bank.question_ids(section, language, difficulty)
+    if not bank_ids:
+        return jsonify({"error": f"no question bank for language={language}, difficulty={difficulty}"}), 400
+    question_id = random.choice(bank_ids)
+    question_text = question_bank.question_text(question_id)
 
     db = db_session()
     try:
@@ -1341,6 +1003,7 @@ def exam_start():
             language=language,
             difficulty=difficulty,
             total_questions=total_questions,
+            used_questions=question_bank.encode_used(question_bank.mark_used(0, question_id)),
         )
         db.add(session)
         db.commit()
@@ -1351,11 +1014,15 @@ def exam_start():
             session_id=session.id,
             question_number=1,
             section=section,
+            question_id=question_id,
             question_text=question_text,
         )
         db.add(turn)
         db.commit()
 
+        exam_events.publish(session.id, "question", {"question_number": 1, "section": section, "question": question_text})
+        tts_cache.prerender(question_text, language, session.id, user_id=session.user_id)
+
         return jsonify({
             "session_id": session.id,
             "question_number": 1,
@@ -1368,127 +1035,15 @@ def exam_start():
 
 
 
-def summarize_sections_with_ai(language: str, difficulty: str, turns):
-    by_section = defaultdict(list)
-    for t in turns:
-        if (t.transcript or "").strip():
-            by_section[t.section].append(t)
-
-    payload = []
-    for section, items in by_section.items():
-        payload.append({
-            "section": section,
-            "answers": [
-                {
-                    "question": it.question_text,
-                    "transcript": it.transcript,
-                    "overall_band": it.overall_band
-                } for it in items
-            ]
-        })
-
-    system_msg = (
-        "You are an oral exam examiner. "
-        "Return JSON with key 'sections'. "
-        "Each section must include: section, summary_en, strengths (list), improvements (list). "
-        "Be specific and professional."
-    )
-
-    payload_json = json.dumps(payload, ensure_ascii=False)
-
-    user_msg = (
-        f"Language: {language}\n"
-        f"Difficulty: {difficulty}\n"
-        "Answers grouped by section (JSON):\n"
-        f"{payload_json}"
-    )
-
-    resp = openai_client.chat.completions.create(
-        model=MODEL_ID,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-        temperature=0.3,
-        max_tokens=500,
-        response_format={"type": "json_object"},
-    )
-
-    raw = (resp.choices[0].message.content or "").strip()
-
-    try:
-        parsed = json.loads(raw)
-    except json.JSONDecodeError:
-        print("SECTION SUMMARY RAW (bad JSON):", raw)
-        return []
-
-    return parsed.get("sections", [])
-
-
-def generate_exam_report(language: str, difficulty: str, turns) -> dict:
-    payload = []
-    for t in turns:
-        tx = (t.transcript or "").strip()
-        if not tx:
-            continue
-        payload.append({
-            "section": t.section,
-            "question": t.question_text,
-            "transcript": tx
-        })
-
-    system_msg = (
-        "You are an oral exam examiner. Return JSON only.\n"
-        "Grade by section and overall.\n"
-        "Be fair: short but correct answers should not be heavily penalized.\n"
-        "Do NOT invent facts.\n"
-        "\n"
-        "Return JSON with keys:\n"
-        "- section_scores: object mapping section -> integer 0..10\n"
-        "- section_feedback: list of objects with keys: section, summary_en, strengths (list), improvements (list)\n"
-        "- overall_strengths: list (max 3)\n"
-        "- overall_weaknesses: list (max 3)\n"
-        "- overall_score: integer 0..10\n"
-    )
-
-    user_msg = (
-        f"Exam language: {language}\n"
-        f"Difficulty: {difficulty}\n"
-        "Student answers as JSON:\n"
-        f"{json.dumps(payload, ensure_ascii=False)}\n"
-    )
-
-    resp = openai_client.chat.completions.create(
-        model=MODEL_ID,
-        messages=[
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": user_msg},
-        ],
-        temperature=0.2,
-        max_tokens=800,
-        response_format={"type": "json_object"},
-        timeout=30,
-    )
-
-    raw = (resp.choices[0].message.content or "").strip()
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        print("EXAM REPORT RAW (bad JSON):", raw)
-        return {
-            "section_scores": {},
-            "section_feedback": [],
-            "overall_strengths": [],
-            "overall_weaknesses": ["Could not generate final report."],
-            "overall_score": 0
-        }
-
-
 @bp_ai.post("/exam/finish")
 @login_required
 def exam_finish():
     """
-    Marks an exam as completed and returns an end-of-exam report (ONE AI call).
+    Marks an exam as completed and returns the end-of-exam report,
+    merged from the section reports computed while the exam was running (exam_reports.py).
+    If some sections still need the model, returns 202 with a job to poll (GET /api/jobs/<id>)
+    and the report_url to fetch once it is done.
+    The report is stored on the session the first time, later calls return the stored copy.
     JSON:
     { "session_id": 123 }
     """
@@ -1507,65 +1062,142 @@ def exam_finish():
         if not session or session.user_id != current_user.id:
             return jsonify({"error": "session not found"}), 404
 
+        if session.report_json:
+            return _report_response(session.report_json)
+
         if session.status != "completed":
             session.status = "completed"
             session.completed_at = datetime.utcnow()
             db.add(session)
             db.commit()
 
-        turns = db.query(ExamTurn).filter(
+        turns = archive.hydrate(db, db.query(ExamTurn).filter(
             ExamTurn.session_id == session.id
-        ).order_by(ExamTurn.question_number.asc()).all()
+        ).order_by(ExamTurn.question_number.asc()).all())
 
         print("FINISH: turns loaded =", len(turns))
 
-        # ✅ ONE-CALL EXAM REPORT
-        report = generate_exam_report(session.language, session.difficulty, turns)
+        # Every section already summarised while the exam ran: merging is one query, answer now
+        if not exam_reports.stale_sections(db, session, turns) and \
+                not jobs.pending_for(db, exam_reports.section_ref(session.id)):
+            try:
+                stored = exam_reports.finalize_report(db, session)
+                print("FINISH: about to return response")
+                # Return only what the student needs (no backend dump)
+                return _report_response(stored)
+            except exam_reports.ReportIncomplete:
+                db.rollback()  # a section report went stale meanwhile: the job below retries it
+
+        # Otherwise the model has to run: do it in a job and let the page poll, so no web worker waits on it
+        job = db.query(Job).filter(
+            Job.ref == exam_reports.report_ref(session.id), Job.status.in_(("queued", "running"))
+        ).first()
+        job_id = job.id if job else jobs.enqueue(
+            "exam_report", {"session_id": session.id, "wait_until": time.time() + exam_reports.FINISH_WAIT_SECONDS},
+            ref=exam_reports.report_ref(session.id), user_id=current_user.id,
+            max_attempts=exam_reports.REPORT_MAX_ATTEMPTS,
+        )
 
-        print("FINISH: about to return response")
+        db.refresh(session)
+        if session.report_json:  # JOB_RUNNER=inline already ran it
+            return _report_response(session.report_json)
 
-        # Return only what the student needs (no backend dump)
         return jsonify({
-            "status": session.status,
-            "language": session.language,
-            "difficulty": session.difficulty,
+            "status": "pending",
+            "session_id": session.id,
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "report_url": f"/api/exam/{session.id}/report",
+        }), 202
+
+    finally:
+        db.close()
 
-            "overall_score": report.get("overall_score"),
-            "overall_strengths": report.get("overall_strengths", []),
-            "overall_weaknesses": report.get("overall_weaknesses", []),
 
-            "section_scores": report.get("section_scores", {}),
-            "section_feedback": report.get("section_feedback", []),
-        }), 200
+# Stored reports never change, so the body's hash is a stable ETag; a refresh gets a 304.
+# Weak, like http_cache.etagged: compression.py serves br/gzip/identity bodies under the same tag
+def _report_response(report_json: str):
+    resp = current_app.response_class(report_json, mimetype="application/json")
+    resp.add_etag(weak=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp.make_conditional(request)
 
+
+@bp_ai.get("/exam/<int:session_id>/report")
+@login_required
+@etagged
+def exam_report(session_id: int):
+    """ The stored report of a finished exam. Never calls the model: 404 until exam/finish has run. """
+    db = db_session()
+    try:
+        session = db.get(ExamSession, session_id)
+        if not session or session.user_id != current_user.id:
+            return jsonify({"error": "session not found"}), 404
+        if not session.report_json:
+            return jsonify({"error": "report not generated yet"}), 404
+        return _report_response(session.report_json)
+    finally:
+        db.close()
+
+
+@bp_ai.get("/exam/<int:session_id>/events")
+@login_required
+def exam_event_stream(session_id: int):
+    """
+    Server-Sent Events for one exam (exam_events.py): question, completed, turn_graded, tts_ready,
+    section_report, report_ready. Reconnects resume after the Last-Event-ID header (or ?last_event_id=).
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+
+    db = db_session()
+    try:
+        session = db.get(ExamSession, session_id)
+        if not session or session.user_id != current_user.id:
+            return jsonify({"error": "session not found"}), 404
+        # Report already delivered and nothing new: 204 tells EventSource to stop reconnecting
+        if session.report_json and not exam_events.events_since(db, session_id, last_id):
+            return "", 204
     finally:
         db.close()
 
+    resp = Response(exam_events.stream(session_id, last_id), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return resp
 
 
-""" This is the prompt for setting up the OpenAI client
-Write Python code that sets up an OpenAI client for a Flask application.
-The application should be able to run in two different environments:
-1. Using **Azure OpenAI**
-2. Using the **standard OpenAI API**
-The configuration values are stored in a `settings` object.
-The settings include:
+@bp_ai.get("/exam/reports")
+@login_required
+@etagged
+def exam_report_history():
+    """
+    The current user's finished exams, newest first, from the stored summary columns.
+    Query params: limit (default 20, max 100), offset
+    """
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    offset = max(request.args.get("offset", 0, type=int), 0)
 
- `AZURE_OPENAI_ENDPOINT`
- `AZURE_OPENAI_API_KEY`
- `AZURE_OPENAI_DEPLOYMENT`
- `OPENAI_API_KEY`
+    db = db_session()
+    try:
+        rows = db.execute(
+            EXAM_REPORT_ROW.select()
+            .where(ExamSession.user_id == current_user.id, ExamSession.report_json.isnot(None))
+            .order_by(ExamSession.completed_at.desc(), ExamSession.id.desc())
+            .limit(limit)
+            .offset(offset)
+        ).all()
+        reports = EXAM_REPORT_ROW.many(rows)
+        for r in reports:
+            r["report_url"] = f"/api/exam/{r['session_id']}/report"
+        return jsonify({"limit": limit, "offset": offset, "reports": reports}), 200
+    finally:
+        db.close()
 
-Logic the code should follow:
- If the Azure endpoint and Azure API key are available, create an **Azure OpenAI client** using `openai.AzureOpenAI`.
-  Use the Azure endpoint and API key, set the API version to `"2024-05-01-preview"`, and set `MODEL_ID` to the Azure deployment name.
 
-If those Azure settings are not available, create a **standard OpenAI client** using `openai.OpenAI` and the regular OpenAI API key.
- In that case set `MODEL_ID` to `"gpt-4o-mini"`.
-The code should end with two variables ready to use later in the program:
- `openai_client`
- `MODEL_ID`
-"""
 
 """ This is the prompt I used for helping with Def evaluate answer with bands
 Generate a Python constant called **BANDS** that defines a scoring rubric for an AI system evaluating spoken answers in a language speaking mock exam application.
@@ -1,15 +1,29 @@
 # routes_auth.py
 # Authentication routes (signup / login / logout) using Flask-Login + SQLAlchemy
+# Password hashes run on the hashing pool (passwords.py) with no database connection held, and
+# attempts are rate limited per client address and per email (rate_limit.py).
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 
+import passwords
+import rate_limit
 from db import SessionLocal
 from models import User
 
 bp_auth = Blueprint("auth", __name__, url_prefix="/auth")
 
 
+def _too_many_attempts(template: str, wait: int):
+    flash(f"Too many attempts. Please try again in {wait} seconds.", "error")
+    return render_template(template), 429, {"Retry-After": str(wait)}
+
+
+def _busy(template: str):
+    flash("The server is busy. Please try again in a moment.", "error")
+    return render_template(template), 503, {"Retry-After": "2"}
+
+
 # LOGIN
 @bp_auth.get("/login")
 def login_get():
@@ -27,7 +41,7 @@ def login_post():
     """
     Process the login form.
     - Looks up user by email
-    - Verifies password hash
+    - Verifies password hash (and upgrades it if PASSWORD_HASH_METHOD changed)
     - Creates a login session cookie
     """
     email = (request.form.get("email") or "").strip().lower()
@@ -37,17 +51,50 @@ def login_post():
         flash("Email and password are required.", "error")
         return redirect(url_for("auth.login_get"))
 
+    ip = request.remote_addr or ""
+    wait = max(rate_limit.LOGIN_BY_IP.retry_after(ip), rate_limit.LOGIN_BY_EMAIL.retry_after(email))
+    if wait:
+        return _too_many_attempts("login.html", wait)
+    rate_limit.LOGIN_BY_IP.hit(ip)
+
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.email == email).first()
+        if user:
+            db.expunge(user)
+    finally:
+        db.close()
 
-        # Security: do not reveal whether email exists; treat as generic failure
-        if not user or not user.check_password(password):
-            flash("Invalid email or password.", "error")
-            return redirect(url_for("auth.login_get"))
+    try:
+        # Unknown emails cost the same hash, so response times don't reveal which accounts exist
+        valid = user.check_password(password) if user else passwords.verify_missing_user(password)
+    except passwords.HashingBusy:
+        return _busy("login.html")
+
+    # Security: do not reveal whether email exists; treat as generic failure
+    if not valid:
+        rate_limit.LOGIN_BY_EMAIL.hit(email)
+        flash("Invalid email or password.", "error")
+        return redirect(url_for("auth.login_get"))
 
-        login_user(user, remember=True)
-        return redirect(url_for("home"))
+    rate_limit.LOGIN_BY_EMAIL.reset(email)
+    if user.password_needs_rehash():
+        _upgrade_hash(user.id, password)
+
+    login_user(user, remember=True)
+    return redirect(url_for("home"))
+
+
+def _upgrade_hash(user_id: int, password: str) -> None:
+    """ Re-hashes with the current PASSWORD_HASH_METHOD; a busy pool just leaves it for the next login. """
+    try:
+        new_hash = passwords.hash_password(password)
+    except passwords.HashingBusy:
+        return
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id).update({User.password_hash: new_hash})
+        db.commit()
     finally:
         db.close()
 
@@ -83,6 +130,18 @@ def signup_post():
         flash("Password must be at least 8 characters.", "error")
         return redirect(url_for("auth.signup_get"))
 
+    ip = request.remote_addr or ""
+    wait = rate_limit.LOGIN_BY_IP.retry_after(ip)
+    if wait:
+        return _too_many_attempts("signup.html", wait)
+    rate_limit.LOGIN_BY_IP.hit(ip)
+
+    # Hash before taking a database connection
+    try:
+        password_hash = passwords.hash_password(password)
+    except passwords.HashingBusy:
+        return _busy("signup.html")
+
     db = SessionLocal()
     try:
         existing = db.query(User).filter(User.email == email).first()
@@ -92,8 +151,7 @@ def signup_post():
 
         is_admin = request.form.get("is_admin") == "on"
 
-        user = User(email=email, is_admin=is_admin)
-        user.set_password(password)
+        user = User(email=email, is_admin=is_admin, password_hash=password_hash)
 
         db.add(user)
         db.commit()
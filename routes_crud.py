@@ -8,6 +8,9 @@ from sqlalchemy.orm import Session # These are from this project, they set up th
 from db import get_db
 from models import AnalysisLog
 from audit import write_event
+from serializers import ANALYSIS_LOG
+from http_cache import etagged
+import archive
 from flask_login import login_required, current_user
 
 
@@ -21,22 +24,16 @@ def db_session():
 
 
 
-# Turn a DB row into a plain dict that jsonify() can handle.
+# Turn a DB row into a plain dict that jsonify() can handle (fields: serializers.ANALYSIS_LOG;
+# created_at is written as an ISO string by fast_json).
 def to_dict(row: AnalysisLog):
-    return {
-        "id": row.id,
-        "user_id": row.user_id,
-        "input_text": row.input_text,
-        "feedback_text": row.feedback_text,
-        "model_name": row.model_name,
-        #  convert it to a readable string
-        "created_at": row.created_at.isoformat() if row.created_at else None,
-    }
+    return ANALYSIS_LOG.one(row)
 
 
 #  READ LIST
 @bp_crud.get("/logs")
 @login_required
+@etagged
 def list_logs():
     """
     GET /api/logs
@@ -50,8 +47,8 @@ def list_logs():
     # Open a database session using a context manager
     with db_session() as db:  # type: Session
 
-        # Build a base SELECT query
-        stmt = select(AnalysisLog)
+        # Build a base SELECT query (only the columns the response needs, no ORM objects)
+        stmt = ANALYSIS_LOG.select()
 
         if not current_user.is_admin:
             stmt = stmt.where(AnalysisLog.user_id == current_user.id)
@@ -64,20 +61,21 @@ def list_logs():
         # Order newest first
         rows = db.execute(
             stmt.order_by(AnalysisLog.id.desc()).limit(per_page).offset((page - 1) * per_page)
-        ).scalars().all()
+        ).all()
 
         # Turn the rows into dicts and return them as JSON
         return jsonify({
             "page": page,
             "per_page": per_page,
             "total": total,
-            "items": [to_dict(r) for r in rows]
+            "items": ANALYSIS_LOG.many(rows)
         }), 200
 
 
 #  READ ONE
 @bp_crud.get("/logs/<int:log_id>")
 @login_required
+@etagged
 def get_log(log_id: int):
     # Fetch one log by ID,
     with db_session() as db:  # type: Session
@@ -88,6 +86,9 @@ def get_log(log_id: int):
         if row.user_id != current_user.id: #blocks access to other users, use not found to avoid leaking that the ID exists.
             return jsonify({"error": "not found"}), 404
 
+        # Old logs keep only a preview in the table; the full text comes from archive_blobs
+        archive.hydrate(db, [row])
+
         # Otherwise return it as JSON
         return jsonify(to_dict(row)), 200
 
@@ -182,6 +183,9 @@ def update_log(log_id: int):
         if row.user_id != current_user.id:
             return jsonify({"error": "not found"}), 404
 
+        # An archived log is moved back into the table before it's edited
+        archive.restore(db, row)
+
         # Update text fields if provided
         if "input_text" in data and data["input_text"] is not None:
             row.input_text = data["input_text"].strip()
@@ -229,6 +233,8 @@ def delete_log(log_id: int):
         if not current_user.is_admin and row.user_id != current_user.id:
             return jsonify({"error": "not found"}), 404
 
+        # Its archived text goes too
+        archive.discard(db, row)
         db.delete(row)
         db.commit()
 
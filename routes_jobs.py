@@ -0,0 +1,32 @@
+# routes_jobs.py
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+import jobs
+from db import SessionLocal
+from models import Job
+from http_cache import etagged
+
+bp_jobs = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+
+
+# Status of a background job (jobs.py), e.g. the exam_report job returned by /api/exam/finish
+@bp_jobs.get("/<int:job_id>")
+@login_required
+@etagged
+def job_status(job_id: int):
+    """
+    Returns { id, kind, status (queued/running/done/failed), attempts, result, error, ... }.
+    Users see their own jobs; admins see every job.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if not job or (job.user_id != current_user.id and not current_user.is_admin):
+            return jsonify({"error": "job not found"}), 404
+        resp = jsonify(jobs.job_status(job))
+        if job.status in ("queued", "running"):
+            resp.headers["Retry-After"] = "1"
+        return resp, 200
+    finally:
+        db.close()
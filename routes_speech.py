@@ -1,12 +1,59 @@
 # routes_speech.py
 from flask import Blueprint, request, jsonify, Response, send_file
-from config import settings
-from openai import OpenAI
-import io, tempfile, os
-
-# Calling API_key from .env file
+from flask_login import login_required
+from ai_client import speech_client
+import io
+import os
+import re
+import audio_processing
+import stt_cache
+import tts_cache
+
+# The client is built in ai_client.py (OpenAI, or the local backend when MODEL_BACKEND=local)
 bp_speech = Blueprint("speech_bp", __name__, url_prefix="/api")
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+client = speech_client
+
+
+# Sends recorded audio to Whisper and returns (transcript, language used, samples).
+# samples are the decoded 16 kHz mono samples (for audio_metrics.py), or None if the upload couldn't be decoded
+# or the transcript came from the cache (stt_cache.py: a re-sent recording isn't transcribed again).
+# Shared by /api/stt and /api/exam/submit. Raises ValueError for an empty or too-small upload.
+def transcribe_audio(data: bytes, filename: str, lang_in: str = "en-GB"):
+    lang = ((lang_in or "").split('-')[0] or "en").lower()  # 'en-GB' -> 'en'
+    print("[STT] received bytes:", 0 if data is None else len(data))  # tiny debug log
+
+    if not data or len(data) < 2000: # rejects empty audio files ( less than 2 kb)
+        raise ValueError("empty or too-small audio upload")
+
+    decoded = {}
+
+    def whisper():
+        # Mono 16 kHz, silence trimmed, re-encoded (audio_processing.py); the original if that isn't possible
+        payload, name, decoded["samples"] = audio_processing.prepare_for_stt(data, filename or "audio.webm")
+
+        buf = io.BytesIO(payload) # Wraps the raw bytes in a bytesio object
+        buf.name = name  # Gives it a name so that the API knows what it is.
+        buf.seek(0) # resets the read pointer to the start.
+
+        tr = client.audio.transcriptions.create( # Client is OpenAI SDK client.
+            model="whisper-1", # File is sent to Whisper1 model for transcription
+            file=buf,
+            response_format="text", # Whisper should return a plain text.
+            language=lang,
+            temperature=0, # Is meant to keep output deterministic (not random)
+        )
+        text = tr if isinstance(tr, str) else getattr(tr, "text", "") # Handels both possible return types (string, object)
+        return (text or "").strip()
+
+    text = stt_cache.get_or_transcribe(data, lang, whisper)
+    return text, lang, decoded.get("samples")
+
+
+# Whisper failed (network, provider outage): 503 with Retry-After, the client sends the recording again
+def stt_unavailable(e: Exception):
+    resp = jsonify({"error": "STT failed", "details": str(e), "retryable": True})
+    resp.headers["Retry-After"] = "5"
+    return resp, 503
 
 
 # This code is from ChatGPT this file deals with how the programme will deal with users speech.
@@ -22,29 +69,14 @@ def stt(): # This function explains the expected datafile and the language.
     if not f:
         return jsonify({"error": "audio file is required (form field 'file')"}), 400 # If there is no file return 400
 
-    lang = (lang_in.split('-')[0] or "en").lower()  # 'en-GB' -> 'en'
-    data = f.read() # Reads the file into memory as bytes and logs how many bites were recieved.
-    print("[STT] received bytes:", 0 if data is None else len(data))  # tiny debug log
-
-    if not data or len(data) < 2000: # rejects empty audio files ( less than 2 kb)
-        return jsonify({"error": "empty or too-small audio upload", "bytes": len(data or b'')}), 400
-
-    buf = io.BytesIO(data) # Wraps the raw bytes in a bytesio object
-    buf.name = f.filename or "audio.webm"  # Gives it a name so that the API knows what it is.
-    buf.seek(0) # resets the read pointer to the start.
-
+    data = f.read() # Reads the file into memory as bytes
     try:
-        tr = client.audio.transcriptions.create( # Client is OpenAI SDK client.
-            model="whisper-1", # File is sent to Whisper1 model for transcription
-            file=buf,
-            response_format="text", # Whisper should return a plain text.
-            language=lang,
-            temperature=0, # Is meant to keep output deterministic (not random)
-        )
-        text = tr if isinstance(tr, str) else getattr(tr, "text", "") # Handels both possible return types (string, object)
-        return jsonify({"transcript": (text or "").strip(), "lang_used": lang}), 200 # Returns a JSON response.
+        text, lang, _samples = transcribe_audio(data, f.filename, lang_in)
+        return jsonify({"transcript": text, "lang_used": lang}), 200 # Returns a JSON response.
+    except ValueError as e: # rejects empty audio files ( less than 2 kb)
+        return jsonify({"error": str(e), "bytes": len(data or b'')}), 400
     except Exception as e:
-        return jsonify({"error": "STT failed", "details": str(e)}), 500
+        return stt_unavailable(e)
 
 
 # This code is from ChatGPT
@@ -92,8 +124,8 @@ def answer_stream(): # Reads q and optional system from query params
                 temperature=0.4,
             ) as stream:
                 for event in stream:
-                    if event.type == "token":
-                        yield f"data: {event.token}\n\n" #For each token, yields an SSE line
+                    if event.type == "content.delta":
+                        yield f"data: {event.delta}\n\n" #For each token, yields an SSE line
                 yield "event: done\ndata: [DONE]\n\n" # Finishes with a done event and done payload
         except Exception as e:
             yield f"event: error\ndata: {type(e).__name__}: {e}\n\n"
@@ -104,44 +136,23 @@ def answer_stream(): # Reads q and optional system from query params
 
 #  TTS (Text to Speech) This code is from ChatGPT
 @bp_speech.post("/tts", endpoint="tts_v1")
+@login_required
 def tts(): # Registers a post endpoint /tts inside the bp_speech blueprint, This will be called whenever a client sends text to convert into speech
     data = request.get_json(force=True) or {} # Parses the incoming JSON body.
     text = (data.get("text") or "").strip() #Extracts text: the text to speak
     language = (data.get("language") or "").strip().lower()
 
-    # Default voices per language
-    voice_by_language = {
-        "english": "alloy",
-        "french": "nova",
-        "german": "alloy",
-    }
-
     # If frontend passes voice explicitly, respect it.
-    # Otherwise pick by language, fallback to alloy.
-    voice = (data.get("voice") or voice_by_language.get(language) or "alloy").strip()
+    # Otherwise pick by language (tts_cache.VOICE_BY_LANGUAGE), fallback to alloy.
+    voice = tts_cache.voice_for(language, data.get("voice"))
 
     if not text:
         return jsonify({"error": "text is required"}), 400 # Validation the text field must be provided
 
     try:
-        # NOTE: no "format=" here; the SDK streams audio (defaults to mp3)
-        with client.audio.speech.with_streaming_response.create( #Calls OpenAI's tts API using the gpt-40-tts model
-            model="gpt-4o-mini-tts",
-            voice=voice,
-            input=text,
-        ) as resp: # the .with_streaming_response.create streams the generated audio back incrementally,
-            # save as MP3
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp: # creats a temporary MP3 file on disk
-                tmp_path = tmp.name
-                resp.stream_to_file(tmp_path) # Streams the audio data into that file as it arrives from the model
-
-        # send back as audio/mpeg
-        with open(tmp_path, "rb") as f: #Reads the MP3 into memory.l
-            audio_bytes = f.read()
-        try:
-            os.remove(tmp_path) # Deletes the temporary file afterward (cleanup)
-        except Exception:
-            pass
+        # Exam questions are usually prerendered by a background job (tts_cache.py); otherwise render now,
+        # and keep it only if it's a bank question (any other text would fill the disk)
+        audio_bytes = tts_cache.render_speech(text, voice, store=tts_cache.cacheable(text))
 
         return send_file( # Wraps the audio bytes in an in-memory stream and sends them back to the client.
             io.BytesIO(audio_bytes),
@@ -153,6 +164,19 @@ def tts(): # Registers a post endpoint /tts inside the bp_speech blueprint, This
         return jsonify({"error": "TTS failed", "details": str(e)}), 500 # Any error returns HTTP 500
 
 
+# Prerendered question audio (tts_cache.py). The key is a hash of model|voice|text, so a file never changes.
+@bp_speech.get("/tts/cache/<key>.mp3", endpoint="tts_cached_v1")
+def tts_cached(key: str):
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return jsonify({"error": "not found"}), 404
+    path = tts_cache.path_for_key(key)
+    if not os.path.exists(path):
+        return jsonify({"error": "not found"}), 404
+    resp = send_file(os.path.abspath(path), mimetype="audio/mpeg", max_age=86400)
+    resp.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    return resp
+
+
 
 
 
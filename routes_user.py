@@ -3,7 +3,9 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 
 from db import SessionLocal
-from models import User
+from models import User, UserProgress
+from progress import progress_summary
+from http_cache import etagged
 
 bp_user = Blueprint("user", __name__, url_prefix="/api/user")
 
@@ -13,6 +15,7 @@ ALLOWED_DIFFICULTIES = {"beginner", "moderate", "expert"}
 # Returns the preferences that the user has.
 @bp_user.get("/preferences")
 @login_required
+@etagged
 def get_preferences():
     """
     Returns the logged-in user's saved preferences.
@@ -68,3 +71,19 @@ def update_preferences():
         }), 200
     finally:
         db.close()
+
+
+# Returns the user's progress across all their exams (one row read, see progress.py)
+@bp_user.get("/progress")
+@login_required
+@etagged
+def get_progress():
+    """
+    Returns exams completed, streaks, per-section averages, per-skill band trends and weak areas.
+    """
+    db = SessionLocal()
+    try:
+        row = db.get(UserProgress, int(current_user.id))
+        return jsonify(progress_summary(row)), 200
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+# serializers.py
+# Column schemas for the JSON listings (admin pages, /api/logs, /api/exam/reports, exports).
+# A listing selects exactly the schema's columns (no ORM objects are built) and zips each row tuple
+# with the key names; datetimes stay datetime objects and fast_json writes them as ISO 8601 in C,
+# so there is no hand-written dict literal or isoformat() call per row.
+#   rows = db.execute(ANALYSIS_LOG.select().order_by(...)).all()
+#   return jsonify(ANALYSIS_LOG.many(rows))
+from sqlalchemy import select
+
+from models import AnalysisLog, ExamSession, ExamTurn, User
+
+
+class Schema:
+    def __init__(self, model, *fields, rename: dict = None):
+        rename = rename or {}
+        self.model = model
+        self.fields = fields
+        self.keys = tuple(rename.get(f, f) for f in fields)
+        self.columns = tuple(getattr(model, f) for f in fields)
+
+    def select(self):
+        """ SELECT of just this schema's columns, in order. """
+        return select(*self.columns)
+
+    def many(self, rows) -> list:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+    def one(self, obj) -> dict:
+        """ From a loaded ORM instance (or a row tuple from select()). """
+        if isinstance(obj, self.model):
+            return {k: getattr(obj, f) for k, f in zip(self.keys, self.fields)}
+        return dict(zip(self.keys, obj))
+
+
+ANALYSIS_LOG = Schema(AnalysisLog, "id", "user_id", "input_text", "feedback_text", "model_name", "created_at")
+
+USER = Schema(User, "id", "email", "is_admin", "created_at")
+
+# One row of GET /api/exam/reports
+EXAM_REPORT_ROW = Schema(
+    ExamSession, "id", "language", "difficulty", "total_questions", "completed_at", "overall_score", "overall_band",
+    rename={"id": "session_id"},
+)
+
+EXAM_SESSION = Schema(
+    ExamSession, "id", "user_id", "language", "difficulty", "status", "started_at", "completed_at",
+    "total_questions", "overall_band", "overall_score", "summary_feedback_en", "major_mistakes_en",
+)
+
+EXAM_TURN = Schema(
+    ExamTurn, "id", "session_id", "question_number", "section", "question_id", "question_text", "transcript",
+    "feedback_en", "corrected_answer_target", "tips_en", "fluency_band", "grammar_band", "vocabulary_band",
+    "pronunciation_band", "overall_band", "audio_metrics",
+)
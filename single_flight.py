@@ -0,0 +1,212 @@
+# single_flight.py
+# Coalesces identical concurrent upstream calls: when a class starts, thirty students ask for the same
+# question audio or look up the same word at once, and that should cost one model call, not thirty.
+# - In a process: the first caller for a key is the leader and runs fn(); threads (or greenlets)
+#   arriving while it runs wait for its result, or its exception
+# - Across workers (gunicorn processes, worker.py): the leader also holds an exclusive lock file
+#   SINGLE_FLIGHT_DIR/<sha256 of key>.lock. The leader in another process waits for that lock, then runs
+#   fn() itself, so fn should look in its own cache first (TTS disk cache, transcript_cache). Results
+#   without a cache of their own use share=True: the result is kept as JSON next to the lock for
+#   SINGLE_FLIGHT_SHARE_SECONDS and a waiting process reads it instead of calling.
+# - The lock is polled (non-blocking flock), so a waiting gevent worker keeps serving other requests.
+#   Without fcntl (Windows) or with SINGLE_FLIGHT_DIR empty, only in-process coalescing applies.
+# - Each key leaves files behind, so a leader sweeps the directory at most every PRUNE_INTERVAL_SECONDS:
+#   shared results past SINGLE_FLIGHT_SHARE_SECONDS, and lock files nobody has taken for longer than any
+#   follower waits (the leader touches its lock file), go. A lock is only valid while its file is still the
+#   one at the path: _prune deletes a lock file only while holding it, and _file_lock checks after taking
+#   the lock that the file wasn't deleted under it (otherwise two processes could both lead)
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from config import settings
+from metrics import COALESCED_CALLS
+
+# Followers give up waiting for the leader after this long and call fn() themselves
+WAIT_SECONDS = 60
+LOCK_POLL_SECONDS = 0.05
+PRUNE_INTERVAL_SECONDS = 300
+
+_MISS = object()
+
+_inflight = {}  # key -> _Call
+_inflight_lock = threading.Lock()
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _path(key: str, ext: str) -> str:
+    return os.path.join(settings.SINGLE_FLIGHT_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ext)
+
+
+def _is_current(f, path: str) -> bool:
+    """ Whether the open file f is still the file at path (not deleted or replaced since it was opened). """
+    try:
+        return os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+@contextmanager
+def _file_lock(key: str, timeout: float):
+    """ Holds the key's lock file; yields False when it couldn't be taken within timeout. """
+    if fcntl is None or not settings.SINGLE_FLIGHT_DIR:
+        yield True
+        return
+    path = _path(key, ".lock")
+    try:
+        os.makedirs(settings.SINGLE_FLIGHT_DIR, exist_ok=True)
+        f = open(path, "a+b")
+    except OSError as e:
+        print("[SINGLE FLIGHT] lock file unavailable:", e)
+        yield True
+        return
+
+    acquired = False
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(LOCK_POLL_SECONDS)
+                continue
+            if _is_current(f, path):
+                acquired = True
+                os.utime(f.fileno())  # last use, for _prune
+                break
+            # _prune deleted the file between our open() and flock(): take the lock on the file there now
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+            f = open(path, "a+b")
+        yield acquired
+    finally:
+        if acquired:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        f.close()
+
+
+def _read_shared(key: str):
+    path = _path(key, ".json")
+    try:
+        if time.time() - os.path.getmtime(path) > settings.SINGLE_FLIGHT_SHARE_SECONDS:
+            return _MISS
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _MISS
+
+
+def _write_shared(key: str, value) -> None:
+    path = _path(key, ".json")
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(partial, path)
+    except (OSError, TypeError, ValueError) as e:
+        print("[SINGLE FLIGHT] result not shared:", type(e).__name__, e)
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+
+
+def _prune() -> None:
+    """ Deletes expired results, and lock files unused for long enough that no follower can still be waiting. """
+    global _last_prune
+    if time.monotonic() - _last_prune < PRUNE_INTERVAL_SECONDS or not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = time.monotonic()
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(settings.SINGLE_FLIGHT_DIR):
+            try:
+                age = now - entry.stat().st_mtime
+                if entry.name.endswith(".json"):
+                    if age > settings.SINGLE_FLIGHT_SHARE_SECONDS:
+                        os.remove(entry.path)
+                        removed += 1
+                elif entry.name.endswith(".part"):
+                    if age > WAIT_SECONDS:  # left by a process that died mid-write
+                        os.remove(entry.path)
+                        removed += 1
+                elif entry.name.endswith(".lock") and age > 2 * WAIT_SECONDS:
+                    with open(entry.path, "a+b") as f:
+                        try:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            continue  # a leader has it right now
+                        if not _is_current(f, entry.path):
+                            continue  # already deleted (and maybe recreated) by another process
+                        os.remove(entry.path)
+                        removed += 1
+            except OSError:
+                continue
+        if removed:
+            print(f"[SINGLE FLIGHT] pruned {removed} files")
+    except OSError as e:
+        print("[SINGLE FLIGHT] prune failed:", e)
+    finally:
+        _prune_lock.release()
+
+
+def do(key: str, fn, kind: str = "other", share: bool = False, timeout: float = WAIT_SECONDS):
+    """
+    Runs fn() once for all concurrent callers with the same key and returns its result to each of them.
+    kind labels the coalesced_calls_total metric; share=True passes the (JSON) result to other processes.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+
+    if not leader:
+        if call.done.wait(timeout):
+            if call.error is not None:
+                raise call.error
+            COALESCED_CALLS.inc(kind, "follower")
+            return call.result
+        return fn()
+
+    share = share and fcntl is not None and bool(settings.SINGLE_FLIGHT_DIR)
+    try:
+        with _file_lock(key, timeout):
+            result = _read_shared(key) if share else _MISS
+            if result is _MISS:
+                COALESCED_CALLS.inc(kind, "leader")
+                result = fn()
+                if share:
+                    _write_shared(key, result)
+            else:
+                COALESCED_CALLS.inc(kind, "shared")
+        call.result = result
+        return result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        call.done.set()
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        if fcntl is not None and settings.SINGLE_FLIGHT_DIR:
+            _prune()
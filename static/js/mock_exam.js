@@ -24,6 +24,43 @@ document.addEventListener("DOMContentLoaded", function () {
   let questionNumber = null;
   let examStartTime = null;
 
+// Server-Sent Events for the current exam (GET /api/exam/<id>/events): the server pushes
+// question audio, per-answer bands, finished sections and the finished report as they happen
+  let examEvents = null;
+  const questionAudio = {};   // question text -> prerendered audio URL
+  const turnBands = {};       // question number -> bands of the graded answer
+  let reportReadyUrl = null;
+  let waitingForReport = false;
+
+  function openExamEvents(id) {
+    closeExamEvents();
+    reportReadyUrl = null;
+    if (!window.EventSource) return;  // older browsers: finish falls back to polling
+    // EventSource reconnects by itself and sends Last-Event-ID, so nothing is missed
+    examEvents = new EventSource(`/api/exam/${id}/events`);
+    examEvents.addEventListener('tts_ready', e => {
+      const d = JSON.parse(e.data);
+      questionAudio[d.text] = d.url;
+    });
+    examEvents.addEventListener('turn_graded', e => {
+      const d = JSON.parse(e.data);
+      turnBands[d.question_number] = d.bands;
+    });
+    examEvents.addEventListener('section_report', e => {
+      const d = JSON.parse(e.data);
+      if (waitingForReport) setStatus(`Generating final feedback… (${d.section} ready)`);
+    });
+    examEvents.addEventListener('report_ready', e => {
+      reportReadyUrl = JSON.parse(e.data).report_url;
+      closeExamEvents();
+    });
+  }
+
+  function closeExamEvents() {
+    if (examEvents) examEvents.close();
+    examEvents = null;
+  }
+
 // This gets from the backend meaning, part of speech, examples and synonyms
 async function lookupDictionary() {
   const term = (dictInput.value || '').trim();
@@ -87,19 +124,17 @@ dictInput.addEventListener('keydown', (e) => {
   function setStatus(msg) {
     statusEl.textContent = msg;
   }
-  // when the user clicks get the transcript, validate it's not empty and send answer to backend
+  // when the user clicks submit, send the recorded answer to the backend
 submitBtn.addEventListener('click', async () => {
-  const transcript = (transcriptEl.textContent || '').trim();
-
-  if (!transcript) {
-    setStatus('No transcript to submit.');
+  if (!recordedBlob) {
+    setStatus('No recording to submit.');
     return;
   }
 
   submitBtn.disabled = true;
   retryBtn.disabled = true;
 
-  await submitAnswerAndAdvance(transcript);
+  await submitAnswerAndAdvance(recordedBlob);
 });
 
 
@@ -135,6 +170,7 @@ submitBtn.addEventListener('click', async () => {
       sessionId = data.session_id;
       questionNumber = data.question_number;
       questionEl.textContent = (data.question || '').trim() || '(no question returned)';
+      openExamEvents(sessionId);
       const setupCard = document.getElementById('setupCard');
 if (setupCard) {
   setupCard.style.display = 'none';
@@ -158,6 +194,7 @@ if (setupCard) {
 
   let mediaStream = null;
   let recorder = null;
+  let recordedBlob = null;  // last recording, sent by Submit
   let chunks = [];
 
   function pickMime() {
@@ -219,15 +256,8 @@ if (setupCard) {
     });
   }
 
-// Sends the audio to stt
-  async function transcribeBlob(blob) {
-    if (!blob || blob.size < 2000) {
-      transcriptEl.textContent = '(no usable audio)';
-      setStatus('No usable audio captured.');
-          return '';
-
-    }
-
+// Builds the multipart form for exam/submit: the recording plus the Whisper language code
+  function answerForm(blob) {
     const filename = (blob.type || '').includes('mp4') ? 'speech.m4a' : 'speech.webm';
     const form = new FormData();
     form.append('file', blob, filename);
@@ -236,24 +266,9 @@ if (setupCard) {
       examLangSel.value === 'french' ? 'fr' :
       examLangSel.value === 'german' ? 'de' : 'en';
     form.append('lang', sttLang);
-
-    setStatus('Transcribing…');
-
-    try {
-      const sttResp = await fetch('/api/stt', { method: 'POST', body: form });
-      const data = await sttResp.json();
-      if (!sttResp.ok) throw new Error(data.error || data.details || 'STT failed');
-
-         const transcript = (data.transcript || '').trim();
-    transcriptEl.textContent = transcript || '(empty transcript)';
-    setStatus('Transcription complete.');
-    return transcript;
-
-      } catch (e) {
-    setStatus('Transcription failed: ' + e.message);
-    return '';
-  }
-
+    form.append('session_id', sessionId);
+    form.append('question_number', questionNumber);
+    return form;
   }
 
 
@@ -325,10 +340,19 @@ skipBtn.addEventListener('click', async () => {
 
 
     startRecBtn.disabled = false;
-    const transcript = await transcribeBlob(blob);
+    if (!blob || blob.size < 2000) {
+      recordedBlob = null;
+      transcriptEl.textContent = '(no usable audio)';
+      setStatus('No usable audio captured.');
+      stopRecBtn.disabled = false;
+      return;
+    }
 
-// Just show transcript.
-setStatus('Review your transcript. Click Submit when ready.');
+// Keep the recording; the student can play it back before submitting.
+recordedBlob = blob;
+player.src = URL.createObjectURL(blob);
+transcriptEl.textContent = '(recorded — transcribed when you submit)';
+setStatus('Listen back if you like. Click Submit when ready, or Retry.');
 submitBtn.disabled = false;
 retryBtn.disabled = false;
 
@@ -337,35 +361,31 @@ retryBtn.disabled = false;
     stopRecBtn.disabled = false;
   });
 
-// Sends the students answer to exam/answer where in the backend stores the transcript, checks if exam is finished sends next question
-    async function submitAnswerAndAdvance(transcript) {
+// Sends the recorded answer to exam/submit: the backend transcribes it, stores the transcript,
+// checks if the exam is finished and sends the next question (one request instead of stt + answer + tts)
+    async function submitAnswerAndAdvance(blob) {
   if (!sessionId || !questionNumber) {
     setStatus('No active mock session. Click Start Mock Exam first.');
     timerEl.textContent = '00:00';
     return;
   }
-  if (!transcript) {
-    setStatus('Empty transcript — not saved.');
-    return;
-  }
 
-  setStatus(`Saving answer for session ${sessionId}, Q${questionNumber}…`);
+  setStatus(`Transcribing and saving answer for session ${sessionId}, Q${questionNumber}…`);
 
 
   try {
-    const resp = await fetch('/api/exam/answer', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        session_id: sessionId,
-        question_number: Number(questionNumber),
-        transcript
-    })
-
-    });
+    const resp = await fetch('/api/exam/submit', { method: 'POST', body: answerForm(blob) });
 
     const data = await resp.json();
-    if (!resp.ok) throw new Error(data.error || data.details || 'exam/answer failed');
+    if (!resp.ok) {
+      // Nothing was saved: let the student record again
+      retryBtn.disabled = false;
+      submitBtn.disabled = false;
+      throw new Error(data.error || data.details || 'exam/submit failed');
+    }
+    recordedBlob = null;
+    transcriptEl.textContent = data.transcript || '';
+    if (data.audio_url) questionAudio[data.question] = data.audio_url;
 
     if (data.done) {
   setStatus('Mock exam complete. Click Finish to see feedback.');
@@ -382,7 +402,6 @@ retryBtn.disabled = false;
     questionNumber = data.question_number;
     questionEl.textContent = (data.question || '').trim() || '(no question returned)';
     setStatus(`Answer saved. Now on Q${questionNumber}.`);
-    transcriptEl.textContent = '';
 submitBtn.disabled = true;
 retryBtn.disabled = true;
     progressText.textContent = `Question ${questionNumber} of ${totalQuestions}`;
@@ -404,7 +423,10 @@ speakQBtn.addEventListener('click', async () => {
   setStatus('Generating question audio…');
 
   try {
-    const resp = await fetch('/api/tts', {
+    // Audio the server already rendered (tts_ready event) is fetched directly, often from the browser cache
+    const resp = questionAudio[text]
+      ? await fetch(questionAudio[text])
+      : await fetch('/api/tts', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({
@@ -427,11 +449,53 @@ speakQBtn.addEventListener('click', async () => {
 
 retryBtn.addEventListener('click', () => {
   transcriptEl.textContent = '';
+  recordedBlob = null;
   submitBtn.disabled = true;
   setStatus('Retry recording when ready.');
 });
 
 
+// Waits for a background report job, then loads the stored report.
+// With the event stream open the report_ready event ends the wait; the job status is only
+// checked every 10 s (every 1 s without EventSource) to notice a failed job.
+async function waitForReport(pending) {
+  waitingForReport = true;
+  try {
+    return await waitForReportJob(pending);
+  } finally {
+    waitingForReport = false;
+  }
+}
+
+async function waitForReportJob(pending) {
+  const deadline = Date.now() + 120000;
+  while (Date.now() < deadline) {
+    if (!reportReadyUrl) {
+      await new Promise(resolve => {
+        const timer = setTimeout(resolve, examEvents ? 10000 : 1000);
+        if (examEvents) examEvents.addEventListener('report_ready', () => { clearTimeout(timer); resolve(); }, { once: true });
+      });
+    }
+    let done = Boolean(reportReadyUrl);
+    if (!done) {
+      const jobResp = await fetch(pending.status_url);
+      const job = await jobResp.json();
+      if (!jobResp.ok) throw new Error(job.error || 'job status failed');
+      if (job.status === 'failed') throw new Error(job.error || 'report generation failed');
+      done = job.status === 'done';
+    }
+    if (done) {
+      closeExamEvents();
+      const reportResp = await fetch(pending.report_url);
+      const report = await reportResp.json();
+      if (!reportResp.ok) throw new Error(report.error || 'report not available');
+      return report;
+    }
+  }
+  throw new Error('report is taking too long, try again shortly');
+}
+
+
 // When the exam ends calculates total time call the backend so generates section feedback, scores, strengths, and weaknesses
     finishBtn.addEventListener('click', async () => {
   if (!sessionId) {
@@ -474,9 +538,14 @@ const totalTimeFormatted =
       body: JSON.stringify({ session_id: sessionId })
     });
 
-    const data = await resp.json();
+    let data = await resp.json();
     if (!resp.ok) throw new Error(data.error || data.details || 'exam/finish failed');
 
+    // 202: the report is being generated by a background job; poll it, then fetch the stored report
+    if (resp.status === 202) {
+      data = await waitForReport(data);
+    }
+
 //  Render only section summaries (hide backend JSON)
 const sections = Array.isArray(data.section_feedback)
   ? data.section_feedback
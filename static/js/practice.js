@@ -33,6 +33,8 @@ document.addEventListener("DOMContentLoaded", function () {
 // This allows the system to progress through practice questions
   let currentQuestion = "";
   let pendingNextQuestion = "";
+// Questions already shown in this run, sent to the backend so it avoids near-duplicates
+  let askedQuestions = [];
   let lastCorrectedAnswerTarget = "";
 
 // THis is from Chatgpt
@@ -178,13 +180,15 @@ document.addEventListener("DOMContentLoaded", function () {
   topic,
   difficulty,
   language,
-  last_question: currentQuestion
+  last_question: currentQuestion,
+  asked_questions: askedQuestions.slice(-20)
 })
       });
       const data = await resp.json();
       if (!resp.ok) throw new Error(data.error || data.details || 'start_exam failed');
 
       currentQuestion = (data.question || '').trim();
+      if (currentQuestion) askedQuestions.push(currentQuestion);
       questionEl.textContent = currentQuestion || '(no question returned)';
       if (skipBtn) {
   skipBtn.disabled = false;
@@ -409,6 +413,7 @@ if (nextQuestionBtn) {
     if (!pendingNextQuestion) return;
 
     currentQuestion = pendingNextQuestion;
+    askedQuestions.push(currentQuestion);
     pendingNextQuestion = '';
 
     lastCorrectedAnswerTarget = '';
@@ -446,13 +451,20 @@ if (skipBtn) {
       const resp = await fetch('/api/start_exam', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ topic, difficulty, language })
+        body: JSON.stringify({
+          topic,
+          difficulty,
+          language,
+          last_question: currentQuestion,
+          asked_questions: askedQuestions.slice(-20)
+        })
       });
 
       const data = await resp.json();
       if (!resp.ok) throw new Error(data.error || data.details || 'start_exam failed');
 
       currentQuestion = (data.question || '').trim();
+      if (currentQuestion) askedQuestions.push(currentQuestion);
       questionEl.textContent = currentQuestion || '(no question returned)';
 
       retryBtn.disabled = true;
@@ -0,0 +1,79 @@
+// Progress card on the practice page: reads /api/user/progress (one stored summary row)
+// and draws the exam score trend and the average band per skill with Chart.js
+document.addEventListener("DOMContentLoaded", () => {
+  loadProgress();
+});
+
+const SECTION_NAMES = {
+  introduction: "Introduction",
+  school: "School",
+  hobbies: "Hobbies",
+  family_friends: "Family & friends",
+  future_plans: "Future plans"
+};
+
+const BAND_LABELS = ["", "Needs Work", "OK", "Good", "Excellent"];
+
+async function loadProgress() {
+  const summaryEl = document.getElementById("progressSummary");
+  if (!summaryEl) return;
+
+  let data;
+  try {
+    const resp = await fetch("/api/user/progress");
+    if (!resp.ok) throw new Error("HTTP " + resp.status);
+    data = await resp.json();
+  } catch (err) {
+    summaryEl.textContent = "Progress is not available right now.";
+    return;
+  }
+
+  if (!data.exams_completed && !Object.keys(data.sections).length) {
+    summaryEl.textContent = "Finish a mock exam to start tracking your progress.";
+    return;
+  }
+
+  // Headline numbers and weak areas
+  const weak = data.weak_areas.map(w => SECTION_NAMES[w.name] || w.name).join(", ");
+  summaryEl.innerHTML = `
+    <div><strong>Exams completed:</strong> ${data.exams_completed}</div>
+    <div><strong>Current streak:</strong> ${data.current_streak} day(s) (best ${data.longest_streak})</div>
+    <div><strong>Work on next:</strong> ${weak || "nothing stands out, keep going!"}</div>
+  `;
+
+  if (typeof Chart === "undefined") return;
+
+  // Overall exam score over time
+  new Chart(document.getElementById("progressScoreChart"), {
+    type: "line",
+    data: {
+      labels: data.recent_scores.map(p => p.date),
+      datasets: [{
+        label: "Exam score (0–10)",
+        data: data.recent_scores.map(p => p.score),
+        tension: 0.3
+      }]
+    },
+    options: {
+      scales: { y: { min: 0, max: 10 } }
+    }
+  });
+
+  // Average band per skill
+  const skills = Object.keys(data.skills);
+  new Chart(document.getElementById("progressSkillChart"), {
+    type: "bar",
+    data: {
+      labels: skills.map(s => s.charAt(0).toUpperCase() + s.slice(1)),
+      datasets: [{
+        label: "Average band",
+        data: skills.map(s => data.skills[s].average)
+      }]
+    },
+    options: {
+      scales: {
+        y: { min: 0, max: 4, ticks: { stepSize: 1, callback: v => BAND_LABELS[v] || "" } }
+      }
+    }
+  });
+}
@@ -0,0 +1,167 @@
+# static_assets.py
+# Static files (CSS, JS, vendored Chart.js) with content-hashed URLs and compressed bodies.
+# - url_for('static', filename='js/mock_exam.js') renders /static/js/mock_exam.<hash>.js. The hash
+#   changes with the content, so hashed URLs are cached for a year (immutable) and a deploy is still
+#   picked up at once: the page links the new hash
+# - Bodies go out brotli- or gzip-compressed when the browser accepts it. `python static_assets.py build`
+#   precompresses every file into static/dist/ at maximum compression (brotli needs the brotli package);
+#   without a build, gzip is computed on first request and kept in memory
+# - The plain name (/static/js/mock_exam.js) still works, revalidated with an ETag on every load
+# - A hash that doesn't match the file (a page rendered before a deploy) gets the current file, uncached
+import gzip
+import hashlib
+import mimetypes
+import re
+import sys
+import threading
+from pathlib import Path
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+HASH_LEN = 10
+_HASHED = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$" % HASH_LEN)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+COMPRESSIBLE = {".js", ".css", ".svg", ".json", ".txt", ".html", ".map"}
+# Not worth compressing below this
+MIN_COMPRESS_BYTES = 512
+
+_files = {}  # name -> (mtime_ns, size, data, hash)
+_variants = {}  # (hashed name, encoding) -> compressed bytes
+_lock = threading.Lock()
+
+
+def _read(name: str):
+    """ (data, hash) of static/<name>, re-read when the file changed; None if there is no such file. """
+    path = safe_join(str(STATIC_DIR), name)
+    if path is None:
+        return None
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    cached = _files.get(name)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2], cached[3]
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+    with _lock:
+        _files[name] = (st.st_mtime_ns, st.st_size, data, digest)
+    return data, digest
+
+
+def _with_hash(name: str, digest: str) -> str:
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+
+
+def hashed_name(name: str) -> str:
+    """ "js/mock_exam.js" -> "js/mock_exam.<hash>.js"; unknown files are left as they are. """
+    found = _read(name)
+    return name if found is None else _with_hash(name, found[1])
+
+
+def _compressible(name: str, data: bytes) -> bool:
+    return Path(name).suffix.lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES
+
+
+def _variant(name: str, digest: str, data: bytes, encoding: str):
+    key = (_with_hash(name, digest), encoding)
+    body = _variants.get(key)
+    if body is not None:
+        return body
+    built = DIST_DIR / f"{key[0]}.{'br' if encoding == 'br' else 'gz'}"
+    if built.is_file():
+        body = built.read_bytes()
+    elif encoding == "gzip":
+        body = gzip.compress(data, compresslevel=9, mtime=0)
+    else:
+        return None  # brotli only from a build: max quality is too slow for a request
+    with _lock:
+        _variants[key] = body
+    return body
+
+
+def send_static(filename: str):
+    """ Replaces Flask's static view (see init_app). """
+    name, requested = filename, None
+    match = _HASHED.match(filename)
+    if match and _read(match["stem"] + match["ext"]) is not None:
+        name, requested = match["stem"] + match["ext"], match["hash"]
+    found = _read(name)
+    if found is None:
+        abort(404)
+    data, digest = found
+
+    body, encoding = data, None
+    if _compressible(name, data):
+        for candidate in ("br", "gzip"):
+            if request.accept_encodings.quality(candidate) > 0:
+                compressed = _variant(name, digest, data, candidate)
+                if compressed is not None:
+                    body, encoding = compressed, candidate
+                    break
+
+    resp = Response(body, mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+    if _compressible(name, data):
+        resp.vary.add("Accept-Encoding")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(f"{digest}-{encoding or 'identity'}")
+    resp.headers["Cache-Control"] = IMMUTABLE if requested == digest else REVALIDATE
+    return resp.make_conditional(request)
+
+
+def _hashed_static_url(endpoint, values):
+    if endpoint == "static" and "filename" in values:
+        values["filename"] = hashed_name(values["filename"])
+
+
+def init_app(app) -> None:
+    app.view_functions["static"] = send_static
+    app.url_defaults(_hashed_static_url)
+
+
+def build() -> None:
+    """ Writes static/dist/<name>.<hash>.<ext>.gz (and .br) for every compressible file; drops stale ones. """
+    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    wanted = set()
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file() or DIST_DIR in path.parents:
+            continue
+        name = path.relative_to(STATIC_DIR).as_posix()
+        data, digest = _read(name)
+        if not _compressible(name, data):
+            continue
+        base = DIST_DIR / _with_hash(name, digest)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        outputs = {base.with_name(base.name + ".gz"): lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            outputs[base.with_name(base.name + ".br")] = lambda: brotli.compress(data, quality=11)
+        sizes = []
+        for out, make in outputs.items():
+            wanted.add(out)
+            if not out.exists():
+                out.write_bytes(make())
+            sizes.append(f"{out.suffix[1:]} {out.stat().st_size}")
+        print(f"   {name}: {len(data)} -> {', '.join(sizes)}")
+
+    for old in DIST_DIR.rglob("*"):
+        if old.is_file() and old not in wanted:
+            old.unlink()
+    print(f"✅ Precompressed static files in {DIST_DIR}" + ("" if brotli else " (gzip only: brotli not installed)"))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("usage: python static_assets.py build")
+    build()
@@ -0,0 +1,78 @@
+# stt_cache.py
+# Transcript cache for re-sent recordings.
+# On a flaky connection the browser sends the same recording again; without this every retry is a new
+# whisper-1 call. Transcripts are keyed on sha256(audio bytes) + language:
+# - a hit within STT_CACHE_SECONDS returns the stored transcript without calling Whisper
+# - concurrent identical uploads share one transcription (single_flight.py: the others wait for it)
+# - results are stored in transcript_cache, so a retry that lands on another worker also hits
+# - empty transcripts (silence, a failed decode) are not cached: the next upload asks Whisper again
+import hashlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+import single_flight
+from config import settings
+from db import SessionLocal
+from models import TranscriptCache
+
+
+def audio_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def lookup(digest: str, language: str):
+    """ The cached transcript, or None when missing or older than STT_CACHE_SECONDS. """
+    db = SessionLocal()
+    try:
+        row = db.query(TranscriptCache).filter_by(audio_sha256=digest, language=language).first()
+        if row and (row.transcript or "").strip() and \
+                row.created_at >= datetime.utcnow() - timedelta(seconds=settings.STT_CACHE_SECONDS):
+            return row.transcript
+        return None
+    finally:
+        db.close()
+
+
+def store(digest: str, language: str, transcript: str) -> None:
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.STT_CACHE_SECONDS)
+        db.execute(delete(TranscriptCache).where(TranscriptCache.created_at < cutoff))
+        row = db.query(TranscriptCache).filter_by(audio_sha256=digest, language=language).first()
+        if row:
+            row.transcript, row.created_at = transcript, datetime.utcnow()
+        else:
+            db.add(TranscriptCache(audio_sha256=digest, language=language, transcript=transcript))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # another worker stored the same recording first
+    finally:
+        db.close()
+
+
+def get_or_transcribe(data: bytes, language: str, transcribe):
+    """
+    The transcript of data. transcribe() -> transcript is only called on a miss, and only once for
+    several concurrent identical uploads.
+    """
+    if settings.STT_CACHE_SECONDS <= 0:
+        return transcribe()
+
+    digest = audio_digest(data)
+    cached = lookup(digest, language)
+    if cached is not None:
+        print("[STT] cache hit", digest[:12])
+        return cached
+
+    def leader():
+        # Another worker may have stored it while this one waited for the lock
+        text = lookup(digest, language)
+        if text is None:
+            text = transcribe()
+            if (text or "").strip():
+                store(digest, language, text)
+        return text
+
+    return single_flight.do(f"stt:{digest}:{language}", leader, kind="stt")
@@ -0,0 +1,178 @@
+# tts_cache.py
+# Disk cache for generated speech.
+# - Exam questions come from a fixed bank, so the same text is spoken again and again; each
+#   (model, voice, text) is rendered once and served from TTS_CACHE_DIR afterwards
+# - exam_answer enqueues a "tts_prerender" job for the next question, so by the time the browser
+#   asks /api/tts for it the audio is usually already on disk; a "tts_ready" exam event tells the page
+#   it can fetch it straight from GET /api/tts/cache/<key>.mp3
+# - Many students asking for the same uncached question at once share one render (single_flight.py)
+# - Only bank questions and prerendered exam questions are stored; other text sent to /api/tts (e.g. the
+#   practice page's generated questions, never the same twice) is rendered and not kept. The directory is
+#   capped at TTS_CACHE_MAX_MB as well: after a write, the oldest files go first
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import exam_events
+import jobs
+import question_bank
+import single_flight
+from ai_client import speech_client
+from config import settings
+
+TTS_MODEL = "gpt-4o-mini-tts"
+# Size check of TTS_CACHE_DIR at most this often per process
+PRUNE_INTERVAL_SECONDS = 60
+# Pruning goes down to this share of TTS_CACHE_MAX_MB, so it doesn't run again after the next write
+PRUNE_TARGET = 0.9
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+# Default voices per language
+VOICE_BY_LANGUAGE = {
+    "english": "alloy",
+    "french": "nova",
+    "german": "alloy",
+}
+
+
+def voice_for(language: str, voice: str = None) -> str:
+    """ An explicit voice wins; otherwise pick by language, fallback to alloy. """
+    return (voice or VOICE_BY_LANGUAGE.get((language or "").strip().lower()) or "alloy").strip()
+
+
+def cache_key(text: str, voice: str, model: str = TTS_MODEL) -> str:
+    return hashlib.sha256(f"{model}|{voice}|{text}".encode("utf-8")).hexdigest()
+
+
+def path_for_key(key: str) -> str:
+    return os.path.join(settings.TTS_CACHE_DIR, key[:2], key + ".mp3")
+
+
+def cache_path(text: str, voice: str, model: str = TTS_MODEL) -> str:
+    return path_for_key(cache_key(text, voice, model))
+
+
+def cached_url(text: str, voice: str) -> str:
+    return f"/api/tts/cache/{cache_key(text, voice)}.mp3"
+
+
+def cached_speech(text: str, voice: str, model: str = TTS_MODEL):
+    """ The cached MP3 bytes, or None. """
+    try:
+        with open(cache_path(text, voice, model), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def cacheable(text: str) -> bool:
+    """ Whether /api/tts keeps a render of text: only fixed bank questions are asked again and again. """
+    return question_bank.is_bank_question(text)
+
+
+def render_speech(text: str, voice: str, model: str = TTS_MODEL, store: bool = True) -> bytes:
+    """ MP3 bytes for text, from the cache or from the TTS model (then stored, unless store=False). """
+    audio = cached_speech(text, voice, model)
+    if audio is not None:
+        return audio
+    return single_flight.do(f"tts:{cache_key(text, voice, model)}", lambda: _render(text, voice, model, store),
+                            kind="tts")
+
+
+def _render(text: str, voice: str, model: str, store: bool) -> bytes:
+    # A render that finished in another process while this one waited for the lock
+    audio = cached_speech(text, voice, model)
+    if audio is not None:
+        return audio
+
+    # NOTE: no "format=" here; the SDK streams audio (defaults to mp3)
+    with speech_client.audio.speech.with_streaming_response.create(model=model, voice=voice, input=text) as resp:
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
+            tmp_path = tmp.name
+        resp.stream_to_file(tmp_path)
+    try:
+        with open(tmp_path, "rb") as f:
+            audio = f.read()
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    if not store:
+        return audio
+
+    # Write to a temp name first so a reader never sees half a file
+    path = cache_path(text, voice, model)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.part"
+    with open(partial, "wb") as f:
+        f.write(audio)
+    os.replace(partial, path)
+    _maybe_prune()
+    return audio
+
+
+def _maybe_prune() -> None:
+    """ Deletes the oldest cached files while TTS_CACHE_DIR is over TTS_CACHE_MAX_MB (0 = no limit). """
+    global _last_prune
+    limit = settings.TTS_CACHE_MAX_MB * 1024 * 1024
+    if limit <= 0 or time.monotonic() - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    if not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = time.monotonic()
+        files = []
+        for root, _dirs, names in os.walk(settings.TTS_CACHE_DIR):
+            for name in names:
+                if name.endswith(".mp3"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if total <= limit:
+            return
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= limit * PRUNE_TARGET:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        print(f"[TTS] cache over {settings.TTS_CACHE_MAX_MB} MB: removed {removed} oldest files")
+    finally:
+        _prune_lock.release()
+
+
+def prerender(text: str, language: str, session_id: int = None, user_id: int = None) -> None:
+    """ Queues the audio for text unless it is already cached; the exam page is told when it is ready. """
+    text = (text or "").strip()
+    if not settings.PRERENDER_TTS or not text:
+        return
+    voice = voice_for(language)
+    if os.path.exists(cache_path(text, voice)):
+        if session_id:
+            exam_events.publish(session_id, "tts_ready", {"text": text, "url": cached_url(text, voice)})
+        return
+    jobs.enqueue("tts_prerender", {"text": text, "voice": voice, "session_id": session_id}, user_id=user_id,
+                 max_attempts=2)
+
+
+@jobs.handler("tts_prerender")
+def _prerender_job(payload: dict):
+    audio = render_speech(payload["text"], payload["voice"])
+    if payload.get("session_id"):
+        exam_events.publish(payload["session_id"], "tts_ready", {
+            "text": payload["text"], "url": cached_url(payload["text"], payload["voice"]),
+        })
+    return {"bytes": len(audio)}
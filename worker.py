@@ -0,0 +1,48 @@
+# worker.py
+# Runs background jobs from the jobs table (see jobs.py).
+# Use it with JOB_RUNNER=external so the web processes only enqueue:
+#   JOB_RUNNER=external gunicorn -w 4 application:application
+#   python worker.py --threads 4
+# Several worker processes (on one or more machines) can run against the same database.
+import argparse
+import signal
+import threading
+
+import jobs
+import migrate
+from config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--threads", type=int, default=settings.JOB_THREADS, help="jobs run at the same time")
+    parser.add_argument("--poll", type=float, default=settings.JOB_POLL_SECONDS, help="seconds between polls when idle")
+    args = parser.parse_args()
+
+    migrate.check_schema()
+    jobs.load_handlers()
+    stop = threading.Event()
+
+    def shutdown(signum, _frame):
+        print("Stopping after the current jobs…")
+        stop.set()
+        jobs._wake.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [
+        threading.Thread(target=jobs.work, args=(jobs.worker_name(f"/w{i}"), stop, args.poll), daemon=True)
+        for i in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    print(f"✅ Worker running {args.threads} thread(s), handlers: {', '.join(sorted(jobs.HANDLERS))}")
+
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=1)
+
+
+if __name__ == "__main__":
+    main()